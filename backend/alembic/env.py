@@ -28,6 +28,17 @@ if config.config_file_name is not None:
 # for 'autogenerate' support
 target_metadata = BaseModel.metadata
 
+# 全文検索用のテーブル・列はモデルのDDLイベントとマイグレーションで管理するため、
+# autogenerateの比較対象から外す
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == "table" and name.startswith("videos_fts"):
+        return False
+    if type_ == "column" and name == "search_vector":
+        return False
+    if type_ == "index" and name == "ix_videos_search_vector":
+        return False
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -50,6 +61,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -74,7 +86,8 @@ def run_migrations_online() -> None:
     with connectable.connect() as connection:
         context.configure(
             connection=connection,
-            target_metadata=target_metadata
+            target_metadata=target_metadata,
+            include_object=include_object
         )
 
         with context.begin_transaction():
@@ -0,0 +1,93 @@
+"""add query indexes
+
+注意: このマイグレーションはデータを削除します。
+- playlist_videos: 同じ (playlist_id, video_id) の重複行と、どちらかがNULLの行を削除します。
+- classifications: 一意インデックス uq_classifications_video_id_playlist_id を作る前に、
+  同じ (video_id, playlist_id) の分類を1行にまとめます。残すのは status が completed の行を優先し、
+  その中で id が最も大きい（最後に作られた）行です。それ以外の重複行は削除され、downgrade でも戻りません。
+
+Revision ID: 7c3e9a41d2b8
+Revises: 5f05cabbae25
+Create Date: 2026-10-18 09:12:40.115302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3e9a41d2b8'
+down_revision: Union[str, None] = '5f05cabbae25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# 重複した分類のうち残す行の優先順位（小さいほど優先）
+_KEEP_RANK = "(CASE WHEN {table}.status = 'completed' THEN 0 ELSE 1 END)"
+
+
+def _recreate_playlist_videos(name: str, primary_key: bool) -> None:
+    op.create_table(name,
+    sa.Column('playlist_id', sa.Integer(), nullable=not primary_key),
+    sa.Column('video_id', sa.Integer(), nullable=not primary_key),
+    sa.ForeignKeyConstraint(['playlist_id'], ['playlists.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['video_id'], ['videos.id'], ondelete='CASCADE'),
+    *([sa.PrimaryKeyConstraint('playlist_id', 'video_id')] if primary_key else [])
+    )
+
+
+def upgrade() -> None:
+    # playlist_videos: 重複とNULLを除いて主キー付きのテーブルに作り直す
+    _recreate_playlist_videos('playlist_videos_new', primary_key=True)
+    op.execute(
+        "INSERT INTO playlist_videos_new (playlist_id, video_id) "
+        "SELECT DISTINCT playlist_id, video_id FROM playlist_videos "
+        "WHERE playlist_id IS NOT NULL AND video_id IS NOT NULL"
+    )
+    op.drop_table('playlist_videos')
+    op.rename_table('playlist_videos_new', 'playlist_videos')
+    op.create_index('ix_playlist_videos_video_id', 'playlist_videos', ['video_id'], unique=False)
+
+    # classifications: 一意インデックスを作る前に重複した分類を削除する
+    # （completed を優先し、その中で id が最も大きい行を残す）
+    op.execute(
+        "DELETE FROM classifications WHERE EXISTS ("
+        "SELECT 1 FROM classifications AS kept "
+        "WHERE kept.video_id = classifications.video_id "
+        "AND kept.playlist_id = classifications.playlist_id "
+        f"AND ({_KEEP_RANK.format(table='kept')} < {_KEEP_RANK.format(table='classifications')} "
+        f"OR ({_KEEP_RANK.format(table='kept')} = {_KEEP_RANK.format(table='classifications')} "
+        "AND kept.id > classifications.id)))"
+    )
+    op.create_index('uq_classifications_video_id_playlist_id', 'classifications', ['video_id', 'playlist_id'], unique=True)
+    op.create_index('ix_classifications_user_id_id', 'classifications', ['user_id', 'id'], unique=False)
+    op.create_index('ix_classifications_status_id', 'classifications', ['status', 'id'], unique=False)
+    op.create_index('ix_classification_rules_user_id_playlist_id_priority', 'classification_rules', ['user_id', 'playlist_id', 'priority'], unique=False)
+    op.create_index('ix_classification_histories_user_id_id', 'classification_histories', ['user_id', 'id'], unique=False)
+    op.create_index('ix_classification_histories_video_id_playlist_id', 'classification_histories', ['video_id', 'playlist_id'], unique=False)
+    op.create_index('ix_videos_channel_id_id', 'videos', ['channel_id', 'id'], unique=False)
+    op.create_index('ix_playlists_user_id_id', 'playlists', ['user_id', 'id'], unique=False)
+    op.create_index('ix_playlist_item_pages_playlist_id_page_index', 'playlist_item_pages', ['playlist_id', 'page_index'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_playlist_item_pages_playlist_id_page_index', table_name='playlist_item_pages')
+    op.drop_index('ix_playlists_user_id_id', table_name='playlists')
+    op.drop_index('ix_videos_channel_id_id', table_name='videos')
+    op.drop_index('ix_classification_histories_video_id_playlist_id', table_name='classification_histories')
+    op.drop_index('ix_classification_histories_user_id_id', table_name='classification_histories')
+    op.drop_index('ix_classification_rules_user_id_playlist_id_priority', table_name='classification_rules')
+    op.drop_index('ix_classifications_status_id', table_name='classifications')
+    op.drop_index('ix_classifications_user_id_id', table_name='classifications')
+    op.drop_index('uq_classifications_video_id_playlist_id', table_name='classifications')
+
+    op.drop_index('ix_playlist_videos_video_id', table_name='playlist_videos')
+    _recreate_playlist_videos('playlist_videos_old', primary_key=False)
+    op.execute(
+        "INSERT INTO playlist_videos_old (playlist_id, video_id) "
+        "SELECT playlist_id, video_id FROM playlist_videos"
+    )
+    op.drop_table('playlist_videos')
+    op.rename_table('playlist_videos_old', 'playlist_videos')
@@ -0,0 +1,44 @@
+"""add video fulltext search
+
+Revision ID: 9d41b7e2c6a3
+Revises: 7c3e9a41d2b8
+Create Date: 2026-10-18 10:05:12.481930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.models.video import SQLITE_FTS_DDL, POSTGRESQL_FTS_DDL
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d41b7e2c6a3'
+down_revision: Union[str, None] = '7c3e9a41d2b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_FTS_DDL:
+            op.execute(statement)
+        # 既存の動画をインデックスに取り込む
+        op.execute("INSERT INTO videos_fts(videos_fts) VALUES('rebuild')")
+    elif dialect == 'postgresql':
+        for statement in POSTGRESQL_FTS_DDL:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS videos_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS videos_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS videos_fts_ai")
+        op.execute("DROP TABLE IF EXISTS videos_fts")
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_videos_search_vector")
+        op.execute("ALTER TABLE videos DROP COLUMN IF EXISTS search_vector")
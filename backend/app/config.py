@@ -7,19 +7,54 @@ class Settings(BaseSettings):
     
     # YouTube API設定
     YOUTUBE_API_KEY: str = ""
+    YOUTUBE_SEARCH_CACHE_TTL_SECONDS: int = 600
+    YOUTUBE_SEARCH_CACHE_MAX_ENTRIES: int = 1000
+    YOUTUBE_SEARCH_CACHE_PATH: str = ""  # 空の場合はメモリ上のみでキャッシュ
     
     # Google OAuth設定
     GOOGLE_CLIENT_ID: str = ""
     GOOGLE_CLIENT_SECRET: str = ""
     GOOGLE_REDIRECT_URI: str = ""
+    GOOGLE_ID_TOKEN_CACHE_MAX_ENTRIES: int = 1024
     
     # データベース設定
     DATABASE_URL: str = "sqlite:///./youtube_playlist.db"
+    DATABASE_ENGINE_PROFILE: str = "tuned"  # "tuned" または "default"（SQLAlchemyの既定値）
+    # SQLite（tunedプロファイル）
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_MMAP_SIZE: int = 268435456  # 256MB
+    SQLITE_CACHE_SIZE: int = -64000  # 負の値はKB単位（約64MB）
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    # PostgreSQLなど（tunedプロファイル）
+    DATABASE_POOL_SIZE: int = 10
+    DATABASE_MAX_OVERFLOW: int = 20
+    DATABASE_POOL_TIMEOUT: int = 30
+    DATABASE_POOL_RECYCLE: int = 1800
+    DATABASE_POOL_PRE_PING: bool = True
+    DATABASE_STATEMENT_TIMEOUT_MS: int = 30000
     
     # JWT設定
     JWT_SECRET_KEY: str = "your-secret-key-here"  # 本番環境では必ず変更してください
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    USER_CACHE_TTL_SECONDS: int = 60
+    USER_CACHE_MAX_ENTRIES: int = 1024
+    # CRUDの自然キー検索（get_by_youtube_id・get_by_email など）のキャッシュ
+    CRUD_CACHE_ENABLED: bool = False
+    CRUD_CACHE_TTL_SECONDS: int = 300
+    CRUD_CACHE_MAX_ENTRIES: int = 10000
+    # 分類ワーカー（services/classification_worker.py）
+    CLASSIFICATION_WORKER_BATCH_SIZE: int = 100
+    CLASSIFICATION_WORKER_CHUNK_SIZE: int = 20  # リースを延長する間隔（handler に渡す件数）
+    CLASSIFICATION_WORKER_LEASE_SECONDS: int = 300
+    CLASSIFICATION_WORKER_MAX_ATTEMPTS: int = 5
+    CLASSIFICATION_WORKER_BACKOFF_BASE_SECONDS: int = 30
+    CLASSIFICATION_WORKER_BACKOFF_MAX_SECONDS: int = 3600
+    CLASSIFICATION_WORKER_POLL_INTERVAL_SECONDS: float = 5.0
+    # 分類履歴の保持期間と、集計・退避を1回に行う件数（services/history_compaction.py）
+    HISTORY_RETENTION_DAYS: int = 90
+    HISTORY_COMPACTION_CHUNK_SIZE: int = 5000
 
     class Config:
         env_file = ".env"
@@ -1,7 +1,23 @@
+from .base import aunit_of_work, unit_of_work
 from .user import user
 from .video import video
 from .playlist import playlist
-from .classification import classification, classification_rule, classification_history
+from .classification import (
+    classification,
+    classification_rule,
+    classification_history,
+    classification_history_summary,
+    classification_history_archive,
+    playlist_suggestion,
+)
+from ..config import settings
+
+if settings.CRUD_CACHE_ENABLED:
+    for _crud in (user, video, playlist):
+        _crud.enable_cache(
+            ttl=settings.CRUD_CACHE_TTL_SECONDS,
+            max_entries=settings.CRUD_CACHE_MAX_ENTRIES
+        )
 
 __all__ = [
     "user",
@@ -10,4 +26,9 @@ __all__ = [
     "classification",
     "classification_rule",
     "classification_history",
+    "classification_history_summary",
+    "classification_history_archive",
+    "playlist_suggestion",
+    "unit_of_work",
+    "aunit_of_work",
 ] 
\ No newline at end of file
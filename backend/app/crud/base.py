@@ -1,34 +1,439 @@
-from typing import Generic, TypeVar, Type, Optional, List, Any, Dict, Union
-from sqlalchemy.orm import Session
+from typing import Generic, TypeVar, Type, Optional, List, Any, Dict, Union, Sequence, Tuple, NamedTuple, Iterator, AsyncIterator, Callable
+from contextlib import asynccontextmanager, contextmanager
+import base64
+import binascii
+import json
+import time
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, Query
+from sqlalchemy.orm.interfaces import LoaderOption
 from ..models.base import BaseModel
+from .cache import IdentityCache, defer_invalidation, from_snapshot, has_pending_writes, snapshot
 
 ModelType = TypeVar("ModelType", bound=BaseModel)
 
+# ローダーオプション（selectinload など）またはプリセット名の並び
+LoaderOptions = Optional[Sequence[Union[str, LoaderOption]]]
+
+# 一括処理で1回のSQLにまとめる行数
+DEFAULT_CHUNK_SIZE = 500
+
+# 一括更新で上書きしない列
+_IMMUTABLE_COLUMNS = {"id", "created_at"}
+
+# unit_of_work のネストの深さを保存する Session.info のキー
+UNIT_OF_WORK_DEPTH = "unit_of_work_depth"
+
+@contextmanager
+def unit_of_work(db: Session) -> Iterator[Session]:
+    """
+    ブロック内のCRUD操作をコミットせずに1つのトランザクションにまとめます
+
+    ブロック内では create/update/delete などが commit・refresh の代わりに flush だけを行い、
+    最も外側のブロックを抜けたときに1回だけコミットします。例外が発生した場合はロールバックします。
+    """
+    depth = db.info.get(UNIT_OF_WORK_DEPTH, 0)
+    db.info[UNIT_OF_WORK_DEPTH] = depth + 1
+    try:
+        yield db
+        if depth == 0:
+            db.commit()
+    except BaseException:
+        if depth == 0:
+            db.rollback()
+        raise
+    finally:
+        db.info[UNIT_OF_WORK_DEPTH] = depth
+
+@asynccontextmanager
+async def aunit_of_work(db: AsyncSession) -> AsyncIterator[AsyncSession]:
+    """
+    unit_of_work の AsyncSession 版です（acreate/aupdate などの a* メソッドに使います）
+    """
+    depth = db.info.get(UNIT_OF_WORK_DEPTH, 0)
+    db.info[UNIT_OF_WORK_DEPTH] = depth + 1
+    try:
+        yield db
+        if depth == 0:
+            await db.commit()
+    except BaseException:
+        if depth == 0:
+            await db.rollback()
+        raise
+    finally:
+        db.info[UNIT_OF_WORK_DEPTH] = depth
+
+def should_commit(db: Union[Session, AsyncSession], commit: Optional[bool]) -> bool:
+    """
+    commit が指定されていなければ、unit_of_work の外でのみコミットします
+    """
+    if commit is not None:
+        return commit
+    return not db.info.get(UNIT_OF_WORK_DEPTH, 0)
+
+class CursorPage(NamedTuple):
+    items: List[Any]
+    next_cursor: Optional[str]
+
+class InvalidCursorError(ValueError):
+    pass
+
+def _encode_payload(payload: Dict[str, Any]) -> str:
+    data = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+def _decode_payload(cursor: str) -> Dict[str, Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursorError("invalid cursor")
+    if not isinstance(payload, dict) or not isinstance(payload.get("id"), int):
+        raise InvalidCursorError("invalid cursor")
+    return payload
+
+def encode_cursor(last_id: int) -> str:
+    return _encode_payload({"id": last_id})
+
+def decode_cursor(cursor: str) -> int:
+    return _decode_payload(cursor)["id"]
+
+def encode_rank_cursor(rank: float, last_id: int) -> str:
+    """
+    (rank, id) の順に並べた結果用のカーソル
+    """
+    return _encode_payload({"rank": rank, "id": last_id})
+
+def decode_rank_cursor(cursor: str) -> Tuple[float, int]:
+    payload = _decode_payload(cursor)
+    rank = payload.get("rank")
+    if not isinstance(rank, (int, float)):
+        raise InvalidCursorError("invalid cursor")
+    return float(rank), payload["id"]
+
 class CRUDBase(Generic[ModelType]):
+    # upsert_many のキーにする自然キー（サブクラスで上書き）
+    natural_key: Tuple[str, ...] = ()
+    # 名前で指定できるローダーオプションの組（サブクラスで上書き）
+    loader_presets: Dict[str, Tuple[LoaderOption, ...]] = {}
+
     def __init__(self, model: Type[ModelType]):
         self.model = model
+        self.cache: Optional[IdentityCache] = None
+
+    def enable_cache(
+        self, *, ttl: float, max_entries: int, clock: Callable[[], float] = time.monotonic
+    ) -> IdentityCache:
+        """
+        自然キーでの検索結果をキャッシュするようにします
+
+        キャッシュは列の値のスナップショットを保持し、取り出すときに
+        呼び出し側のセッションへSELECTなしで結び付けます。
+        update・delete・upsert_many などを通した変更で該当する行を無効化し、
+        トランザクションの終了時にもう一度無効化します。
+        コミットしていない書き込みのあるセッションではキャッシュを使いません。
+        """
+        self.cache = IdentityCache(ttl=ttl, max_entries=max_entries, clock=clock)
+        return self.cache
+
+    def disable_cache(self) -> None:
+        self.cache = None
+
+    def get_by_natural_key(self, db: Session, field: str, value: Any) -> Optional[ModelType]:
+        """
+        field == value の行を1件返します。キャッシュが有効であればキャッシュを先に引きます
+        """
+        cache = self.cache
+        if cache is None or not self._cache_usable(db):
+            return db.query(self.model).filter(getattr(self.model, field) == value).first()
+        values = cache.get((field, value))
+        if values is not None:
+            return from_snapshot(db, self.model, values)
+        db_obj = db.query(self.model).filter(getattr(self.model, field) == value).first()
+        if db_obj is not None:
+            cache.set((field, value), snapshot(db_obj))
+        return db_obj
+
+    def invalidate_cache(self, db_obj: ModelType) -> None:
+        """
+        db_obj に対応するキャッシュを無効化します（CRUDを通さずに変更した場合に呼び出します）
+        """
+        if self.cache is not None and db_obj.id is not None:
+            self.cache.invalidate_id(db_obj.id)
+
+    def _invalidate_ids(self, db: Session, ids: Sequence[int]) -> None:
+        if self.cache is not None:
+            defer_invalidation(db, self.cache, ids)
+
+    def _cache_usable(self, db: Session) -> bool:
+        # コミット前の行やロールバックされうる値をキャッシュしない
+        return not db.info.get(UNIT_OF_WORK_DEPTH, 0) and not has_pending_writes(db)
 
-    def get(self, db: Session, id: int) -> Optional[ModelType]:
-        return db.get(self.model, id)
+    def loader_options(self, options: LoaderOptions) -> List[LoaderOption]:
+        """
+        プリセット名を展開し、クエリに渡すローダーオプションのリストを返します
+        """
+        resolved: List[LoaderOption] = []
+        for option in options or ():
+            if isinstance(option, str):
+                if option not in self.loader_presets:
+                    raise ValueError(f"unknown loader preset for {self.model.__name__}: {option}")
+                resolved.extend(self.loader_presets[option])
+            else:
+                resolved.append(option)
+        return resolved
+
+    def query(self, db: Session, *, options: LoaderOptions = None) -> Query:
+        """
+        ローダーオプションを適用したモデルのクエリを返します
+        """
+        query = db.query(self.model)
+        if options:
+            query = query.options(*self.loader_options(options))
+        return query
+
+    def get(self, db: Session, id: int, *, options: LoaderOptions = None) -> Optional[ModelType]:
+        return db.get(self.model, id, options=self.loader_options(options))
+
+    def iter_rows(self, db: Session, statement, *, yield_per: int = DEFAULT_CHUNK_SIZE) -> Iterator[Any]:
+        """
+        statement の結果を yield_per 件ずつ取り出しながら1行ずつ返します
+
+        PostgreSQLではサーバーサイドカーソルを使うため、結果の件数によらずメモリ使用量は一定です。
+        """
+        yield from db.execute(statement.execution_options(yield_per=yield_per))
+
+    def get_multi_by_ids(
+        self, db: Session, *, ids: Sequence[int], options: LoaderOptions = None
+    ) -> List[ModelType]:
+        if not ids:
+            return []
+        return self.query(db, options=options).filter(self.model.id.in_(ids)).all()
 
     def get_multi(
-        self, db: Session, *, skip: int = 0, limit: int = 100
+        self, db: Session, *, skip: int = 0, limit: int = 100, options: LoaderOptions = None
     ) -> List[ModelType]:
-        return db.query(self.model).offset(skip).limit(limit).all()
+        return self.query(db, options=options).offset(skip).limit(limit).all()
+
+    def get_multi_page(
+        self,
+        db: Session,
+        *,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        options: LoaderOptions = None
+    ) -> CursorPage:
+        return self.paginate(self.query(db, options=options), cursor=cursor, limit=limit)
+
+    def paginate(
+        self,
+        query: Query,
+        *,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        descending: bool = False
+    ) -> CursorPage:
+        """
+        idをキーにしたキーセット方式でページを取得します
 
-    def create(self, db: Session, *, obj_in: Dict[str, Any]) -> ModelType:
+        OFFSETを使わないため、深いページでも先頭ページと同じコストで取得でき、
+        途中で行が追加されても結果がずれません。
+        """
+        id_column = self.model.id
+        if cursor is not None:
+            last_id = decode_cursor(cursor)
+            query = query.filter(id_column < last_id if descending else id_column > last_id)
+        query = query.order_by(id_column.desc() if descending else id_column.asc())
+        rows = query.limit(limit + 1).all()
+        if len(rows) > limit:
+            return CursorPage(rows[:limit], encode_cursor(rows[limit - 1].id))
+        return CursorPage(rows, None)
+
+    def create(
+        self, db: Session, *, obj_in: Dict[str, Any], commit: Optional[bool] = None
+    ) -> ModelType:
         db_obj = self.model(**obj_in)
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        self._save(db, db_obj, commit=commit)
         return db_obj
 
+    def _save(self, db: Session, db_obj: Optional[ModelType] = None, *, commit: Optional[bool]) -> None:
+        """
+        コミットして db_obj を読み直すか、コミットしない場合は flush だけを行います
+        """
+        db.flush()
+        if db_obj is not None:
+            self._invalidate_ids(db, [db_obj.id])
+        if should_commit(db, commit):
+            db.commit()
+            if db_obj is not None:
+                db.refresh(db_obj)
+
+    def create_many(
+        self,
+        db: Session,
+        *,
+        objs_in: Sequence[Dict[str, Any]],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        return_ids: bool = False,
+        commit: Optional[bool] = None
+    ) -> Optional[List[int]]:
+        """
+        複数の行を chunk_size 件ずつのINSERTでまとめて作成します
+
+        ORMを経由しないため @validates は実行されません。
+        return_ids=True の場合は作成した行のIDを入力順に返します。
+        """
+        ids: List[int] = []
+        for chunk in _chunks(objs_in, chunk_size):
+            chunk_ids: List[Optional[int]] = [None] * len(chunk)
+            for positions, rows in _group_by_columns(chunk):
+                stmt = insert(self.model)
+                if return_ids:
+                    stmt = stmt.returning(self.model.id, sort_by_parameter_order=True)
+                    for position, id in zip(positions, db.execute(stmt, rows).scalars().all()):
+                        chunk_ids[position] = id
+                else:
+                    db.execute(stmt, rows)
+            if return_ids:
+                ids.extend(chunk_ids)
+        # 新しい行はキャッシュにないが、コミットまではセッションのキャッシュの利用を止める
+        self._invalidate_ids(db, ids)
+        if should_commit(db, commit):
+            db.commit()
+        return ids if return_ids else None
+
+    def upsert_many(
+        self,
+        db: Session,
+        *,
+        objs_in: Sequence[Dict[str, Any]],
+        index_elements: Optional[Sequence[str]] = None,
+        update_fields: Optional[Sequence[str]] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        return_ids: bool = False,
+        commit: Optional[bool] = None
+    ) -> Optional[List[int]]:
+        """
+        自然キーが一致する行は更新し、それ以外は作成します
+
+        SQLiteとPostgreSQLでは INSERT ... ON CONFLICT DO UPDATE を使い、
+        それ以外のデータベースでは既存行をまとめて取得してから更新します。
+        入力内で同じキーが重複した場合は後の値を使います。
+        既存の行で更新するのは、各入力に含まれている列だけです。
+        ORMを経由しないため @validates は実行されません。
+        return_ids=True の場合は各入力に対応する行のIDを入力順に返します。
+        """
+        keys = tuple(index_elements or self.natural_key)
+        if not keys:
+            raise ValueError(f"{self.__class__.__name__} has no natural key for upsert")
+
+        # 同じキーの重複は後の値で上書き（ON CONFLICTは同じ行を二度更新できないため）
+        unique: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+        for obj_in in objs_in:
+            unique[tuple(obj_in[key] for key in keys)] = obj_in
+
+        # キャッシュは入力にない自然キーでも同じ行を指しうるため、更新した行のIDで無効化する
+        need_ids = return_ids or self.cache is not None
+        dialect_insert = _dialect_insert(db)
+        ids_by_key: Dict[Tuple[Any, ...], int] = {}
+        for chunk in _chunks(list(unique.items()), chunk_size):
+            for positions, rows in _group_by_columns([obj_in for _, obj_in in chunk]):
+                if dialect_insert is None:
+                    group_ids = self._upsert_chunk_fallback(db, rows, keys, update_fields)
+                else:
+                    group_ids = self._upsert_chunk(db, dialect_insert, rows, keys, update_fields, need_ids)
+                if need_ids:
+                    ids_by_key.update(zip((chunk[position][0] for position in positions), group_ids))
+        self._invalidate_ids(db, list(ids_by_key.values()))
+        if should_commit(db, commit):
+            db.commit()
+        if not return_ids:
+            return None
+        return [ids_by_key[tuple(obj_in[key] for key in keys)] for obj_in in objs_in]
+
+    def _upsert_chunk(
+        self,
+        db: Session,
+        dialect_insert,
+        rows: List[Dict[str, Any]],
+        keys: Tuple[str, ...],
+        update_fields: Optional[Sequence[str]],
+        return_ids: bool
+    ) -> List[int]:
+        stmt = dialect_insert(self.model)
+        # 行に含まれない列は excluded が既定値になるため、SETに含めない
+        columns = [
+            column for column in rows[0]
+            if column not in keys and column not in _IMMUTABLE_COLUMNS
+            and (update_fields is None or column in update_fields)
+        ]
+        set_ = {column: stmt.excluded[column] for column in columns}
+        if "updated_at" in self.model.__table__.c:
+            set_["updated_at"] = stmt.excluded.updated_at
+        if set_:
+            stmt = stmt.on_conflict_do_update(index_elements=list(keys), set_=set_)
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=list(keys))
+        if not return_ids:
+            db.execute(stmt, rows)
+            return []
+        if not set_:
+            # DO NOTHINGでは既存行のIDが返らないため、後から取得する
+            db.execute(stmt, rows)
+            return self._ids_by_keys(db, rows, keys)
+        stmt = stmt.returning(self.model.id, sort_by_parameter_order=True)
+        return db.execute(stmt, rows).scalars().all()
+
+    def _upsert_chunk_fallback(
+        self,
+        db: Session,
+        rows: List[Dict[str, Any]],
+        keys: Tuple[str, ...],
+        update_fields: Optional[Sequence[str]]
+    ) -> List[int]:
+        key_columns = [getattr(self.model, key) for key in keys]
+        row_keys = [tuple(row[key] for key in keys) for row in rows]
+        existing = {
+            tuple(getattr(db_obj, key) for key in keys): db_obj
+            for db_obj in db.query(self.model).filter(tuple_(*key_columns).in_(row_keys))
+        }
+        db_objs = []
+        for row_key, row in zip(row_keys, rows):
+            db_obj = existing.get(row_key)
+            if db_obj is None:
+                db_obj = self.model(**row)
+                db.add(db_obj)
+            else:
+                for field, value in row.items():
+                    if field in keys or field in _IMMUTABLE_COLUMNS:
+                        continue
+                    if update_fields is None or field in update_fields:
+                        setattr(db_obj, field, value)
+            db_objs.append(db_obj)
+        db.flush()
+        return [db_obj.id for db_obj in db_objs]
+
+    def _ids_by_keys(
+        self, db: Session, rows: List[Dict[str, Any]], keys: Tuple[str, ...]
+    ) -> List[int]:
+        key_columns = [getattr(self.model, key) for key in keys]
+        row_keys = [tuple(row[key] for key in keys) for row in rows]
+        found = {
+            tuple(row[:-1]): row[-1]
+            for row in db.query(*key_columns, self.model.id).filter(tuple_(*key_columns).in_(row_keys))
+        }
+        return [found[row_key] for row_key in row_keys]
+
     def update(
         self,
         db: Session,
         *,
         db_obj: ModelType,
-        obj_in: Union[Dict[str, Any], ModelType]
+        obj_in: Union[Dict[str, Any], ModelType],
+        commit: Optional[bool] = None
     ) -> ModelType:
         obj_data = db_obj.__dict__
         if isinstance(obj_in, dict):
@@ -39,13 +444,135 @@ class CRUDBase(Generic[ModelType]):
             if field in update_data:
                 setattr(db_obj, field, update_data[field])
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        self._save(db, db_obj, commit=commit)
         return db_obj
 
-    def delete(self, db: Session, *, id: int) -> ModelType:
+    def delete(self, db: Session, *, id: int, commit: Optional[bool] = None) -> ModelType:
         obj = db.get(self.model, id)
         if obj is not None:
             db.delete(obj)
-            db.commit()
-        return obj 
\ No newline at end of file
+            self._invalidate_ids(db, [id])
+            self._save(db, commit=commit)
+        return obj
+
+    # 非同期セッション用のメソッド（AsyncSessionで同じ処理を行います）
+
+    async def aget(self, db: AsyncSession, id: int) -> Optional[ModelType]:
+        return await db.get(self.model, id)
+
+    async def aget_multi(
+        self, db: AsyncSession, *, skip: int = 0, limit: int = 100
+    ) -> List[ModelType]:
+        result = await db.scalars(select(self.model).offset(skip).limit(limit))
+        return result.all()
+
+    async def aget_multi_page(
+        self, db: AsyncSession, *, cursor: Optional[str] = None, limit: int = 100
+    ) -> CursorPage:
+        return await db.run_sync(lambda session: self.get_multi_page(session, cursor=cursor, limit=limit))
+
+    async def acreate(
+        self, db: AsyncSession, *, obj_in: Dict[str, Any], commit: Optional[bool] = None
+    ) -> ModelType:
+        db_obj = self.model(**obj_in)
+        db.add(db_obj)
+        await self._asave(db, db_obj, commit=commit)
+        return db_obj
+
+    async def _asave(
+        self, db: AsyncSession, db_obj: Optional[ModelType] = None, *, commit: Optional[bool]
+    ) -> None:
+        await db.flush()
+        if db_obj is not None:
+            self._invalidate_ids(db, [db_obj.id])
+        if should_commit(db, commit):
+            await db.commit()
+            if db_obj is not None:
+                await db.refresh(db_obj)
+
+    async def acreate_many(
+        self,
+        db: AsyncSession,
+        *,
+        objs_in: Sequence[Dict[str, Any]],
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        return_ids: bool = False,
+        commit: Optional[bool] = None
+    ) -> Optional[List[int]]:
+        return await db.run_sync(lambda session: self.create_many(
+            session, objs_in=objs_in, chunk_size=chunk_size, return_ids=return_ids, commit=commit
+        ))
+
+    async def aupsert_many(
+        self,
+        db: AsyncSession,
+        *,
+        objs_in: Sequence[Dict[str, Any]],
+        index_elements: Optional[Sequence[str]] = None,
+        update_fields: Optional[Sequence[str]] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        return_ids: bool = False,
+        commit: Optional[bool] = None
+    ) -> Optional[List[int]]:
+        return await db.run_sync(lambda session: self.upsert_many(
+            session,
+            objs_in=objs_in,
+            index_elements=index_elements,
+            update_fields=update_fields,
+            chunk_size=chunk_size,
+            return_ids=return_ids,
+            commit=commit
+        ))
+
+    async def aupdate(
+        self,
+        db: AsyncSession,
+        *,
+        db_obj: ModelType,
+        obj_in: Union[Dict[str, Any], ModelType],
+        commit: Optional[bool] = None
+    ) -> ModelType:
+        obj_data = db_obj.__dict__
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.__dict__
+        for field in obj_data:
+            if field in update_data:
+                setattr(db_obj, field, update_data[field])
+        db.add(db_obj)
+        await self._asave(db, db_obj, commit=commit)
+        return db_obj
+
+    async def adelete(self, db: AsyncSession, *, id: int, commit: Optional[bool] = None) -> ModelType:
+        obj = await db.get(self.model, id)
+        if obj is not None:
+            await db.delete(obj)
+            self._invalidate_ids(db, [id])
+            await self._asave(db, commit=commit)
+        return obj
+
+def _chunks(items: Sequence[Any], size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _group_by_columns(rows: Sequence[Dict[str, Any]]) -> List[Tuple[List[int], List[Dict[str, Any]]]]:
+    """
+    executemanyでは全行の列を揃える必要があるため、同じ列を持つ行ごとに (入力の位置, 行) にまとめます
+
+    欠けている列をNoneで補うと、INSERTでは列の既定値が使われず、UPDATEでは既存の値がNULLになるためです。
+    """
+    groups: Dict[Tuple[str, ...], Tuple[List[int], List[Dict[str, Any]]]] = {}
+    for position, row in enumerate(rows):
+        positions, group = groups.setdefault(tuple(sorted(row)), ([], []))
+        positions.append(position)
+        group.append(row)
+    return list(groups.values())
+
+def _dialect_insert(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        return sqlite.insert
+    if dialect == "postgresql":
+        return postgresql.insert
+    return None
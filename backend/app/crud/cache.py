@@ -0,0 +1,160 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set, Type, TypeVar
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from ..models.base import BaseModel
+
+ModelType = TypeVar("ModelType", bound=BaseModel)
+
+# コミット・ロールバック時に無効化する (キャッシュ, 行のID) を保存する Session.info のキー
+PENDING_INVALIDATIONS = "crud_cache_pending_invalidations"
+
+def snapshot(db_obj: BaseModel) -> Dict[str, Any]:
+    """
+    インスタンスの列の値をセッションに依存しない辞書として取り出します
+    """
+    return {attr.key: getattr(db_obj, attr.key) for attr in inspect(type(db_obj)).column_attrs}
+
+def from_snapshot(db: Session, model: Type[ModelType], values: Dict[str, Any]) -> ModelType:
+    """
+    スナップショットからインスタンスを作り、SELECTせずにセッションへ結び付けます
+
+    セッションに同じ行が既にあれば、フラッシュ前の変更を上書きしないようそのインスタンスをそのまま返します。
+    """
+    existing = db.identity_map.get(inspect(model).identity_key_from_primary_key([values["id"]]))
+    if existing is not None:
+        return existing
+    db_obj = model(**values)
+    make_transient_to_detached(db_obj)
+    return db.merge(db_obj, load=False)
+
+def defer_invalidation(db: Session, cache: "IdentityCache", ids: Iterable[int]) -> None:
+    """
+    ids の行をすぐに無効化し、トランザクションの終了時にもう一度無効化します
+
+    コミット前に他のセッションが古い値を読み込んでキャッシュしても、コミット後に取り除かれます。
+    トランザクションの外（コミット済み）で呼ばれた場合はすぐに無効化するだけです。
+    """
+    ids = [id for id in ids if id is not None]
+    for id in ids:
+        cache.invalidate_id(id)
+    if db.in_transaction():
+        db.info.setdefault(PENDING_INVALIDATIONS, []).append((cache, ids))
+
+def has_pending_writes(db: Session) -> bool:
+    """
+    セッションにコミットしていない書き込み（フラッシュ済みのものを含む）があるかを返します
+    """
+    return PENDING_INVALIDATIONS in db.info or bool(db.new or db.dirty or db.deleted)
+
+@event.listens_for(Session, "after_transaction_end")
+def _invalidate_pending(session: Session, transaction) -> None:
+    # 最も外側のトランザクションの終了（コミット・ロールバック・close）でのみ処理する
+    if transaction.parent is not None:
+        return
+    for cache, ids in session.info.pop(PENDING_INVALIDATIONS, ()):
+        for id in ids:
+            cache.invalidate_id(id)
+
+class IdentityCache:
+    """
+    (キー名, 値) -> 行のスナップショット を保持するTTL付きLRUキャッシュ
+
+    1つの行を複数の自然キーで引けるよう、行のIDから登録済みのキーを辿って無効化できます。
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl: float,
+        max_entries: int,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._keys_by_id: Dict[int, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                self._remove(key)
+            self.misses += 1
+            return None
+
+    def set(self, key: Hashable, values: Dict[str, Any]) -> None:
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (values, self._clock() + self.ttl)
+            self._keys_by_id.setdefault(values["id"], set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        キーが指す行を無効化します。同じ行を指す他のキーもあわせて無効化します
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._invalidate_id(entry[0]["id"])
+
+    def invalidate_id(self, id: int) -> None:
+        """
+        指定したIDの行を指すすべてのキーを無効化します
+        """
+        with self._lock:
+            self._invalidate_id(id)
+
+    def _invalidate_id(self, id: int) -> None:
+        for key in list(self._keys_by_id.get(id, ())):
+            self._remove(key)
+            self.invalidations += 1
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        id = entry[0]["id"]
+        keys = self._keys_by_id.get(id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_id[id]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_id.clear()
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
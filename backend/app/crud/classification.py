@@ -1,9 +1,26 @@
-from typing import Optional, List
-from sqlalchemy.orm import Session
-from .base import CRUDBase
-from ..models.classification import Classification, ClassificationRule, ClassificationHistory
+from datetime import date, datetime
+from typing import Optional, List, Sequence, Set, Tuple, Dict, Any
+from sqlalchemy import and_, bindparam, or_, select, update
+from sqlalchemy.orm import Session, joinedload
+from .base import CRUDBase, CursorPage, LoaderOptions, _dialect_insert
+from ..models.classification import (
+    Classification,
+    ClassificationRule,
+    ClassificationHistory,
+    ClassificationHistorySummary,
+    ClassificationHistoryArchive,
+    PlaylistSuggestion,
+)
+
+# 集計の (user_id, playlist_id, day) と、アクションごとの件数
+SummaryKey = Tuple[int, int, date]
+SUMMARY_ACTIONS = {"add": "added", "remove": "removed", "modify": "modified"}
 
 class CRUDClassification(CRUDBase[Classification]):
+    loader_presets = {
+        "detail": (joinedload(Classification.video), joinedload(Classification.playlist)),
+    }
+
     def get_by_video_and_playlist(
         self, db: Session, *, video_id: str, playlist_id: str
     ) -> Optional[Classification]:
@@ -17,28 +34,268 @@ class CRUDClassification(CRUDBase[Classification]):
         )
 
     def get_by_user(
-        self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100
+        self,
+        db: Session,
+        *,
+        user_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        options: LoaderOptions = None
     ) -> List[Classification]:
         return (
-            db.query(Classification)
+            self.query(db, options=options)
             .filter(Classification.user_id == user_id)
             .offset(skip)
             .limit(limit)
             .all()
         )
 
+    def get_by_user_page(
+        self,
+        db: Session,
+        *,
+        user_id: int,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        options: LoaderOptions = None
+    ) -> CursorPage:
+        return self.paginate(
+            self.query(db, options=options).filter(Classification.user_id == user_id),
+            cursor=cursor,
+            limit=limit
+        )
+
     def get_by_status(
-        self, db: Session, *, status: str, skip: int = 0, limit: int = 100
+        self,
+        db: Session,
+        *,
+        status: str,
+        skip: int = 0,
+        limit: int = 100,
+        options: LoaderOptions = None
     ) -> List[Classification]:
         return (
-            db.query(Classification)
+            self.query(db, options=options)
             .filter(Classification.status == status)
             .offset(skip)
             .limit(limit)
             .all()
         )
 
+    def get_by_status_page(
+        self,
+        db: Session,
+        *,
+        status: str,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        options: LoaderOptions = None
+    ) -> CursorPage:
+        return self.paginate(
+            self.query(db, options=options).filter(Classification.status == status),
+            cursor=cursor,
+            limit=limit
+        )
+
+    def get_pairs_for_videos(
+        self, db: Session, *, user_id: int, video_ids: Sequence[int]
+    ) -> Set[Tuple[int, int]]:
+        """
+        指定した動画について、既に分類済みの (video_id, playlist_id) の組を返します
+        """
+        if not video_ids:
+            return set()
+        return {
+            (video_id, playlist_id)
+            for video_id, playlist_id in db.query(Classification.video_id, Classification.playlist_id)
+            .filter(Classification.user_id == user_id, Classification.video_id.in_(video_ids))
+        }
+
+    def get_pairs_by_status(self, db: Session, *, user_id: int, status: str) -> Set[Tuple[int, int]]:
+        """
+        指定した状態の分類を (video_id, playlist_id) の組の集合で返します
+        """
+        return {
+            (video_id, playlist_id)
+            for video_id, playlist_id in db.query(Classification.video_id, Classification.playlist_id)
+            .filter(Classification.user_id == user_id, Classification.status == status)
+        }
+
+    def get_classified_video_ids(self, db: Session, *, user_id: int) -> Set[int]:
+        """
+        分類が1件以上ある動画のIDを返します
+        """
+        query = db.query(Classification.video_id).filter(Classification.user_id == user_id)
+        return {video_id for video_id, in query.distinct()}
+
+    def export_statement(self, *, user_id: int):
+        """
+        エクスポート用のユーザーの分類の列（idの昇順）
+        """
+        return (
+            select(
+                Classification.id,
+                Classification.video_id,
+                Classification.playlist_id,
+                Classification.status,
+                Classification.confidence,
+                Classification.created_at,
+                Classification.updated_at
+            )
+            .where(Classification.user_id == user_id)
+            .order_by(Classification.id)
+        )
+
+    def _claimable(self, *, now: datetime, max_attempts: int):
+        return and_(
+            Classification.status == "pending",
+            Classification.attempts < max_attempts,
+            or_(Classification.next_attempt_at.is_(None), Classification.next_attempt_at <= now),
+            or_(Classification.locked_until.is_(None), Classification.locked_until <= now)
+        )
+
+    def claim_pending(
+        self,
+        db: Session,
+        *,
+        lease_token: str,
+        limit: int,
+        locked_until: datetime,
+        now: datetime,
+        max_attempts: int,
+        options: LoaderOptions = None,
+        commit: Optional[bool] = None
+    ) -> List[Classification]:
+        """
+        処理可能な pending の分類を最大 limit 件リースし、リースした行を返します
+
+        候補のIDを選んだ後、リースが空いていることを条件に UPDATE するため、
+        複数のワーカーが同時に呼び出しても同じ行を二重にリースしません。
+        PostgreSQLでは候補の選択に FOR UPDATE SKIP LOCKED を使い、ワーカー同士の待ち合わせを避けます。
+        リースのたびに attempts を1つ増やし、上限に達した行は failed にします。
+        """
+        # リース切れのまま試行回数の上限に達した行（処理中にワーカーが停止した場合など）
+        db.execute(
+            update(Classification)
+            .where(
+                Classification.status == "pending",
+                Classification.attempts >= max_attempts,
+                or_(Classification.locked_until.is_(None), Classification.locked_until <= now)
+            )
+            .values(status="failed", lease_token=None, locked_until=None)
+            .execution_options(synchronize_session=False)
+        )
+
+        candidates = (
+            db.query(Classification.id)
+            .filter(self._claimable(now=now, max_attempts=max_attempts))
+            .order_by(Classification.id)
+            .limit(limit)
+        )
+        if db.get_bind().dialect.name == "postgresql":
+            candidates = candidates.with_for_update(skip_locked=True)
+        ids = [id for id, in candidates]
+        if ids:
+            db.execute(
+                update(Classification)
+                .where(Classification.id.in_(ids), self._claimable(now=now, max_attempts=max_attempts))
+                .values(
+                    lease_token=lease_token,
+                    locked_until=locked_until,
+                    attempts=Classification.attempts + 1
+                )
+                .execution_options(synchronize_session=False)
+            )
+        self._save(db, commit=commit)
+        if not ids:
+            return []
+        return (
+            self.query(db, options=options)
+            .filter(Classification.lease_token == lease_token)
+            .order_by(Classification.id)
+            .populate_existing()
+            .all()
+        )
+
+    def extend_lease(
+        self,
+        db: Session,
+        *,
+        lease_token: str,
+        locked_until: datetime,
+        commit: Optional[bool] = None
+    ) -> List[int]:
+        """
+        リースの期限を延ばし、このリースがまだ保持している行のIDを返します
+        """
+        db.execute(
+            update(Classification)
+            .where(Classification.lease_token == lease_token)
+            .values(locked_until=locked_until)
+            .execution_options(synchronize_session=False)
+        )
+        ids = [id for id, in db.query(Classification.id).filter(Classification.lease_token == lease_token)]
+        self._save(db, commit=commit)
+        return ids
+
+    def finish_leased(
+        self,
+        db: Session,
+        *,
+        lease_token: str,
+        rows: Sequence[Dict[str, Any]],
+        commit: Optional[bool] = None
+    ) -> int:
+        """
+        リース中の行の結果をまとめて書き込み、リースを解放します
+
+        rows は id と status・confidence・next_attempt_at・last_error を持つ辞書の並びです。
+        リースが期限切れで他のワーカーに移った行は更新せず、更新した行数を返します。
+        """
+        if not rows:
+            return 0
+        table = Classification.__table__
+        stmt = (
+            table.update()
+            .where(table.c.id == bindparam("_id"), table.c.lease_token == lease_token)
+            .values(
+                status=bindparam("_status"),
+                confidence=bindparam("_confidence"),
+                next_attempt_at=bindparam("_next_attempt_at"),
+                last_error=bindparam("_last_error"),
+                lease_token=None,
+                locked_until=None
+            )
+        )
+        params = [
+            {
+                "_id": row["id"],
+                "_status": row["status"],
+                "_confidence": row.get("confidence"),
+                "_next_attempt_at": row.get("next_attempt_at"),
+                "_last_error": row.get("last_error")
+            }
+            for row in rows
+        ]
+        count = db.execute(stmt, params).rowcount
+        self._save(db, commit=commit)
+        return count
+
 class CRUDClassificationRule(CRUDBase[ClassificationRule]):
+    loader_presets = {
+        "playlist": (joinedload(ClassificationRule.playlist),),
+    }
+
+    def get_by_user(
+        self, db: Session, *, user_id: int, options: LoaderOptions = None
+    ) -> List[ClassificationRule]:
+        return (
+            self.query(db, options=options)
+            .filter(ClassificationRule.user_id == user_id)
+            .order_by(ClassificationRule.priority, ClassificationRule.id)
+            .all()
+        )
+
     def get_by_user_and_playlist(
         self, db: Session, *, user_id: int, playlist_id: str
     ) -> List[ClassificationRule]:
@@ -65,17 +322,46 @@ class CRUDClassificationRule(CRUDBase[ClassificationRule]):
         )
 
 class CRUDClassificationHistory(CRUDBase[ClassificationHistory]):
+    loader_presets = {
+        "detail": (joinedload(ClassificationHistory.video), joinedload(ClassificationHistory.playlist)),
+    }
+
     def get_by_user(
-        self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100
+        self,
+        db: Session,
+        *,
+        user_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        options: LoaderOptions = None
     ) -> List[ClassificationHistory]:
         return (
-            db.query(ClassificationHistory)
+            self.query(db, options=options)
             .filter(ClassificationHistory.user_id == user_id)
             .offset(skip)
             .limit(limit)
             .all()
         )
 
+    def get_by_user_page(
+        self,
+        db: Session,
+        *,
+        user_id: int,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        options: LoaderOptions = None
+    ) -> CursorPage:
+        """
+        新しい履歴から順にページを取得します
+        """
+        return self.paginate(
+            self.query(db, options=options).filter(ClassificationHistory.user_id == user_id),
+            cursor=cursor,
+            limit=limit,
+            descending=True
+        )
+
     def get_by_video_and_playlist(
         self, db: Session, *, video_id: str, playlist_id: str
     ) -> List[ClassificationHistory]:
@@ -88,6 +374,148 @@ class CRUDClassificationHistory(CRUDBase[ClassificationHistory]):
             .all()
         )
 
+    def get_older_than(
+        self, db: Session, *, cutoff: datetime, limit: int
+    ) -> List[ClassificationHistory]:
+        """
+        cutoff より前に作成された履歴を古いものから limit 件返します
+        """
+        return (
+            db.query(ClassificationHistory)
+            .filter(ClassificationHistory.created_at < cutoff)
+            .order_by(ClassificationHistory.id)
+            .limit(limit)
+            .all()
+        )
+
+    def delete_ids(self, db: Session, *, ids: Sequence[int], commit: Optional[bool] = None) -> int:
+        if not ids:
+            return 0
+        count = (
+            db.query(ClassificationHistory)
+            .filter(ClassificationHistory.id.in_(ids))
+            .delete(synchronize_session=False)
+        )
+        self._save(db, commit=commit)
+        return count
+
+class CRUDClassificationHistorySummary(CRUDBase[ClassificationHistorySummary]):
+    natural_key = ("user_id", "playlist_id", "day")
+
+    def add_counts(
+        self,
+        db: Session,
+        *,
+        counts: Dict[SummaryKey, Dict[str, int]],
+        commit: Optional[bool] = None
+    ) -> None:
+        """
+        {(user_id, playlist_id, day): {"added": n, ...}} を既存の集計に加算します
+
+        SQLiteとPostgreSQLでは INSERT ... ON CONFLICT DO UPDATE で加算し、
+        それ以外のデータベースでは既存の行を読んでから更新します。
+        """
+        if not counts:
+            return
+        rows = [
+            {
+                "user_id": user_id,
+                "playlist_id": playlist_id,
+                "day": day,
+                **{column: values.get(column, 0) for column in SUMMARY_ACTIONS.values()}
+            }
+            for (user_id, playlist_id, day), values in counts.items()
+        ]
+        dialect_insert = _dialect_insert(db)
+        if dialect_insert is None:
+            self._add_counts_fallback(db, rows)
+        else:
+            table = ClassificationHistorySummary.__table__
+            stmt = dialect_insert(ClassificationHistorySummary)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(self.natural_key),
+                set_={
+                    **{column: table.c[column] + stmt.excluded[column] for column in SUMMARY_ACTIONS.values()},
+                    "updated_at": stmt.excluded.updated_at
+                }
+            )
+            db.execute(stmt, rows)
+        self._save(db, commit=commit)
+
+    def _add_counts_fallback(self, db: Session, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            db_obj = (
+                db.query(ClassificationHistorySummary)
+                .filter_by(user_id=row["user_id"], playlist_id=row["playlist_id"], day=row["day"])
+                .first()
+            )
+            if db_obj is None:
+                db.add(ClassificationHistorySummary(**row))
+                continue
+            for column in SUMMARY_ACTIONS.values():
+                setattr(db_obj, column, getattr(db_obj, column) + row[column])
+        db.flush()
+
+    def get_by_user(
+        self,
+        db: Session,
+        *,
+        user_id: int,
+        playlist_id: Optional[int] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None
+    ) -> List[ClassificationHistorySummary]:
+        """
+        ユーザーの日ごとの集計を日付順に返します（start 以上 end 未満）
+        """
+        query = db.query(ClassificationHistorySummary).filter(ClassificationHistorySummary.user_id == user_id)
+        if playlist_id is not None:
+            query = query.filter(ClassificationHistorySummary.playlist_id == playlist_id)
+        if start is not None:
+            query = query.filter(ClassificationHistorySummary.day >= start)
+        if end is not None:
+            query = query.filter(ClassificationHistorySummary.day < end)
+        return query.order_by(ClassificationHistorySummary.day, ClassificationHistorySummary.playlist_id).all()
+
+class CRUDClassificationHistoryArchive(CRUDBase[ClassificationHistoryArchive]):
+    def get_by_user_page(
+        self, db: Session, *, user_id: int, cursor: Optional[str] = None, limit: int = 100
+    ) -> CursorPage:
+        """
+        アーカイブ済みの履歴を新しいものから順にページを取得します
+        """
+        return self.paginate(
+            db.query(ClassificationHistoryArchive).filter(ClassificationHistoryArchive.user_id == user_id),
+            cursor=cursor,
+            limit=limit,
+            descending=True
+        )
+
+class CRUDPlaylistSuggestion(CRUDBase[PlaylistSuggestion]):
+    def get_by_user_page(
+        self, db: Session, *, user_id: int, cursor: Optional[str] = None, limit: int = 100
+    ) -> CursorPage:
+        return self.paginate(
+            db.query(PlaylistSuggestion).filter(PlaylistSuggestion.user_id == user_id),
+            cursor=cursor,
+            limit=limit
+        )
+
+    def delete_by_user(self, db: Session, *, user_id: int, commit: Optional[bool] = None) -> int:
+        """
+        ユーザーの提案をまとめて削除し、削除した行数を返します
+        """
+        count = (
+            db.query(PlaylistSuggestion)
+            .filter(PlaylistSuggestion.user_id == user_id)
+            .delete(synchronize_session=False)
+        )
+        self._save(db, commit=commit)
+        return count
+
 classification = CRUDClassification(Classification)
 classification_rule = CRUDClassificationRule(ClassificationRule)
-classification_history = CRUDClassificationHistory(ClassificationHistory) 
\ No newline at end of file
+classification_history = CRUDClassificationHistory(ClassificationHistory)
+classification_history_summary = CRUDClassificationHistorySummary(ClassificationHistorySummary)
+classification_history_archive = CRUDClassificationHistoryArchive(ClassificationHistoryArchive)
+playlist_suggestion = CRUDPlaylistSuggestion(PlaylistSuggestion) 
\ No newline at end of file
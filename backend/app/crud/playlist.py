@@ -1,23 +1,99 @@
-from typing import Optional, List
-from sqlalchemy.orm import Session
-from .base import CRUDBase
-from ..models.playlist import Playlist
+from typing import Optional, List, Sequence, Dict, Any, NamedTuple, Set, Tuple
+from sqlalchemy import exists, func, select, update
+from sqlalchemy.orm import Session, joinedload, selectinload
+from .base import CRUDBase, CursorPage, LoaderOptions, should_commit
+from ..models.classification import Classification
+from ..models.playlist import Playlist, PlaylistItemPage, playlist_videos
+from ..models.video import Video
+
+class PlaylistDashboard(NamedTuple):
+    playlist: Playlist
+    videos: List[Video]
+    classifications: List[Classification]
 
 class CRUDPlaylist(CRUDBase[Playlist]):
+    natural_key = ("youtube_playlist_id",)
+    # videos は dynamic のため先読みできない（get_dashboard を使う）
+    loader_presets = {
+        "user": (joinedload(Playlist.user),),
+        "classifications": (selectinload(Playlist.classifications).joinedload(Classification.video),),
+        "rules": (selectinload(Playlist.classification_rules),),
+        "item_pages": (selectinload(Playlist.item_pages),),
+    }
+
     def get_by_youtube_id(self, db: Session, *, youtube_id: str) -> Optional[Playlist]:
-        return db.query(Playlist).filter(Playlist.youtube_playlist_id == youtube_id).first()
+        return self.get_by_natural_key(db, "youtube_playlist_id", youtube_id)
 
     def get_by_user_id(
-        self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100
+        self,
+        db: Session,
+        *,
+        user_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        options: LoaderOptions = None
     ) -> List[Playlist]:
         return (
-            db.query(Playlist)
+            self.query(db, options=options)
             .filter(Playlist.user_id == user_id)
             .offset(skip)
             .limit(limit)
             .all()
         )
 
+    def get_by_user_id_page(
+        self,
+        db: Session,
+        *,
+        user_id: int,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        options: LoaderOptions = None
+    ) -> CursorPage:
+        return self.paginate(
+            self.query(db, options=options).filter(Playlist.user_id == user_id), cursor=cursor, limit=limit
+        )
+
+    def get_dashboard(self, db: Session, *, user_id: int) -> List[PlaylistDashboard]:
+        """
+        ユーザーのプレイリスト・所属動画・分類を、件数によらず3回のクエリで取得します
+        """
+        playlists = (
+            db.query(Playlist)
+            .filter(Playlist.user_id == user_id)
+            .order_by(Playlist.id)
+            .all()
+        )
+        videos: Dict[int, List[Video]] = {db_playlist.id: [] for db_playlist in playlists}
+        classifications: Dict[int, List[Classification]] = {db_playlist.id: [] for db_playlist in playlists}
+        if not playlists:
+            return []
+
+        rows = (
+            db.query(playlist_videos.c.playlist_id, Video)
+            .select_from(playlist_videos)
+            .join(Video, Video.id == playlist_videos.c.video_id)
+            .join(Playlist, Playlist.id == playlist_videos.c.playlist_id)
+            .filter(Playlist.user_id == user_id)
+            .order_by(playlist_videos.c.playlist_id, Video.id)
+        )
+        for playlist_id, db_video in rows:
+            videos[playlist_id].append(db_video)
+
+        # Classification.video は上で読み込んだ動画が識別マップから使われる
+        for db_classification in (
+            db.query(Classification)
+            .filter(Classification.user_id == user_id)
+            .order_by(Classification.id)
+        ):
+            if db_classification.playlist_id in classifications:
+                classifications[db_classification.playlist_id].append(db_classification)
+
+        return [
+            PlaylistDashboard(db_playlist, videos[db_playlist.id], classifications[db_playlist.id])
+            for db_playlist in playlists
+        ]
+
     def get_by_title(
         self, db: Session, *, title: str, user_id: int
     ) -> Optional[Playlist]:
@@ -27,18 +103,212 @@ class CRUDPlaylist(CRUDBase[Playlist]):
             .first()
         )
 
-    def add_video(self, db: Session, *, playlist: Playlist, video_id: int) -> Playlist:
-        playlist.videos.append(video_id)
-        db.add(playlist)
-        db.commit()
-        db.refresh(playlist)
+    def add_video(
+        self, db: Session, *, playlist: Playlist, video_id: int, commit: Optional[bool] = None
+    ) -> Playlist:
+        self.add_videos(db, playlist_id=playlist.id, video_ids=[video_id], commit=commit)
         return playlist
 
-    def remove_video(self, db: Session, *, playlist: Playlist, video_id: int) -> Playlist:
-        playlist.videos.remove(video_id)
-        db.add(playlist)
-        db.commit()
-        db.refresh(playlist)
+    def remove_video(
+        self, db: Session, *, playlist: Playlist, video_id: int, commit: Optional[bool] = None
+    ) -> Playlist:
+        self.remove_videos(db, playlist_id=playlist.id, video_ids=[video_id], commit=commit)
         return playlist
 
+    def has_video(self, db: Session, *, playlist_id: int, video_id: int) -> bool:
+        return db.query(
+            exists().where(
+                playlist_videos.c.playlist_id == playlist_id,
+                playlist_videos.c.video_id == video_id
+            )
+        ).scalar()
+
+    def count_videos(self, db: Session, *, playlist_id: int) -> int:
+        return db.query(func.count()).select_from(playlist_videos).filter(
+            playlist_videos.c.playlist_id == playlist_id
+        ).scalar()
+
+    def count_videos_by_playlist(
+        self, db: Session, *, playlist_ids: Sequence[int]
+    ) -> Dict[int, int]:
+        """
+        各プレイリストの動画数を {playlist_id: 件数} で返します（動画がない場合は0）
+        """
+        counts = dict.fromkeys(playlist_ids, 0)
+        if playlist_ids:
+            counts.update(
+                db.query(playlist_videos.c.playlist_id, func.count())
+                .filter(playlist_videos.c.playlist_id.in_(playlist_ids))
+                .group_by(playlist_videos.c.playlist_id)
+                .all()
+            )
+        return counts
+
+    def add_videos(
+        self,
+        db: Session,
+        *,
+        playlist_id: int,
+        video_ids: Sequence[int],
+        commit: Optional[bool] = None
+    ) -> int:
+        """
+        プレイリストに動画をまとめて追加し、追加した件数を返します（追加済みの動画は無視します）
+        """
+        if not video_ids:
+            return 0
+        existing = {
+            video_id
+            for (video_id,) in db.query(playlist_videos.c.video_id).filter(
+                playlist_videos.c.playlist_id == playlist_id,
+                playlist_videos.c.video_id.in_(video_ids)
+            )
+        }
+        new_ids = [video_id for video_id in dict.fromkeys(video_ids) if video_id not in existing]
+        if new_ids:
+            db.execute(
+                playlist_videos.insert(),
+                [{"playlist_id": playlist_id, "video_id": video_id} for video_id in new_ids]
+            )
+        if should_commit(db, commit):
+            db.commit()
+        return len(new_ids)
+
+    def remove_videos(
+        self,
+        db: Session,
+        *,
+        playlist_id: int,
+        video_ids: Sequence[int],
+        commit: Optional[bool] = None
+    ) -> int:
+        """
+        プレイリストから動画をまとめて削除し、削除した件数を返します
+        """
+        if not video_ids:
+            return 0
+        result = db.execute(
+            playlist_videos.delete().where(
+                playlist_videos.c.playlist_id == playlist_id,
+                playlist_videos.c.video_id.in_(video_ids)
+            )
+        )
+        if should_commit(db, commit):
+            db.commit()
+        return result.rowcount
+
+    def get_video_youtube_ids(self, db: Session, *, playlist_id: int) -> Dict[str, int]:
+        """
+        プレイリストに含まれる動画の {youtube_video_id: video_id} を返します
+        """
+        return dict(
+            db.query(Video.youtube_video_id, Video.id)
+            .join(playlist_videos, playlist_videos.c.video_id == Video.id)
+            .filter(playlist_videos.c.playlist_id == playlist_id)
+            .all()
+        )
+
+    def get_user_memberships(self, db: Session, *, user_id: int) -> Set[Tuple[int, int]]:
+        """
+        ユーザーの全プレイリストの所属を (video_id, playlist_id) の組の集合で返します
+        """
+        return {
+            (video_id, playlist_id)
+            for video_id, playlist_id in db.query(playlist_videos.c.video_id, playlist_videos.c.playlist_id)
+            .join(Playlist, Playlist.id == playlist_videos.c.playlist_id)
+            .filter(Playlist.user_id == user_id)
+        }
+
+    def export_statement(self, *, user_id: int):
+        """
+        エクスポート用のユーザーのプレイリストの列（idの昇順）
+        """
+        return (
+            select(
+                Playlist.id,
+                Playlist.youtube_playlist_id,
+                Playlist.title,
+                Playlist.description,
+                Playlist.created_at,
+                Playlist.updated_at
+            )
+            .where(Playlist.user_id == user_id)
+            .order_by(Playlist.id)
+        )
+
+    def membership_export_statement(self, *, user_id: int):
+        """
+        エクスポート用のユーザーのプレイリストの所属（プレイリスト・動画の順）
+        """
+        return (
+            select(playlist_videos.c.playlist_id, playlist_videos.c.video_id)
+            .join(Playlist, Playlist.id == playlist_videos.c.playlist_id)
+            .where(Playlist.user_id == user_id)
+            .order_by(playlist_videos.c.playlist_id, playlist_videos.c.video_id)
+        )
+
+    def set_etag(
+        self, db: Session, *, playlist_id: int, etag: Optional[str], commit: Optional[bool] = None
+    ) -> None:
+        """
+        playlists.list で取得したリソースのETagを保存します
+        """
+        db.execute(
+            update(Playlist)
+            .where(Playlist.id == playlist_id)
+            .values(etag=etag)
+            .execution_options(synchronize_session=False)
+        )
+        self._invalidate_ids(db, [playlist_id])
+        self._save(db, commit=commit)
+
+    def delete_missing(
+        self,
+        db: Session,
+        *,
+        user_id: int,
+        youtube_ids: Set[str],
+        commit: Optional[bool] = None
+    ) -> int:
+        """
+        youtube_ids に含まれないユーザーのプレイリストを削除し、削除した件数を返します
+
+        所属・分類・ルールなどは外部キーの ON DELETE CASCADE で削除されます。
+        """
+        ids = [
+            id for id, youtube_id in db.query(Playlist.id, Playlist.youtube_playlist_id).filter(Playlist.user_id == user_id)
+            if youtube_id not in youtube_ids
+        ]
+        if ids:
+            db.query(Playlist).filter(Playlist.id.in_(ids)).delete(synchronize_session=False)
+            self._invalidate_ids(db, ids)
+            self._save(db, commit=commit)
+        return len(ids)
+
+    def get_item_pages(self, db: Session, *, playlist_id: int) -> List[PlaylistItemPage]:
+        return (
+            db.query(PlaylistItemPage)
+            .filter(PlaylistItemPage.playlist_id == playlist_id)
+            .order_by(PlaylistItemPage.page_index)
+            .all()
+        )
+
+    def replace_item_pages(
+        self,
+        db: Session,
+        *,
+        playlist_id: int,
+        pages: Sequence[Dict[str, Any]],
+        commit: Optional[bool] = None
+    ) -> None:
+        """
+        プレイリストのページごとのETagを置き換えます
+        """
+        db.query(PlaylistItemPage).filter(PlaylistItemPage.playlist_id == playlist_id).delete()
+        db.add_all(
+            PlaylistItemPage(playlist_id=playlist_id, page_index=index, **page)
+            for index, page in enumerate(pages)
+        )
+        self._save(db, commit=commit)
+
 playlist = CRUDPlaylist(Playlist) 
\ No newline at end of file
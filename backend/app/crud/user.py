@@ -1,14 +1,21 @@
+from datetime import datetime
 from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from .base import CRUDBase
 from ..models.user import User
 
 class CRUDUser(CRUDBase[User]):
+    natural_key = ("email",)
+
     def get_by_email(self, db: Session, *, email: str) -> Optional[User]:
-        return db.query(User).filter(User.email == email).first()
+        return self.get_by_natural_key(db, "email", email)
+
+    async def aget_by_email(self, db: AsyncSession, *, email: str) -> Optional[User]:
+        return await db.run_sync(lambda session: self.get_by_email(session, email=email))
 
     def get_by_google_id(self, db: Session, *, google_id: str) -> Optional[User]:
-        return db.query(User).filter(User.google_id == google_id).first()
+        return self.get_by_natural_key(db, "google_id", google_id)
 
     def get_by_youtube_token(self, db: Session, *, access_token: str) -> Optional[User]:
         return db.query(User).filter(User.youtube_access_token == access_token).first()
@@ -19,16 +26,18 @@ class CRUDUser(CRUDBase[User]):
         *,
         db_obj: User,
         access_token: str,
-        refresh_token: str,
-        expires_at: Optional[str] = None
+        refresh_token: Optional[str] = None,
+        expires_at: Optional[datetime] = None,
+        commit: Optional[bool] = None
     ) -> User:
         db_obj.youtube_access_token = access_token
-        db_obj.youtube_refresh_token = refresh_token
+        # 更新時の応答にはリフレッシュトークンが含まれないことがあるため、その場合は既存の値を残す
+        if refresh_token:
+            db_obj.youtube_refresh_token = refresh_token
         if expires_at:
             db_obj.token_expires_at = expires_at
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        self._save(db, db_obj, commit=commit)
         return db_obj
 
 user = CRUDUser(User) 
\ No newline at end of file
@@ -1,23 +1,129 @@
-from typing import Optional, List
-from sqlalchemy.orm import Session
-from .base import CRUDBase
+from typing import Optional, List, Sequence, Iterator, Any, Dict, Union
+from sqlalchemy import select, and_, or_, func, literal, literal_column, table, column, update
+from sqlalchemy.orm import Session, joinedload, selectinload
+from .base import CRUDBase, CursorPage, LoaderOptions, encode_rank_cursor, decode_rank_cursor
 from ..models.video import Video
+from ..models.classification import Classification
+from ..models.playlist import Playlist, playlist_videos
+
+# SQLiteの全文検索用仮想テーブル（models/video.py のDDLで作成）
+videos_fts = table("videos_fts", column("rowid"))
+
+# trigramトークナイザーで検索できる語の最小文字数
+FTS_MIN_TERM_LENGTH = 3
+
+def _fts5_match_query(terms: Sequence[str]) -> str:
+    # 各語をフレーズとして引用し、FTS5の構文として解釈されないようにする
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
 
 class CRUDVideo(CRUDBase[Video]):
+    natural_key = ("youtube_video_id",)
+    loader_presets = {
+        "playlists": (selectinload(Video.playlists),),
+        "classifications": (selectinload(Video.classifications).joinedload(Classification.playlist),),
+    }
+
     def get_by_youtube_id(self, db: Session, *, youtube_id: str) -> Optional[Video]:
-        return db.query(Video).filter(Video.youtube_video_id == youtube_id).first()
+        return self.get_by_natural_key(db, "youtube_video_id", youtube_id)
+
+    def get_by_youtube_ids(
+        self, db: Session, *, youtube_ids: Sequence[str], options: LoaderOptions = None
+    ) -> List[Video]:
+        if not youtube_ids:
+            return []
+        return self.query(db, options=options).filter(Video.youtube_video_id.in_(youtube_ids)).all()
+
+    def user_video_ids_query(self, *, user_id: int):
+        """
+        ユーザーのプレイリストに含まれる動画IDのサブクエリ
+        """
+        return (
+            select(playlist_videos.c.video_id)
+            .join(Playlist, Playlist.id == playlist_videos.c.playlist_id)
+            .where(Playlist.user_id == user_id)
+        )
+
+    def export_statement(self, *, user_id: int):
+        """
+        エクスポート用のユーザーの動画の列（idの昇順）
+        """
+        return (
+            select(
+                Video.id,
+                Video.youtube_video_id,
+                Video.title,
+                Video.description,
+                Video.thumbnail_url,
+                Video.channel_id,
+                Video.channel_title,
+                Video.published_at,
+                Video.duration,
+                Video.view_count,
+                Video.like_count,
+                Video.tags
+            )
+            .where(Video.id.in_(self.user_video_ids_query(user_id=user_id)))
+            .order_by(Video.id)
+        )
+
+    def iter_user_video_rows(
+        self,
+        db: Session,
+        *,
+        user_id: int,
+        columns: Sequence[Any] = (),
+        batch_size: int = 1000
+    ) -> Iterator[List[Any]]:
+        """
+        ユーザーの動画を (id, *columns) の行としてidの昇順にbatch_size件ずつ返します
+
+        ORMオブジェクトを作らずキーセット方式で読むため、大きなライブラリでも軽量です。
+        """
+        member_ids = self.user_video_ids_query(user_id=user_id)
+        last_id = 0
+        while True:
+            rows = (
+                db.query(Video.id, *columns)
+                .filter(Video.id.in_(member_ids), Video.id > last_id)
+                .order_by(Video.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1].id
 
     def get_by_channel_id(
-        self, db: Session, *, channel_id: str, skip: int = 0, limit: int = 100
+        self,
+        db: Session,
+        *,
+        channel_id: str,
+        skip: int = 0,
+        limit: int = 100,
+        options: LoaderOptions = None
     ) -> List[Video]:
         return (
-            db.query(Video)
+            self.query(db, options=options)
             .filter(Video.channel_id == channel_id)
             .offset(skip)
             .limit(limit)
             .all()
         )
 
+    def get_by_channel_id_page(
+        self,
+        db: Session,
+        *,
+        channel_id: str,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        options: LoaderOptions = None
+    ) -> CursorPage:
+        return self.paginate(
+            self.query(db, options=options).filter(Video.channel_id == channel_id), cursor=cursor, limit=limit
+        )
+
     def get_by_title(
         self, db: Session, *, title: str, skip: int = 0, limit: int = 100
     ) -> List[Video]:
@@ -29,21 +135,115 @@ class CRUDVideo(CRUDBase[Video]):
             .all()
         )
 
+    def get_by_title_page(
+        self, db: Session, *, title: str, cursor: Optional[str] = None, limit: int = 100
+    ) -> CursorPage:
+        return self.paginate(
+            db.query(Video).filter(Video.title.ilike(f"%{title}%")), cursor=cursor, limit=limit
+        )
+
+    def search(
+        self,
+        db: Session,
+        *,
+        query: str,
+        user_id: Optional[int] = None,
+        cursor: Optional[str] = None,
+        limit: int = 20
+    ) -> CursorPage:
+        """
+        タイトル・説明・タグ・チャンネル名を全文検索し、関連度の高い順にページを返します
+
+        SQLiteではFTS5 (bm25)、PostgreSQLではtsvector (ts_rank_cd) を使います。
+        trigramで扱えない3文字未満の語を含む場合は部分一致で検索します。
+        user_id を指定するとそのユーザーのプレイリストに含まれる動画に絞ります。
+        """
+        terms = query.split()
+        if not terms:
+            return CursorPage([], None)
+
+        dialect = db.get_bind().dialect.name
+        if dialect == "sqlite" and all(len(term) >= FTS_MIN_TERM_LENGTH for term in terms):
+            rank = literal_column("bm25(videos_fts, 10.0, 2.0, 5.0, 5.0)")
+            q = (
+                db.query(Video, rank.label("rank"))
+                .join(videos_fts, videos_fts.c.rowid == Video.id)
+                .filter(literal_column("videos_fts").op("MATCH")(_fts5_match_query(terms)))
+            )
+        elif dialect == "postgresql":
+            search_vector = literal_column("videos.search_vector")
+            ts_query = func.websearch_to_tsquery("simple", query)
+            rank = -func.ts_rank_cd(search_vector, ts_query)
+            q = db.query(Video, rank.label("rank")).filter(search_vector.op("@@")(ts_query))
+        else:
+            rank = literal(0.0)
+            q = db.query(Video, rank.label("rank")).filter(and_(*(
+                or_(
+                    Video.title.ilike(f"%{term}%"),
+                    Video.description.ilike(f"%{term}%"),
+                    Video.channel_title.ilike(f"%{term}%")
+                )
+                for term in terms
+            )))
+
+        if user_id is not None:
+            q = q.filter(Video.id.in_(self.user_video_ids_query(user_id=user_id)))
+        if cursor is not None:
+            last_rank, last_id = decode_rank_cursor(cursor)
+            q = q.filter(or_(rank > last_rank, and_(rank == last_rank, Video.id > last_id)))
+        rows = q.order_by(rank, Video.id).limit(limit + 1).all()
+        items = [row[0] for row in rows[:limit]]
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            return CursorPage(items, encode_rank_cursor(float(last.rank), last[0].id))
+        return CursorPage(items, None)
+
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: Video,
+        obj_in: Union[Dict[str, Any], Video],
+        commit: Optional[bool] = None
+    ) -> Video:
+        # タイトル・説明が変わった場合は署名を消し、次回の重複検出で計算し直す
+        fields = obj_in if isinstance(obj_in, dict) else obj_in.__dict__
+        if "minhash" not in fields and any(
+            field in fields and fields[field] != getattr(db_obj, field) for field in ("title", "description")
+        ):
+            db_obj.minhash = None
+        return super().update(db, db_obj=db_obj, obj_in=obj_in, commit=commit)
+
+    def set_minhashes(
+        self, db: Session, *, signatures: Dict[int, bytes], commit: Optional[bool] = None
+    ) -> int:
+        """
+        {video_id: 署名} をまとめて保存し、更新した行数を返します
+        """
+        if not signatures:
+            return 0
+        db.execute(update(Video), [
+            {"id": video_id, "minhash": signature} for video_id, signature in signatures.items()
+        ])
+        self._invalidate_ids(db, list(signatures))
+        self._save(db, commit=commit)
+        return len(signatures)
+
     def update_stats(
         self,
         db: Session,
         *,
         db_obj: Video,
         view_count: Optional[int] = None,
-        like_count: Optional[int] = None
+        like_count: Optional[int] = None,
+        commit: Optional[bool] = None
     ) -> Video:
         if view_count is not None:
             db_obj.view_count = view_count
         if like_count is not None:
             db_obj.like_count = like_count
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        self._save(db, db_obj, commit=commit)
         return db_obj
 
 video = CRUDVideo(Video) 
\ No newline at end of file
@@ -1,16 +1,162 @@
-from sqlalchemy import create_engine
+import threading
+from typing import Any, AsyncIterator, Dict, Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from sqlalchemy.ext.declarative import declarative_base
 from .models.base import BaseModel
-from .config import settings
+from .config import Settings, settings
 
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# "default": SQLAlchemyの既定値のまま、"tuned": 下記の設定を適用
+ENGINE_PROFILES = ("default", "tuned")
+
+# 非同期エンジンで使うドライバー
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg"
+}
+
+def _is_memory_database(database: Optional[str]) -> bool:
+    return database in (None, "", ":memory:") or "mode=memory" in database
+
+def sqlite_pragmas(config: Settings = settings) -> Dict[str, Any]:
+    """
+    tunedプロファイルで接続ごとに設定するSQLiteのPRAGMA
+    """
+    return {
+        "journal_mode": config.SQLITE_JOURNAL_MODE,
+        "synchronous": config.SQLITE_SYNCHRONOUS,
+        "mmap_size": config.SQLITE_MMAP_SIZE,
+        "cache_size": config.SQLITE_CACHE_SIZE,
+        "busy_timeout": config.SQLITE_BUSY_TIMEOUT_MS,
+        "foreign_keys": "ON"
+    }
+
+def engine_options(url: str, profile: str, config: Settings = settings) -> Dict[str, Any]:
+    """
+    URLとプロファイルから create_engine に渡す引数を作成します
+    """
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"unknown database engine profile: {profile}")
+    url_obj = make_url(url)
+    backend = url_obj.get_backend_name()
+
+    if backend == "sqlite":
+        options: Dict[str, Any] = {"connect_args": {"check_same_thread": False}}
+        if _is_memory_database(url_obj.database):
+            # インメモリDBは接続ごとに別のDBになるため、1つの接続を共有する
+            options["poolclass"] = StaticPool
+        return options
+
+    if profile == "default":
+        return {}
+    options = {
+        "pool_size": config.DATABASE_POOL_SIZE,
+        "max_overflow": config.DATABASE_MAX_OVERFLOW,
+        "pool_timeout": config.DATABASE_POOL_TIMEOUT,
+        "pool_recycle": config.DATABASE_POOL_RECYCLE,
+        "pool_pre_ping": config.DATABASE_POOL_PRE_PING
+    }
+    if backend == "postgresql" and config.DATABASE_STATEMENT_TIMEOUT_MS:
+        options["connect_args"] = {
+            "options": f"-c statement_timeout={config.DATABASE_STATEMENT_TIMEOUT_MS}"
+        }
+    return options
+
+def _install_sqlite_pragmas(engine: Engine, config: Settings) -> None:
+    pragmas = sqlite_pragmas(config)
+    if _is_memory_database(engine.url.database):
+        # インメモリDBではWALとmmapは使えない
+        pragmas.pop("journal_mode")
+        pragmas.pop("mmap_size")
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def create_db_engine(
+    url: Optional[str] = None, *, profile: Optional[str] = None, config: Settings = settings
+) -> Engine:
+    """
+    設定したプロファイルでエンジンを作成します
+    """
+    url = url or config.DATABASE_URL
+    profile = profile or config.DATABASE_ENGINE_PROFILE
+    engine = create_engine(url, **engine_options(url, profile, config))
+    if engine.dialect.name == "sqlite" and profile == "tuned":
+        _install_sqlite_pragmas(engine, config)
+    return engine
+
+def async_database_url(url: str) -> str:
+    """
+    同期用のURLを非同期ドライバーのURLに変換します（例: sqlite:// → sqlite+aiosqlite://）
+    """
+    url_obj = make_url(url)
+    backend = url_obj.get_backend_name()
+    driver = ASYNC_DRIVERS.get(backend)
+    if driver is None:
+        raise ValueError(f"no async driver for database backend: {backend}")
+    return url_obj.set(drivername=f"{backend}+{driver}").render_as_string(hide_password=False)
+
+def async_engine_options(url: str, profile: str, config: Settings = settings) -> Dict[str, Any]:
+    """
+    非同期エンジン用の create_async_engine の引数を作成します
+    """
+    options = engine_options(url, profile, config)
+    connect_args = options.pop("connect_args", {})
+    # aiosqliteは専用のスレッドで接続を扱うため check_same_thread は不要
+    connect_args.pop("check_same_thread", None)
+    statement_options = connect_args.pop("options", None)
+    if statement_options is not None:
+        # asyncpgでは server_settings で渡す
+        connect_args["server_settings"] = {
+            "statement_timeout": str(config.DATABASE_STATEMENT_TIMEOUT_MS)
+        }
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+def create_async_db_engine(
+    url: Optional[str] = None, *, profile: Optional[str] = None, config: Settings = settings
+) -> AsyncEngine:
+    """
+    設定したプロファイルで非同期エンジンを作成します
+    """
+    url = url or config.DATABASE_URL
+    profile = profile or config.DATABASE_ENGINE_PROFILE
+    engine = create_async_engine(async_database_url(url), **async_engine_options(url, profile, config))
+    if engine.dialect.name == "sqlite" and profile == "tuned":
+        _install_sqlite_pragmas(engine.sync_engine, config)
+    return engine
+
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+_async_session_factory: Optional[async_sessionmaker] = None
+_async_session_factory_lock = threading.Lock()
+
+def get_async_session_factory() -> async_sessionmaker:
+    """
+    非同期セッションの作成関数を返します
+
+    非同期ドライバーのないデータベースでもアプリを読み込めるよう、非同期エンジンは最初に使うときに作成します。
+    """
+    global _async_session_factory
+    with _async_session_factory_lock:
+        if _async_session_factory is None:
+            # 非同期ではコミット後の遅延読み込みができないため、コミット後も属性を保持する
+            _async_session_factory = async_sessionmaker(
+                create_async_db_engine(SQLALCHEMY_DATABASE_URL), autoflush=False, expire_on_commit=False
+            )
+        return _async_session_factory
+
 # データベースの初期化
 def init_db():
     BaseModel.metadata.create_all(bind=engine)
@@ -21,4 +167,19 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+# セッションの作成関数の取得
+def get_session_factory() -> sessionmaker:
+    """
+    StreamingResponse の生成関数で使うセッションの作成関数を返します（依存性注入用）
+
+    get_db のセッションはレスポンスの送信前に閉じられるため、
+    ストリーミング中に読み込む場合は生成関数の中で自前のセッションを開きます。
+    """
+    return SessionLocal
+
+# 非同期データベースセッションの取得
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    async with get_async_session_factory()() as db:
+        yield db
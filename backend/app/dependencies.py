@@ -0,0 +1,66 @@
+from fastapi import Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from .database import get_async_db, get_db
+from .models.user import User
+from .services.session_token import InvalidSessionTokenError, decode_session_token
+from .services.user_cache import UserCache, get_user_cache
+
+def get_bearer_token(request: Request) -> str:
+    """
+    AuthorizationヘッダーからBearerトークンを取り出します
+    """
+    authorization = request.headers.get("Authorization")
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(
+            status_code=401,
+            detail="認証が必要です"
+        )
+    return authorization.split(" ", 1)[1]
+
+def get_current_user(
+    token: str = Depends(get_bearer_token),
+    cache: UserCache = Depends(get_user_cache),
+    db: Session = Depends(get_db)
+) -> User:
+    """
+    セッショントークンを検証し、ログイン中のユーザーを返します
+
+    トークンの検証はローカルで完結し、ユーザーは短時間キャッシュされるため、
+    通常のリクエストではGoogleへの通信もusersテーブルへのSELECTも発生しません。
+    """
+    user = cache.get(db, _decode_user_id(token))
+    if not user:
+        raise HTTPException(
+            status_code=401,
+            detail="認証に失敗しました"
+        )
+    return user
+
+async def aget_current_user(
+    token: str = Depends(get_bearer_token),
+    cache: UserCache = Depends(get_user_cache),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """
+    get_current_user の AsyncSession 版です
+
+    get_async_db を使うルートで使うと、ユーザーの読み込みとルートの処理が同じセッションになり、
+    リクエストごとに同期・非同期の2つのセッションを開かずに済みます。
+    """
+    user = await cache.aget(db, _decode_user_id(token))
+    if not user:
+        raise HTTPException(
+            status_code=401,
+            detail="認証に失敗しました"
+        )
+    return user
+
+def _decode_user_id(token: str) -> int:
+    try:
+        return decode_session_token(token)
+    except InvalidSessionTokenError:
+        raise HTTPException(
+            status_code=401,
+            detail="認証に失敗しました"
+        )
@@ -1,8 +1,21 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import youtube, auth
+from .routers import youtube, auth, library
+from .services.http_clients import http_clients_lifespan
+from .services.session_token import session_secret_key
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # セッションの署名鍵が設定されていなければ起動しない
+    session_secret_key()
+    # 共有のHTTPクライアントはアプリの起動時に作成し、終了時に閉じる
+    async with http_clients_lifespan(app):
+        yield
 
-app = FastAPI(title="YouTube Playlist Organizer")
+app = FastAPI(title="YouTube Playlist Organizer", lifespan=lifespan)
 
 # CORS設定
 app.add_middleware(
@@ -16,6 +29,7 @@ app.add_middleware(
 # ルーターの追加
 app.include_router(auth.router)
 app.include_router(youtube.router)
+app.include_router(library.router)
 
 @app.get("/")
 async def root():
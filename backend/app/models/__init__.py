@@ -1,15 +1,26 @@
 from .base import BaseModel
 from .user import User
 from .video import Video
-from .playlist import Playlist
-from .classification import Classification, ClassificationRule, ClassificationHistory
+from .playlist import Playlist, PlaylistItemPage
+from .classification import (
+    Classification,
+    ClassificationRule,
+    ClassificationHistory,
+    ClassificationHistorySummary,
+    ClassificationHistoryArchive,
+    PlaylistSuggestion,
+)
 
 __all__ = [
     'BaseModel',
     'User',
     'Video',
     'Playlist',
+    'PlaylistItemPage',
     'Classification',
     'ClassificationRule',
-    'ClassificationHistory'
+    'ClassificationHistory',
+    'ClassificationHistorySummary',
+    'ClassificationHistoryArchive',
+    'PlaylistSuggestion'
 ] 
\ No newline at end of file
@@ -1,15 +1,26 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, JSON, Index, DateTime, Date
 from sqlalchemy.orm import relationship
 from .base import BaseModel
 
 class Classification(BaseModel):
     __tablename__ = "classifications"
+    __table_args__ = (
+        Index("ix_classifications_user_id_id", "user_id", "id"),
+        Index("ix_classifications_status_id", "status", "id"),
+        Index("uq_classifications_video_id_playlist_id", "video_id", "playlist_id", unique=True),
+    )
     
     video_id = Column(Integer, ForeignKey("videos.id", ondelete="CASCADE"), nullable=False)
     playlist_id = Column(Integer, ForeignKey("playlists.id", ondelete="CASCADE"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     confidence = Column(Float, nullable=True)
     status = Column(String, nullable=False)  # pending, completed, failed
+    # ワーカーによる処理の状態（services/classification_worker.py）
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    lease_token = Column(String(36), nullable=True)
+    locked_until = Column(DateTime, nullable=True)
+    next_attempt_at = Column(DateTime, nullable=True)
+    last_error = Column(String, nullable=True)
 
     # リレーションシップ
     video = relationship("Video", back_populates="classifications", passive_deletes=True)
@@ -18,6 +29,9 @@ class Classification(BaseModel):
 
 class ClassificationRule(BaseModel):
     __tablename__ = "classification_rules"
+    __table_args__ = (
+        Index("ix_classification_rules_user_id_playlist_id_priority", "user_id", "playlist_id", "priority"),
+    )
     
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     playlist_id = Column(Integer, ForeignKey("playlists.id", ondelete="CASCADE"), nullable=False)
@@ -31,6 +45,11 @@ class ClassificationRule(BaseModel):
 
 class ClassificationHistory(BaseModel):
     __tablename__ = "classification_histories"
+    __table_args__ = (
+        Index("ix_classification_histories_user_id_id", "user_id", "id"),
+        Index("ix_classification_histories_video_id_playlist_id", "video_id", "playlist_id"),
+        Index("ix_classification_histories_created_at", "created_at"),
+    )
     
     video_id = Column(Integer, ForeignKey("videos.id", ondelete="CASCADE"), nullable=False)
     playlist_id = Column(Integer, ForeignKey("playlists.id", ondelete="CASCADE"), nullable=False)
@@ -40,4 +59,53 @@ class ClassificationHistory(BaseModel):
     # リレーションシップ
     video = relationship("Video", back_populates="classification_histories", passive_deletes=True)
     playlist = relationship("Playlist", back_populates="classification_histories", passive_deletes=True)
-    user = relationship("User", back_populates="classification_histories", passive_deletes=True) 
\ No newline at end of file
+    user = relationship("User", back_populates="classification_histories", passive_deletes=True)
+
+class ClassificationHistorySummary(BaseModel):
+    """
+    保持期間を過ぎた ClassificationHistory を (ユーザー, プレイリスト, 日) ごとに集計したもの
+    """
+    __tablename__ = "classification_history_summaries"
+    __table_args__ = (
+        Index("uq_classification_history_summaries_user_playlist_day", "user_id", "playlist_id", "day", unique=True),
+    )
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    playlist_id = Column(Integer, ForeignKey("playlists.id", ondelete="CASCADE"), nullable=False)
+    day = Column(Date, nullable=False)
+    added = Column(Integer, nullable=False, default=0, server_default="0")
+    removed = Column(Integer, nullable=False, default=0, server_default="0")
+    modified = Column(Integer, nullable=False, default=0, server_default="0")
+
+class ClassificationHistoryArchive(BaseModel):
+    """
+    保持期間を過ぎた ClassificationHistory の元の行（idはそのまま引き継ぎます）
+
+    動画・プレイリストが削除されても残すため、video_id と playlist_id には外部キーを付けません。
+    """
+    __tablename__ = "classification_history_archives"
+    __table_args__ = (
+        Index("ix_classification_history_archives_user_id_id", "user_id", "id"),
+    )
+
+    video_id = Column(Integer, nullable=False)
+    playlist_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    action = Column(String, nullable=False)
+
+class PlaylistSuggestion(BaseModel):
+    """
+    内容の近さから提案したプレイリスト（services/similarity.py）
+
+    Classification とは別のテーブルに保存するため、提案は分類済みとして扱われません。
+    """
+    __tablename__ = "playlist_suggestions"
+    __table_args__ = (
+        Index("ix_playlist_suggestions_user_id_id", "user_id", "id"),
+        Index("uq_playlist_suggestions_video_id_playlist_id", "video_id", "playlist_id", unique=True),
+    )
+
+    video_id = Column(Integer, ForeignKey("videos.id", ondelete="CASCADE"), nullable=False)
+    playlist_id = Column(Integer, ForeignKey("playlists.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    confidence = Column(Float, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Table, JSON, Index
 from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql import func
 from .base import BaseModel
@@ -9,24 +9,32 @@ import re
 playlist_videos = Table(
     'playlist_videos',
     BaseModel.metadata,
-    Column('playlist_id', Integer, ForeignKey('playlists.id', ondelete='CASCADE')),
-    Column('video_id', Integer, ForeignKey('videos.id', ondelete='CASCADE'))
+    Column('playlist_id', Integer, ForeignKey('playlists.id', ondelete='CASCADE'), primary_key=True),
+    Column('video_id', Integer, ForeignKey('videos.id', ondelete='CASCADE'), primary_key=True),
+    Index('ix_playlist_videos_video_id', 'video_id')
 )
 
 class Playlist(BaseModel):
     __tablename__ = "playlists"
+    __table_args__ = (
+        Index("ix_playlists_user_id_id", "user_id", "id"),
+    )
 
     youtube_playlist_id = Column(String(50), unique=True)  # YouTubeのプレイリストIDは通常短い
     title = Column(String(100))  # タイトルは100文字以内
     description = Column(String(500))  # 説明は500文字以内
     user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'))
+    etag = Column(String)  # playlists.list で取得したリソースのETag
 
     # リレーションシップ
     user = relationship("User", back_populates="playlists", passive_deletes=True)
-    videos = relationship("Video", secondary=playlist_videos, back_populates="playlists")
+    # 数千件の動画を持つプレイリストもあるため、コレクション全体は読み込まずクエリとして扱う
+    # （所属の追加・削除は crud.playlist.add_videos / remove_videos で行う）
+    videos = relationship("Video", secondary=playlist_videos, back_populates="playlists", lazy="dynamic", passive_deletes=True)
     classifications = relationship("Classification", back_populates="playlist", cascade="all, delete-orphan", passive_deletes=True)
     classification_rules = relationship("ClassificationRule", back_populates="playlist", cascade="all, delete-orphan", passive_deletes=True)
     classification_histories = relationship("ClassificationHistory", back_populates="playlist", cascade="all, delete-orphan", passive_deletes=True)
+    item_pages = relationship("PlaylistItemPage", back_populates="playlist", cascade="all, delete-orphan", passive_deletes=True, order_by="PlaylistItemPage.page_index")
 
     @validates('user_id')
     def validate_user_id(self, key, value):
@@ -55,4 +63,21 @@ class Playlist(BaseModel):
     def validate_description(self, key, value):
         if value and len(value) > 500:
             raise ValueError(f"{key} must be 500 characters or less")
-        return value 
\ No newline at end of file
+        return value 
+
+class PlaylistItemPage(BaseModel):
+    """playlistItems.list の各ページのETagと、そのページに含まれる動画ID"""
+    __tablename__ = "playlist_item_pages"
+    __table_args__ = (
+        Index("ix_playlist_item_pages_playlist_id_page_index", "playlist_id", "page_index"),
+    )
+
+    playlist_id = Column(Integer, ForeignKey('playlists.id', ondelete='CASCADE'), nullable=False)
+    page_index = Column(Integer, nullable=False)
+    page_token = Column(String)  # 先頭ページはNone
+    next_page_token = Column(String)
+    etag = Column(String, nullable=False)
+    video_ids = Column(JSON, nullable=False)  # YouTubeの動画IDのリスト
+
+    # リレーションシップ
+    playlist = relationship("Playlist", back_populates="item_pages", passive_deletes=True)
@@ -1,10 +1,13 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Index, DDL, LargeBinary, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .base import BaseModel
 
 class Video(BaseModel):
     __tablename__ = "videos"
+    __table_args__ = (
+        Index("ix_videos_channel_id_id", "channel_id", "id"),
+    )
 
     youtube_video_id = Column(String, unique=True)
     title = Column(String)
@@ -17,8 +20,48 @@ class Video(BaseModel):
     view_count = Column(Integer)
     like_count = Column(Integer)
     tags = Column(JSON)
+    # タイトル・説明のMinHash署名（services/duplicates.py）
+    minhash = Column(LargeBinary, nullable=True)
 
     # リレーションシップ
     playlists = relationship("Playlist", secondary="playlist_videos", back_populates="videos")
     classifications = relationship("Classification", back_populates="video", cascade="all, delete-orphan", passive_deletes=True)
-    classification_histories = relationship("ClassificationHistory", back_populates="video", cascade="all, delete-orphan", passive_deletes=True) 
\ No newline at end of file
+    classification_histories = relationship("ClassificationHistory", back_populates="video", cascade="all, delete-orphan", passive_deletes=True) 
+
+# 全文検索インデックス
+# SQLite: videos を外部コンテンツとするFTS5仮想テーブルをトリガーで同期します。
+#   日本語は空白で区切られないため trigram トークナイザーを使います。
+# PostgreSQL: 生成列 search_vector (tsvector) とGINインデックスを使います。
+VIDEO_FTS_COLUMNS = ("title", "description", "tags", "channel_title")
+
+SQLITE_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS videos_fts USING fts5("
+    "title, description, tags, channel_title, "
+    "content='videos', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS videos_fts_ai AFTER INSERT ON videos BEGIN "
+    "INSERT INTO videos_fts(rowid, title, description, tags, channel_title) "
+    "VALUES (new.id, new.title, new.description, new.tags, new.channel_title); END",
+    "CREATE TRIGGER IF NOT EXISTS videos_fts_ad AFTER DELETE ON videos BEGIN "
+    "INSERT INTO videos_fts(videos_fts, rowid, title, description, tags, channel_title) "
+    "VALUES ('delete', old.id, old.title, old.description, old.tags, old.channel_title); END",
+    "CREATE TRIGGER IF NOT EXISTS videos_fts_au AFTER UPDATE OF title, description, tags, channel_title ON videos BEGIN "
+    "INSERT INTO videos_fts(videos_fts, rowid, title, description, tags, channel_title) "
+    "VALUES ('delete', old.id, old.title, old.description, old.tags, old.channel_title); "
+    "INSERT INTO videos_fts(rowid, title, description, tags, channel_title) "
+    "VALUES (new.id, new.title, new.description, new.tags, new.channel_title); END",
+]
+
+POSTGRESQL_FTS_DDL = [
+    "ALTER TABLE videos ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(tags::text, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(channel_title, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')) STORED",
+    "CREATE INDEX ix_videos_search_vector ON videos USING GIN (search_vector)",
+]
+
+for _statement in SQLITE_FTS_DDL:
+    event.listen(Video.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+event.listen(Video.__table__, "before_drop", DDL("DROP TABLE IF EXISTS videos_fts").execute_if(dialect="sqlite"))
+for _statement in POSTGRESQL_FTS_DDL:
+    event.listen(Video.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
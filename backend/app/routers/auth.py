@@ -1,11 +1,16 @@
 from fastapi import APIRouter, HTTPException, Depends, Request
 from fastapi.security import OAuth2AuthorizationCodeBearer
-from google.oauth2 import id_token
-from google.auth.transport import requests
 from ..config import settings
 from ..models.user import User
-from ..database import get_db
-from sqlalchemy.orm import Session
+from ..crud import user as crud_user
+from ..database import get_async_db
+from ..dependencies import get_current_user
+from ..services.http_clients import get_oauth_http_client
+from ..services.id_token_verifier import id_token_verifier
+from ..services.session_token import create_session_token
+from ..services.token_refresh import token_expires_at
+from ..services.user_cache import user_cache
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.responses import RedirectResponse
 import httpx
 import json
@@ -52,7 +57,11 @@ async def google_auth_start():
     return RedirectResponse(auth_url)
 
 @router.get("/google/callback")
-async def google_auth_callback(code: str, db: Session = Depends(get_db)):
+async def google_auth_callback(
+    code: str,
+    db: AsyncSession = Depends(get_async_db),
+    client: httpx.AsyncClient = Depends(get_oauth_http_client)
+):
     """
     Google OAuth2認証のコールバックを処理します
     """
@@ -67,86 +76,88 @@ async def google_auth_callback(code: str, db: Session = Depends(get_db)):
             "redirect_uri": settings.GOOGLE_REDIRECT_URI
         }
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(token_url, data=token_data)
-            token_response = response.json()
-            
-            if "error" in token_response:
-                print(f"Token Error Response: {json.dumps(token_response, indent=2)}")
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"トークン取得エラー: {token_response['error']}"
-                )
-            
-            if "id_token" not in token_response:
-                print(f"Token Response without id_token: {json.dumps(token_response, indent=2)}")
-                raise HTTPException(
-                    status_code=400,
-                    detail="IDトークンが取得できませんでした"
-                )
+        response = await client.post(token_url, data=token_data)
+        token_response = response.json()
+        
+        if "error" in token_response:
+            print(f"Token Error Response: {json.dumps(token_response, indent=2)}")
+            raise HTTPException(
+                status_code=400,
+                detail=f"トークン取得エラー: {token_response['error']}"
+            )
+        
+        if "id_token" not in token_response:
+            print(f"Token Response without id_token: {json.dumps(token_response, indent=2)}")
+            raise HTTPException(
+                status_code=400,
+                detail="IDトークンが取得できませんでした"
+            )
 
-            try:
-                # IDトークンの検証
-                idinfo = id_token.verify_oauth2_token(
-                    token_response["id_token"], 
-                    requests.Request(), 
-                    settings.GOOGLE_CLIENT_ID
-                )
-            except Exception as e:
-                print(f"Token Verification Error: {str(e)}")
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"トークンの検証に失敗しました: {str(e)}"
-                )
+        try:
+            # IDトークンの検証
+            idinfo = id_token_verifier.verify(token_response["id_token"])
+        except Exception as e:
+            print(f"Token Verification Error: {str(e)}")
+            raise HTTPException(
+                status_code=400,
+                detail=f"トークンの検証に失敗しました: {str(e)}"
+            )
 
-            # ユーザー情報の取得
-            email = idinfo.get('email')
-            if not email:
-                raise HTTPException(
-                    status_code=400,
-                    detail="メールアドレスが取得できませんでした"
-                )
+        # ユーザー情報の取得
+        email = idinfo.get('email')
+        if not email:
+            raise HTTPException(
+                status_code=400,
+                detail="メールアドレスが取得できませんでした"
+            )
 
-            name = idinfo.get('name', '')
-            picture = idinfo.get('picture', '')
-            google_id = idinfo.get('sub', '')  # GoogleのユーザーID
+        name = idinfo.get('name', '')
+        picture = idinfo.get('picture', '')
+        google_id = idinfo.get('sub', '')  # GoogleのユーザーID
 
-            # データベースでユーザーを検索または作成
-            user = db.query(User).filter(User.email == email).first()
-            if not user:
-                user = User(
-                    email=email,
-                    name=name,
-                    picture_url=picture,
-                    google_id=google_id,
-                    youtube_access_token=token_response.get("access_token", ""),
-                    youtube_refresh_token=token_response.get("refresh_token", ""),
-                    token_expires_at=None  # TODO: トークンの有効期限を設定
-                )
-                db.add(user)
-            else:
-                # 既存ユーザーの情報を更新
-                user.name = name
-                user.picture_url = picture
-                user.google_id = google_id
-                user.youtube_access_token = token_response.get("access_token", "")
-                user.youtube_refresh_token = token_response.get("refresh_token", "")
-                user.token_expires_at = None  # TODO: トークンの有効期限を設定
+        expires_at = token_expires_at(token_response.get("expires_in"))
 
-            db.commit()
-            db.refresh(user)
+        # データベースでユーザーを検索または作成
+        user = await crud_user.aget_by_email(db, email=email)
+        if not user:
+            user = User(
+                email=email,
+                name=name,
+                picture_url=picture,
+                google_id=google_id,
+                youtube_access_token=token_response.get("access_token", ""),
+                youtube_refresh_token=token_response.get("refresh_token", ""),
+                token_expires_at=expires_at
+            )
+            db.add(user)
+        else:
+            # 既存ユーザーの情報を更新
+            user.name = name
+            user.picture_url = picture
+            user.google_id = google_id
+            user.youtube_access_token = token_response.get("access_token", "")
+            user.youtube_refresh_token = token_response.get("refresh_token", "")
+            user.token_expires_at = expires_at
+
+        await db.commit()
+        await db.refresh(user)
+        user_cache.invalidate(user.id)
+        crud_user.invalidate_cache(user)
 
-            return {
-                "access_token": token_response["access_token"],
-                "id_token": token_response["id_token"],
-                "user": {
-                    "id": user.id,
-                    "email": user.email,
-                    "name": user.name,
-                    "picture_url": user.picture_url,
-                    "google_id": user.google_id
-                }
+        return {
+            "access_token": token_response["access_token"],
+            "id_token": token_response["id_token"],
+            "session_token": create_session_token(user.id),
+            "token_type": "bearer",
+            "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+            "user": {
+                "id": user.id,
+                "email": user.email,
+                "name": user.name,
+                "picture_url": user.picture_url,
+                "google_id": user.google_id
             }
+        }
 
     except HTTPException as he:
         raise he
@@ -158,50 +169,13 @@ async def google_auth_callback(code: str, db: Session = Depends(get_db)):
         )
 
 @router.get("/me")
-async def get_current_user(
-    request: Request,
-    db: Session = Depends(get_db)
-):
+async def get_current_user_info(user: User = Depends(get_current_user)):
     """
     現在のユーザー情報を取得します
     """
-    try:
-        # リクエストヘッダーからトークンを取得
-        token = request.headers.get("Authorization")
-        if not token or not token.startswith("Bearer "):
-            raise HTTPException(
-                status_code=401,
-                detail="認証が必要です"
-            )
-        
-        token = token.split(" ")[1]
-        
-        # トークンの検証
-        idinfo = id_token.verify_oauth2_token(
-            token, 
-            requests.Request(), 
-            settings.GOOGLE_CLIENT_ID
-        )
-
-        # ユーザー情報の取得
-        email = idinfo['email']
-        user = db.query(User).filter(User.email == email).first()
-        
-        if not user:
-            raise HTTPException(
-                status_code=404,
-                detail="ユーザーが見つかりません"
-            )
-
-        return {
-            "id": user.id,
-            "email": user.email,
-            "name": user.name,
-            "picture_url": user.picture_url
-        }
-
-    except Exception as e:
-        raise HTTPException(
-            status_code=401,
-            detail="認証に失敗しました"
-        ) 
\ No newline at end of file
+    return {
+        "id": user.id,
+        "email": user.email,
+        "name": user.name,
+        "picture_url": user.picture_url
+    }
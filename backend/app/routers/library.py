@@ -0,0 +1,140 @@
+from typing import Literal, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from ..crud import playlist as crud_playlist, video as crud_video
+from ..crud.base import InvalidCursorError
+from ..database import get_async_db, get_session_factory
+from ..dependencies import aget_current_user, get_current_user
+from ..models.user import User
+from ..models.video import Video
+from ..services.duplicates import DEFAULT_THRESHOLD, find_duplicate_videos
+from ..services.library_export import EXPORT_RESOURCES, export_csv, export_media_type, export_ndjson
+
+router = APIRouter(
+    prefix="/library",
+    tags=["library"]
+)
+
+def video_to_dict(video: Video) -> dict:
+    return {
+        "id": video.id,
+        "youtube_video_id": video.youtube_video_id,
+        "title": video.title,
+        "channel_id": video.channel_id,
+        "channel_title": video.channel_title,
+        "thumbnail_url": video.thumbnail_url,
+        "published_at": video.published_at,
+        "tags": video.tags
+    }
+
+@router.get("/search")
+async def search_library(
+    q: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    user: User = Depends(aget_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    ユーザーのライブラリ内の動画を全文検索します（YouTube APIのクォータは消費しません）
+    """
+    try:
+        user_id = user.id
+        page = await db.run_sync(lambda session: crud_video.search(
+            session, query=q, user_id=user_id, cursor=cursor, limit=limit
+        ))
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="カーソルが不正です")
+    return {
+        "items": [video_to_dict(video) for video in page.items],
+        "next_cursor": page.next_cursor
+    }
+
+@router.get("/playlists")
+async def get_library_playlists(
+    user: User = Depends(aget_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    ユーザーのプレイリストを、所属する動画と分類とともに取得します
+    """
+    user_id = user.id
+    dashboard = await db.run_sync(lambda session: crud_playlist.get_dashboard(session, user_id=user_id))
+    return [
+        {
+            "id": entry.playlist.id,
+            "youtube_playlist_id": entry.playlist.youtube_playlist_id,
+            "title": entry.playlist.title,
+            "description": entry.playlist.description,
+            "videos": [video_to_dict(video) for video in entry.videos],
+            "classifications": [
+                {
+                    "id": classification.id,
+                    "video_id": classification.video_id,
+                    "status": classification.status,
+                    "confidence": classification.confidence
+                }
+                for classification in entry.classifications
+            ]
+        }
+        for entry in dashboard
+    ]
+
+@router.get("/duplicates")
+async def get_duplicate_videos(
+    threshold: float = Query(DEFAULT_THRESHOLD, ge=0.3, le=1.0),
+    user: User = Depends(aget_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    ライブラリ内の再アップロード・転載など、タイトルと説明がほぼ同じ動画のまとまりを返します
+    """
+    user_id = user.id
+
+    def find(session):
+        clusters = find_duplicate_videos(session, user_id=user_id, threshold=threshold)
+        videos = {
+            video.id: video
+            for video in crud_video.get_multi_by_ids(
+                session, ids=[video_id for cluster in clusters for video_id in cluster.video_ids]
+            )
+        }
+        return [
+            {
+                "similarity": cluster.similarity,
+                "videos": [video_to_dict(videos[video_id]) for video_id in cluster.video_ids]
+            }
+            for cluster in clusters
+        ]
+
+    return {"clusters": await db.run_sync(find)}
+
+@router.get("/export")
+def export_library(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    resource: Optional[Literal["playlists", "videos", "memberships", "classifications"]] = None,
+    user: User = Depends(get_current_user),
+    session_factory: sessionmaker = Depends(get_session_factory)
+):
+    """
+    ユーザーのプレイリスト・動画・所属・分類をNDJSONまたはCSVで書き出します
+
+    行はサーバーサイドカーソルから少しずつ読み込んで送るため、件数が多くてもすぐに送信が始まり、
+    メモリ使用量も一定です。CSVは列が種類ごとに異なるため resource の指定が必要です。
+    """
+    if format == "csv" and resource is None:
+        raise HTTPException(status_code=400, detail="CSVで書き出す場合は resource を指定してください")
+    user_id = user.id
+    if format == "csv":
+        body = export_csv(session_factory, user_id=user_id, resource=resource)
+    else:
+        body = export_ndjson(session_factory, user_id=user_id, resources=(resource,) if resource else EXPORT_RESOURCES)
+    media_type, extension = export_media_type(format)
+    filename = f"library-{resource or 'all'}.{extension}"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
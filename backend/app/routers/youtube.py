@@ -1,49 +1,50 @@
-from fastapi import APIRouter, HTTPException
-from googleapiclient.discovery import build
-from ..config import settings
+from fastapi import APIRouter, HTTPException, Depends
+import httpx
+from ..services.youtube_api import YouTubeAPI, YouTubeAPIError, get_youtube_api
+from ..services.search_cache import SearchCache, get_search_cache
 
 router = APIRouter(
     prefix="/youtube",
     tags=["youtube"]
 )
 
-def get_youtube_client():
-    try:
-        return build('youtube', 'v3', developerKey=settings.YOUTUBE_API_KEY)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
 @router.get("/search")
-async def search_videos(query: str, max_results: int = 10):
+async def search_videos(
+    query: str,
+    max_results: int = 10,
+    youtube: YouTubeAPI = Depends(get_youtube_api),
+    cache: SearchCache = Depends(get_search_cache)
+):
     """
     指定したクエリでYouTube動画を検索します
     """
-    youtube = get_youtube_client()
+    cached = cache.get(query, max_results, "snippet")
+    if cached is not None:
+        return cached
     try:
-        request = youtube.search().list(
-            part="snippet",
-            q=query,
-            type="video",
-            maxResults=max_results
-        )
-        response = request.execute()
-        return response
-    except Exception as e:
+        response = await youtube.search(q=query, part="snippet", max_results=max_results)
+    except httpx.TimeoutException:
+        raise HTTPException(status_code=504, detail="YouTube APIがタイムアウトしました")
+    except (YouTubeAPIError, httpx.HTTPError) as e:
         raise HTTPException(status_code=500, detail=str(e))
+    cache.set(query, max_results, "snippet", response)
+    return response
+
+@router.get("/search/cache/stats")
+async def get_search_cache_stats(cache: SearchCache = Depends(get_search_cache)):
+    """
+    検索キャッシュのヒット率と節約したクォータを取得します
+    """
+    return cache.stats()
 
 @router.get("/playlists")
-async def get_playlists():
+async def get_playlists(youtube: YouTubeAPI = Depends(get_youtube_api)):
     """
     認証済みユーザーのプレイリスト一覧を取得します
     """
-    youtube = get_youtube_client()
     try:
-        request = youtube.playlists().list(
-            part="snippet",
-            mine=True,
-            maxResults=50
-        )
-        response = request.execute()
-        return response
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        return await youtube.playlists(part="snippet", mine=True, max_results=50)
+    except httpx.TimeoutException:
+        raise HTTPException(status_code=504, detail="YouTube APIがタイムアウトしました")
+    except (YouTubeAPIError, httpx.HTTPError) as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,3 @@
+"""
+YouTube Playlist Organizer のサービス層
+"""
@@ -0,0 +1,272 @@
+"""
+pending の分類を処理するバックグラウンドワーカー
+
+    cd backend
+    python -m app.services.classification_worker --worker-id worker-1
+
+各ワーカーは pending の分類をバッチ単位でリース（lease_token と locked_until を設定）してから
+処理するため、複数のプロセスを同時に起動しても同じ行を二重に処理しません。
+バッチは chunk_size 件ずつ handler に渡し、チャンクの間でリースを延長するため、
+バッチ全体の処理が lease_seconds を超えても他のワーカーに渡りません。
+ワーカーが途中で停止した場合はリースの期限が切れた後に他のワーカーが処理し直します。
+失敗した行は指数バックオフで再試行し、上限回数に達したら failed にします。
+"""
+import argparse
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Set, Tuple, Union
+
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..crud import classification as crud_classification
+from ..crud import classification_rule as crud_classification_rule
+from ..models.classification import Classification
+from .rule_engine import CompiledRules
+
+logger = logging.getLogger(__name__)
+
+# 分類ごとの結果。信頼度（成功）または例外（失敗）
+Outcome = Union[float, BaseException]
+# リースした分類のバッチを処理し、分類のID -> 結果 を返す関数。結果がない行は失敗として扱う
+Handler = Callable[[Session, Sequence[Classification]], Mapping[int, Outcome]]
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def backoff_delay(attempts: int, *, base: float, maximum: float) -> float:
+    """
+    attempts 回目の失敗の後、次の試行までに待つ秒数（base * 2^(attempts-1)、上限 maximum）
+    """
+    return min(base * (2 ** max(attempts - 1, 0)), maximum)
+
+def rule_confidence_handler(db: Session, batch: Sequence[Classification]) -> Dict[int, Outcome]:
+    """
+    ユーザーの分類ルールで、動画が分類先のプレイリストに合うかを信頼度として求めます
+
+    最も優先度の高いルールが分類先を指していれば1.0、分類先へのルールに一致するが
+    他のプレイリストのルールが優先される場合は0.5、どのルールにも一致しなければ0.0です。
+    """
+    rules_by_user: Dict[int, Tuple[CompiledRules, Dict[int, CompiledRules]]] = {}
+    outcomes: Dict[int, Outcome] = {}
+    for db_classification in batch:
+        if db_classification.user_id not in rules_by_user:
+            rules = crud_classification_rule.get_by_user(db, user_id=db_classification.user_id)
+            by_playlist: Dict[int, List] = {}
+            for rule in rules:
+                by_playlist.setdefault(rule.playlist_id, []).append(rule)
+            rules_by_user[db_classification.user_id] = (
+                CompiledRules(rules),
+                {playlist_id: CompiledRules(group) for playlist_id, group in by_playlist.items()}
+            )
+        rules, by_playlist = rules_by_user[db_classification.user_id]
+        video = db_classification.video
+        video_kwargs = {
+            "title": video.title,
+            "description": video.description,
+            "tags": video.tags,
+            "channel_id": video.channel_id,
+            "channel_title": video.channel_title
+        }
+        best = rules.match(**video_kwargs)
+        if best is not None and best[1] == db_classification.playlist_id:
+            outcomes[db_classification.id] = 1.0
+        elif (
+            db_classification.playlist_id in by_playlist
+            and by_playlist[db_classification.playlist_id].match(**video_kwargs) is not None
+        ):
+            outcomes[db_classification.id] = 0.5
+        else:
+            outcomes[db_classification.id] = 0.0
+    return outcomes
+
+@dataclass
+class BatchResult:
+    claimed: int = 0
+    completed: int = 0
+    retried: int = 0
+    failed: int = 0
+    lost: int = 0
+
+class ClassificationWorker:
+    """
+    pending の分類をリースして handler で処理し、結果をまとめて書き込みます
+
+    リース・処理・結果の書き込みはそれぞれ別のトランザクションで行うため、
+    処理中に行ロックを保持せず、APIのリクエストを待たせません。
+    1つのチャンクの処理は lease_seconds より十分短くなるように chunk_size を設定してください。
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        *,
+        handler: Handler = rule_confidence_handler,
+        worker_id: Optional[str] = None,
+        batch_size: int = settings.CLASSIFICATION_WORKER_BATCH_SIZE,
+        chunk_size: int = settings.CLASSIFICATION_WORKER_CHUNK_SIZE,
+        lease_seconds: float = settings.CLASSIFICATION_WORKER_LEASE_SECONDS,
+        max_attempts: int = settings.CLASSIFICATION_WORKER_MAX_ATTEMPTS,
+        backoff_base: float = settings.CLASSIFICATION_WORKER_BACKOFF_BASE_SECONDS,
+        backoff_max: float = settings.CLASSIFICATION_WORKER_BACKOFF_MAX_SECONDS,
+        clock: Callable[[], datetime] = _utcnow
+    ):
+        self.session_factory = session_factory
+        self.handler = handler
+        self.worker_id = worker_id or uuid.uuid4().hex[:8]
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._clock = clock
+
+    def run_once(self) -> BatchResult:
+        """
+        1バッチ分をリースして処理します。処理できる行がなければ claimed=0 の結果を返します
+        """
+        result = BatchResult()
+        lease_token = str(uuid.uuid4())
+        with self.session_factory() as db:
+            now = self._clock()
+            batch = crud_classification.claim_pending(
+                db,
+                lease_token=lease_token,
+                limit=self.batch_size,
+                locked_until=now + timedelta(seconds=self.lease_seconds),
+                now=now,
+                max_attempts=self.max_attempts,
+                options=["detail"]
+            )
+            result.claimed = len(batch)
+            if not batch:
+                return result
+
+            outcomes: Dict[int, Outcome] = {}
+            deleted: Set[int] = set()
+            for start in range(0, len(batch), self.chunk_size):
+                if start:
+                    remaining = [db_classification.id for db_classification in batch[start:]]
+                    held, gone = self._renew_lease(lease_token, remaining)
+                    if any(id not in held and id not in gone for id in remaining):
+                        # リースが切れて他のワーカーに渡った場合は残りを処理しない
+                        logger.warning("lease lost during batch (worker %s)", self.worker_id)
+                        break
+                    # 処理中に削除された行（動画やプレイリストの削除による）は飛ばす
+                    deleted |= gone
+                chunk = [
+                    db_classification for db_classification in batch[start:start + self.chunk_size]
+                    if db_classification.id not in deleted
+                ]
+                if not chunk:
+                    continue
+                try:
+                    outcomes.update(self.handler(db, chunk))
+                except Exception as e:
+                    logger.exception("classification batch failed (worker %s)", self.worker_id)
+                    db.rollback()
+                    outcomes.update((db_classification.id, e) for db_classification in chunk)
+            rows = self._result_rows(
+                [db_classification for db_classification in batch if db_classification.id not in deleted],
+                outcomes,
+                result
+            )
+            # handler のトランザクションは破棄し、結果の書き込みは別のトランザクションにする
+            db.rollback()
+
+            written = crud_classification.finish_leased(db, lease_token=lease_token, rows=rows, commit=True)
+            result.lost = len(rows) - written
+        return result
+
+    def _renew_lease(self, lease_token: str, ids: Sequence[int]) -> Tuple[Set[int], Set[int]]:
+        """
+        リースの期限を延ばし、ids のうち (まだ保持している行, 削除された行) のIDを返します
+
+        どちらにも含まれない行は他のワーカーにリースされています。
+        handler のトランザクションをコミットしないよう、別のセッションで書き込みます。
+        """
+        with self.session_factory() as lease_db:
+            held = set(crud_classification.extend_lease(
+                lease_db,
+                lease_token=lease_token,
+                locked_until=self._clock() + timedelta(seconds=self.lease_seconds),
+                commit=True
+            ))
+            missing = [id for id in ids if id not in held]
+            existing = {
+                db_classification.id
+                for db_classification in crud_classification.get_multi_by_ids(lease_db, ids=missing)
+            }
+        return held, set(missing) - existing
+
+    def _result_rows(
+        self, batch: Sequence[Classification], outcomes: Mapping[int, Outcome], result: BatchResult
+    ) -> List[Dict]:
+        now = self._clock()
+        rows = []
+        for db_classification in batch:
+            outcome = outcomes.get(db_classification.id)
+            if outcome is not None and not isinstance(outcome, BaseException):
+                rows.append({"id": db_classification.id, "status": "completed", "confidence": float(outcome)})
+                result.completed += 1
+                continue
+            error = repr(outcome) if outcome is not None else "no result"
+            if db_classification.attempts >= self.max_attempts:
+                rows.append({"id": db_classification.id, "status": "failed", "last_error": error})
+                result.failed += 1
+            else:
+                delay = backoff_delay(db_classification.attempts, base=self.backoff_base, maximum=self.backoff_max)
+                rows.append({
+                    "id": db_classification.id,
+                    "status": "pending",
+                    "next_attempt_at": now + timedelta(seconds=delay),
+                    "last_error": error
+                })
+                result.retried += 1
+        return rows
+
+    def run(
+        self,
+        *,
+        poll_interval: float = settings.CLASSIFICATION_WORKER_POLL_INTERVAL_SECONDS,
+        max_batches: Optional[int] = None,
+        sleep: Callable[[float], None] = time.sleep
+    ) -> int:
+        """
+        pending の分類を処理し続けます。処理した行数を返します
+
+        処理できる行がない間は poll_interval 秒ずつ待ちます。
+        """
+        processed = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            result = self.run_once()
+            batches += 1
+            processed += result.claimed
+            if result.claimed:
+                logger.info("worker %s: %s", self.worker_id, result)
+            else:
+                sleep(poll_interval)
+        return processed
+
+def main() -> None:
+    from ..database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="pending の分類を処理するワーカー")
+    parser.add_argument("--worker-id", default=None)
+    parser.add_argument("--batch-size", type=int, default=settings.CLASSIFICATION_WORKER_BATCH_SIZE)
+    parser.add_argument("--once", action="store_true", help="1バッチだけ処理して終了する")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    worker = ClassificationWorker(SessionLocal, worker_id=args.worker_id, batch_size=args.batch_size)
+    if args.once:
+        print(worker.run_once())
+    else:
+        worker.run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+ClassificationHistory の保持期間を過ぎた行を集計・退避するジョブ
+
+    cd backend
+    python -m app.services.history_compaction --retention-days 90
+
+古い履歴を (ユーザー, プレイリスト, 日) ごとの件数に集計して ClassificationHistorySummary に加算し、
+元の行は ClassificationHistoryArchive（または --archive-path のgzip圧縮したJSON Lines）へ移して
+ClassificationHistory から削除します。chunk_size 件ごとに集計・退避・削除を1つのトランザクションで
+行うため、途中で止まっても同じ行が二重に集計されることはありません。
+"""
+import argparse
+import gzip
+import json
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..crud import classification_history as crud_classification_history
+from ..crud import classification_history_archive as crud_classification_history_archive
+from ..crud import classification_history_summary as crud_classification_history_summary
+from ..crud.base import unit_of_work
+from ..crud.classification import SUMMARY_ACTIONS, SummaryKey
+from ..models.classification import ClassificationHistory
+
+@dataclass
+class CompactionResult:
+    chunks: int = 0
+    archived: int = 0
+    summarized: int = 0
+
+def retention_cutoff(retention_days: int, *, now: Optional[datetime] = None) -> datetime:
+    """
+    保持期間の境目（UTC、タイムゾーンなし）を返します。この日時より前の履歴が対象です
+    """
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+    return now - timedelta(days=retention_days)
+
+def summarize(rows: List[ClassificationHistory]) -> Dict[SummaryKey, Dict[str, int]]:
+    counts: Dict[SummaryKey, Dict[str, int]] = {}
+    for row in rows:
+        column = SUMMARY_ACTIONS.get(row.action)
+        if column is None:
+            continue
+        key = (row.user_id, row.playlist_id, _day(row.created_at))
+        values = counts.setdefault(key, {})
+        values[column] = values.get(column, 0) + 1
+    return counts
+
+def _day(value: datetime) -> date:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+def _archive_row(row: ClassificationHistory) -> dict:
+    return {
+        "id": row.id,
+        "video_id": row.video_id,
+        "playlist_id": row.playlist_id,
+        "user_id": row.user_id,
+        "action": row.action,
+        "created_at": row.created_at,
+        "updated_at": row.updated_at
+    }
+
+def compact_history(
+    db: Session,
+    *,
+    cutoff: datetime,
+    chunk_size: int = settings.HISTORY_COMPACTION_CHUNK_SIZE,
+    archive_path: Optional[str] = None,
+    max_chunks: Optional[int] = None
+) -> CompactionResult:
+    """
+    cutoff より前の履歴を chunk_size 件ずつ集計し、アーカイブへ移して削除します
+
+    archive_path を指定した場合はアーカイブテーブルの代わりにgzip圧縮したJSON Linesへ追記します。
+    ファイルへの書き込みはトランザクションに含まれないため削除のコミット前に行い、
+    コミットに失敗した場合は次回の実行で同じ行が再び書き出されることがあります。
+    """
+    result = CompactionResult()
+    while max_chunks is None or result.chunks < max_chunks:
+        rows = crud_classification_history.get_older_than(db, cutoff=cutoff, limit=chunk_size)
+        if not rows:
+            break
+        archived = [_archive_row(row) for row in rows]
+        counts = summarize(rows)
+        with unit_of_work(db):
+            crud_classification_history_summary.add_counts(db, counts=counts)
+            if archive_path is None:
+                crud_classification_history_archive.create_many(db, objs_in=archived)
+            else:
+                _append_archive_file(archive_path, archived)
+            crud_classification_history.delete_ids(db, ids=[row["id"] for row in archived])
+        # 削除済みの行をセッションに残さない
+        for row in rows:
+            db.expunge(row)
+        result.chunks += 1
+        result.archived += len(archived)
+        result.summarized += len(counts)
+    return result
+
+def _append_archive_file(path: str, rows: List[dict]) -> None:
+    # gzipは追記したメンバーを連結して読めるため、チャンクごとに追記する
+    with gzip.open(path, "at", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, default=_json_default, ensure_ascii=False) + "\n")
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def main() -> None:
+    from ..database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="ClassificationHistory の集計と退避")
+    parser.add_argument("--retention-days", type=int, default=settings.HISTORY_RETENTION_DAYS)
+    parser.add_argument("--chunk-size", type=int, default=settings.HISTORY_COMPACTION_CHUNK_SIZE)
+    parser.add_argument("--archive-path", default=None, help="アーカイブテーブルの代わりに書き出すファイル（.jsonl.gz）")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        result = compact_history(
+            db,
+            cutoff=retention_cutoff(args.retention_days),
+            chunk_size=args.chunk_size,
+            archive_path=args.archive_path
+        )
+    print(result)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import httpx
+from fastapi import FastAPI, Request
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    # h2 がない環境では HTTP/1.1 のkeep-aliveで接続を使い回す
+    HTTP2_AVAILABLE = False
+
+# YouTube Data API用: 同期処理で並列に叩くため接続数を多めに保つ
+YOUTUBE_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0)
+# OAuthトークンエンドポイント用: ログイン・更新時のみ使うため少数の接続を長めに保持する
+OAUTH_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=5, keepalive_expiry=60.0)
+DEFAULT_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+
+# app.state に保存するクライアントの属性名
+YOUTUBE_CLIENT = "youtube_http_client"
+OAUTH_CLIENT = "oauth_http_client"
+
+_LIMITS = {
+    YOUTUBE_CLIENT: YOUTUBE_LIMITS,
+    OAUTH_CLIENT: OAUTH_LIMITS
+}
+
+def create_http_client(limits: httpx.Limits) -> httpx.AsyncClient:
+    return httpx.AsyncClient(limits=limits, timeout=DEFAULT_TIMEOUT, http2=HTTP2_AVAILABLE)
+
+def _state_client(app: FastAPI, name: str) -> httpx.AsyncClient:
+    client = getattr(app.state, name, None)
+    if client is None or client.is_closed:
+        # lifespanを通さずに起動した場合（TestClientを with なしで使った場合など）は遅延作成する
+        client = create_http_client(_LIMITS[name])
+        setattr(app.state, name, client)
+    return client
+
+@asynccontextmanager
+async def http_clients_lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    アプリの起動中だけ共有のHTTPクライアントを保持します
+    """
+    for name in _LIMITS:
+        _state_client(app, name)
+    try:
+        yield
+    finally:
+        for name in _LIMITS:
+            client = getattr(app.state, name, None)
+            if client is not None:
+                await client.aclose()
+                setattr(app.state, name, None)
+
+def get_youtube_http_client(request: Request) -> httpx.AsyncClient:
+    """
+    YouTube Data API用の共有クライアントを返します（依存性注入用）
+    """
+    return _state_client(request.app, YOUTUBE_CLIENT)
+
+def get_oauth_http_client(request: Request) -> httpx.AsyncClient:
+    """
+    OAuthトークンエンドポイント用の共有クライアントを返します（依存性注入用）
+    """
+    return _state_client(request.app, OAUTH_CLIENT)
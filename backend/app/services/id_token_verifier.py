@@ -0,0 +1,209 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from google.auth import exceptions, jwt
+from google.auth.transport import requests
+from ..config import settings
+
+GOOGLE_OAUTH2_CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+
+# Cache-Control がない応答を保持する秒数
+DEFAULT_CERTS_MAX_AGE = 300
+# 未知の鍵IDによる強制的な取得し直しの最小間隔（秒）
+MIN_FORCED_REFRESH_INTERVAL = 60
+
+def parse_max_age(headers: Dict[str, str]) -> int:
+    """
+    Cache-Control の max-age から Age を引いた残りの有効秒数を返します
+
+    no-store / no-cache の場合は0（キャッシュしない）を返します。
+    """
+    normalized = {key.lower(): value for key, value in headers.items()}
+    directives = {}
+    for directive in normalized.get("cache-control", "").split(","):
+        name, _, value = directive.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"')
+    if "no-store" in directives or "no-cache" in directives:
+        return 0
+    try:
+        max_age = int(directives["max-age"])
+    except (KeyError, ValueError):
+        return DEFAULT_CERTS_MAX_AGE
+    try:
+        age = int(normalized.get("age", 0))
+    except ValueError:
+        age = 0
+    return max(max_age - age, 0)
+
+class CertCache:
+    """
+    Googleの署名用証明書を Cache-Control に従って保持するキャッシュ
+
+    期限切れ後の最初の呼び出しだけが取得し直し、同時に来た呼び出しはその結果を待ちます。
+    force_refresh による取得し直しは min_refresh_interval 秒に1回までに制限し、
+    未知の鍵IDを付けたトークンを送り続けてもキャッシュを迂回できないようにします。
+    """
+
+    def __init__(
+        self,
+        url: str = GOOGLE_OAUTH2_CERTS_URL,
+        *,
+        request: Optional[Callable[..., Any]] = None,
+        min_refresh_interval: float = MIN_FORCED_REFRESH_INTERVAL,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.url = url
+        self._request = request
+        self.min_refresh_interval = min_refresh_interval
+        self._clock = clock
+        self._certs: Optional[Dict[str, str]] = None
+        self._expires_at = 0.0
+        self._fetched_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self.fetches = 0
+
+    def get(self, *, force_refresh: bool = False) -> Dict[str, str]:
+        """
+        鍵ID -> 証明書 の辞書を返します
+
+        force_refresh=True でも、前回の取得から min_refresh_interval 秒以内であれば保持中の証明書を返します。
+        """
+        certs = self._certs
+        if not force_refresh and certs is not None and self._clock() < self._expires_at:
+            return certs
+        with self._lock:
+            # ロック待ちの間に他のスレッドが取得し直していればそれを使う
+            now = self._clock()
+            if self._certs is not None and now < self._expires_at:
+                if not force_refresh or self._certs is not certs or self._recently_fetched(now):
+                    return self._certs
+            self._certs, self._expires_at = self._fetch()
+            self._fetched_at = now
+            return self._certs
+
+    def _recently_fetched(self, now: float) -> bool:
+        return self._fetched_at is not None and now - self._fetched_at < self.min_refresh_interval
+
+    def _fetch(self) -> Tuple[Dict[str, str], float]:
+        if self._request is None:
+            self._request = requests.Request()
+        response = self._request(self.url, method="GET")
+        self.fetches += 1
+        if response.status != 200:
+            raise exceptions.TransportError(f"Could not fetch certificates at {self.url}")
+        certs = json.loads(response.data.decode("utf-8"))
+        return certs, self._clock() + parse_max_age(dict(response.headers))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._certs = None
+            self._expires_at = 0.0
+            self._fetched_at = None
+
+class IDTokenVerifier:
+    """
+    Google IDトークンを検証し、検証済みのクレームをキャッシュします
+
+    クレームはトークンのSHA-256ハッシュをキーに、トークンの exp まで保持します。
+    キャッシュに当たればネットワークにも署名検証にも触れずに返せます。
+    """
+
+    def __init__(
+        self,
+        audience: Optional[str],
+        *,
+        cert_cache: Optional[CertCache] = None,
+        max_entries: int = 1024,
+        clock_skew_in_seconds: int = 0,
+        clock: Callable[[], float] = time.time
+    ):
+        self.audience = audience
+        self.cert_cache = cert_cache or CertCache()
+        self.max_entries = max_entries
+        self.clock_skew_in_seconds = clock_skew_in_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """
+        トークンを検証してクレームを返します
+
+        署名・audience・exp・issuer のいずれかが不正な場合は ValueError または
+        google.auth.exceptions.GoogleAuthError を送出します。
+        """
+        key = hashlib.sha256(token.encode()).hexdigest()
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                del self._entries[key]
+            self.misses += 1
+
+        claims = self._verify_signature(token)
+        expires_at = float(claims["exp"])
+        with self._lock:
+            self._entries[key] = (claims, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return claims
+
+    def _verify_signature(self, token: str) -> Dict[str, Any]:
+        # 署名前のヘッダーで形式を確かめ、壊れたトークンで証明書を取得しないようにする
+        key_id = jwt.decode_header(token).get("kid")
+        certs = self.cert_cache.get()
+        if key_id is not None and key_id not in certs:
+            # 鍵のローテーション直後は未知の鍵IDが来るため取得し直す（間隔は CertCache が制限する）
+            certs = self.cert_cache.get(force_refresh=True)
+            if key_id not in certs:
+                raise ValueError(f"Unknown key id: {key_id}")
+        claims = jwt.decode(
+            token,
+            certs=certs,
+            audience=self.audience,
+            clock_skew_in_seconds=self.clock_skew_in_seconds
+        )
+        if claims.get("iss") not in GOOGLE_ISSUERS:
+            raise exceptions.GoogleAuthError(
+                f"Wrong issuer. 'iss' should be one of the following: {GOOGLE_ISSUERS}"
+            )
+        return claims
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "cert_fetches": self.cert_cache.fetches
+            }
+
+id_token_verifier = IDTokenVerifier(
+    settings.GOOGLE_CLIENT_ID,
+    max_entries=settings.GOOGLE_ID_TOKEN_CACHE_MAX_ENTRIES
+)
+
+def get_id_token_verifier() -> IDTokenVerifier:
+    """
+    IDトークンの検証器を返します（依存性注入用）
+    """
+    return id_token_verifier
@@ -0,0 +1,130 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterator, List, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+from ..crud import classification as crud_classification
+from ..crud import playlist as crud_playlist
+from ..crud import video as crud_video
+
+# エクスポートできるデータの種類（NDJSONではこの順に出力します）
+EXPORT_RESOURCES = ("playlists", "videos", "memberships", "classifications")
+
+# サーバーサイドカーソルから一度に取り出す行数
+EXPORT_YIELD_PER = 1000
+# 1回の送信にまとめる行数。先頭の行をすぐ送れるよう小さめにする
+EXPORT_FLUSH_ROWS = 200
+
+def _statement(resource: str, user_id: int):
+    if resource == "playlists":
+        return crud_playlist, crud_playlist.export_statement(user_id=user_id)
+    if resource == "videos":
+        return crud_video, crud_video.export_statement(user_id=user_id)
+    if resource == "memberships":
+        return crud_playlist, crud_playlist.membership_export_statement(user_id=user_id)
+    if resource == "classifications":
+        return crud_classification, crud_classification.export_statement(user_id=user_id)
+    raise ValueError(f"unknown export resource: {resource}")
+
+def export_columns(resource: str) -> List[str]:
+    _, statement = _statement(resource, user_id=0)
+    return [column.name for column in statement.selected_columns]
+
+def iter_records(
+    db: Session, *, user_id: int, resource: str, yield_per: int = EXPORT_YIELD_PER
+) -> Iterator[Dict[str, Any]]:
+    """
+    1種類のデータを、ORMオブジェクトを作らずに列名 -> 値 の辞書として1行ずつ返します
+    """
+    crud, statement = _statement(resource, user_id)
+    for row in crud.iter_rows(db, statement, yield_per=yield_per):
+        yield row._asdict()
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def _batched(lines: Iterator[str], size: int) -> Iterator[bytes]:
+    buffer: List[str] = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= size:
+            yield "".join(buffer).encode()
+            buffer = []
+    if buffer:
+        yield "".join(buffer).encode()
+
+def export_ndjson(
+    session_factory: Callable[[], Session],
+    *,
+    user_id: int,
+    resources: Sequence[str] = EXPORT_RESOURCES,
+    yield_per: int = EXPORT_YIELD_PER,
+    flush_rows: int = EXPORT_FLUSH_ROWS
+) -> Iterator[bytes]:
+    """
+    ライブラリをNDJSON（1行に1件、"type" にデータの種類）として少しずつ返します
+
+    StreamingResponse から呼び出すため、生成関数の中で自前のセッションを開きます。
+    """
+    def lines() -> Iterator[str]:
+        with session_factory() as db:
+            for resource in resources:
+                for record in iter_records(db, user_id=user_id, resource=resource, yield_per=yield_per):
+                    yield json.dumps(
+                        {"type": resource, **record}, default=_json_default, ensure_ascii=False
+                    ) + "\n"
+
+    return _batched(lines(), flush_rows)
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+def export_csv(
+    session_factory: Callable[[], Session],
+    *,
+    user_id: int,
+    resource: str,
+    yield_per: int = EXPORT_YIELD_PER,
+    flush_rows: int = EXPORT_FLUSH_ROWS
+) -> Iterator[bytes]:
+    """
+    1種類のデータをヘッダー付きのCSVとして少しずつ返します（リストの列はJSON文字列にします）
+    """
+    columns = export_columns(resource)
+
+    def lines() -> Iterator[str]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        def take(row: Sequence[Any]) -> str:
+            writer.writerow(row)
+            line = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return line
+
+        # ヘッダーはクエリを実行する前に送る
+        yield take(columns)
+        with session_factory() as db:
+            for record in iter_records(db, user_id=user_id, resource=resource, yield_per=yield_per):
+                yield take([_csv_value(record[column]) for column in columns])
+
+    return _batched(lines(), flush_rows)
+
+def export_media_type(format: str) -> Tuple[str, str]:
+    """
+    形式に対応する (Content-Type, 拡張子) を返します
+    """
+    if format == "csv":
+        return "text/csv; charset=utf-8", "csv"
+    return "application/x-ndjson", "ndjson"
@@ -0,0 +1,310 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy.orm import Session
+from ..crud import playlist as crud_playlist, video as crud_video
+from ..crud.base import unit_of_work
+from ..models.user import User
+from .duplicates import backfill_signatures, video_minhash
+from .token_refresh import TokenRefreshManager
+from .youtube_api import YouTubeAPI, YouTubeAPIError
+
+# videos.list に一度に渡せるIDの上限
+VIDEOS_BATCH_SIZE = 50
+PAGE_SIZE = 50
+# IN句に渡すIDの上限
+LOOKUP_BATCH_SIZE = 500
+
+# force=True で強制的に更新したアクセストークンを返す関数
+TokenProvider = Callable[..., Awaitable[str]]
+
+@dataclass
+class SyncResult:
+    playlists: int = 0
+    unchanged_playlists: int = 0
+    deleted_playlists: int = 0
+    playlist_items: int = 0
+    videos: int = 0
+    added: int = 0
+    removed: int = 0
+    signatures: int = 0
+    api_calls: int = 0
+
+def chunked(items: Sequence[str], size: int) -> Iterator[Sequence[str]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+def _parse_int(value: Optional[str]) -> Optional[int]:
+    return int(value) if value is not None else None
+
+def _thumbnail_url(snippet: Dict[str, Any]) -> Optional[str]:
+    thumbnails = snippet.get("thumbnails") or {}
+    for size in ("high", "medium", "default"):
+        if size in thumbnails:
+            return thumbnails[size].get("url")
+    return None
+
+def playlist_from_resource(resource: Dict[str, Any], *, user_id: int) -> Dict[str, Any]:
+    """
+    playlists.list のリソースをPlaylistの列に変換します
+    """
+    snippet = resource.get("snippet", {})
+    return {
+        "youtube_playlist_id": resource["id"],
+        "title": (snippet.get("title") or "")[:100],
+        "description": (snippet.get("description") or "")[:500],
+        "user_id": user_id,
+        "etag": resource.get("etag")
+    }
+
+def video_from_resource(resource: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    videos.list のリソースをVideoの列に変換します
+    """
+    snippet = resource.get("snippet", {})
+    content_details = resource.get("contentDetails", {})
+    statistics = resource.get("statistics", {})
+    return {
+        "youtube_video_id": resource["id"],
+        "title": snippet.get("title"),
+        "description": snippet.get("description"),
+        "thumbnail_url": _thumbnail_url(snippet),
+        "channel_id": snippet.get("channelId"),
+        "channel_title": snippet.get("channelTitle"),
+        "published_at": _parse_datetime(snippet.get("publishedAt")),
+        "duration": content_details.get("duration"),
+        "view_count": _parse_int(statistics.get("viewCount")),
+        "like_count": _parse_int(statistics.get("likeCount")),
+        "tags": snippet.get("tags"),
+        "minhash": video_minhash(snippet.get("title"), snippet.get("description"))
+    }
+
+class PlaylistSyncEngine:
+    """
+    ユーザーのYouTubeライブラリをVideo/Playlistテーブルに同期します
+
+    playlists.list をpageTokenで順に辿り、リソースのETagが変わったプレイリストだけ
+    playlistItems.list をページごとに保存済みのETagで条件付きリクエストを送りながら辿ります。
+    変更のあったプレイリストだけ所属動画の差分を計算し、新しい動画は videos.list で50件ずつ取得して保存します。
+    YouTube側で削除されたプレイリストはローカルからも削除します。
+    保持するのは処理中のプレイリスト1つ分の動画IDだけなので、
+    数万件のライブラリでもメモリ使用量はプレイリストの最大件数で抑えられます。
+    token_provider を渡すと各リクエストの前にトークンを取得し直し、
+    401が返った場合は強制的に更新して1回だけ再試行します。
+    """
+
+    def __init__(
+        self,
+        api: YouTubeAPI,
+        db: Session,
+        *,
+        access_token: Optional[str] = None,
+        token_provider: Optional[TokenProvider] = None
+    ):
+        self.api = api
+        self.db = db
+        self.access_token = access_token
+        self.token_provider = token_provider
+        self.result = SyncResult()
+
+    async def _call(self, method: Callable[..., Awaitable[Any]], **kwargs) -> Any:
+        if self.token_provider is not None:
+            self.access_token = await self.token_provider()
+        try:
+            response = await method(access_token=self.access_token, **kwargs)
+        except YouTubeAPIError as e:
+            if e.status_code != 401 or self.token_provider is None:
+                raise
+            self.result.api_calls += 1
+            self.access_token = await self.token_provider(force=True)
+            response = await method(access_token=self.access_token, **kwargs)
+        self.result.api_calls += 1
+        return response
+
+    async def sync_user(self, user: User) -> SyncResult:
+        """
+        ユーザーの全プレイリストを同期し、署名のない動画のMinHash署名を計算して保存します
+
+        YouTube側で削除されたプレイリストは、一覧をすべて取得できた後にローカルからも削除します。
+        """
+        user_id = user.id
+        remote_ids: Set[str] = set()
+        page_token = None
+        while True:
+            page = await self._call(
+                self.api.playlists,
+                part="snippet,contentDetails",
+                mine=True,
+                max_results=PAGE_SIZE,
+                page_token=page_token
+            )
+            for resource in page.get("items", []):
+                remote_ids.add(resource["id"])
+                await self.sync_playlist(resource, user_id=user_id)
+            page_token = page.get("nextPageToken")
+            if not page_token:
+                break
+        self.result.deleted_playlists = crud_playlist.delete_missing(
+            self.db, user_id=user_id, youtube_ids=remote_ids
+        )
+        # タイトルの変更で消えた署名や、署名を保存する前に同期した動画の署名を埋める
+        self.result.signatures = backfill_signatures(self.db, user_id=user_id)
+        return self.result
+
+    async def sync_playlist(self, resource: Dict[str, Any], *, user_id: int) -> int:
+        """
+        1つのプレイリストとその動画を同期し、プレイリストのIDを返します
+
+        playlists.list で受け取ったリソースのETagが保存済みのものと同じ場合は、
+        所属動画も変わっていないため playlistItems.list を呼びません。
+        ETagは所属動画とページのETagを保存した後に更新するため、途中で失敗しても次回は辿り直します。
+        """
+        obj_in = playlist_from_resource(resource, user_id=user_id)
+        etag = obj_in.pop("etag")
+        db_playlist = crud_playlist.get_by_youtube_id(self.db, youtube_id=obj_in["youtube_playlist_id"])
+        self.result.playlists += 1
+        if db_playlist is not None and db_playlist.user_id == user_id and etag and db_playlist.etag == etag:
+            self.result.unchanged_playlists += 1
+            return db_playlist.id
+        if db_playlist is None:
+            db_playlist = crud_playlist.create(self.db, obj_in=obj_in)
+        else:
+            db_playlist = crud_playlist.update(self.db, db_obj=db_playlist, obj_in=obj_in)
+        playlist_id = db_playlist.id
+
+        pages = await self._fetch_item_pages(playlist_id, obj_in["youtube_playlist_id"])
+        if pages is None:
+            self.result.unchanged_playlists += 1
+            crud_playlist.set_etag(self.db, playlist_id=playlist_id, etag=etag)
+            return playlist_id
+
+        remote_ids = list(dict.fromkeys(
+            youtube_id for page in pages for youtube_id in page["video_ids"]
+        ))
+        self.result.playlist_items += len(remote_ids)
+        added_ids, removed_ids = await self._apply_diff(playlist_id, remote_ids)
+        # 所属動画の差分とページのETagは1つのトランザクションで保存する
+        with unit_of_work(self.db):
+            self.result.added += crud_playlist.add_videos(self.db, playlist_id=playlist_id, video_ids=added_ids)
+            self.result.removed += crud_playlist.remove_videos(self.db, playlist_id=playlist_id, video_ids=removed_ids)
+            crud_playlist.replace_item_pages(self.db, playlist_id=playlist_id, pages=pages)
+            crud_playlist.set_etag(self.db, playlist_id=playlist_id, etag=etag)
+        return playlist_id
+
+    async def _fetch_item_pages(
+        self, playlist_id: int, youtube_playlist_id: str
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        playlistItems.list を保存済みのETag付きで辿ります
+
+        ページのETagはそのページの内容しか表さないため、すべてのページを辿り、
+        すべて304だった場合だけプレイリストに変更がないとみなしてNoneを返します。
+        304のページは保存済みの動画IDを使うため、動画IDを受け取るのは変更のあったページだけです。
+        """
+        stored_pages = crud_playlist.get_item_pages(self.db, playlist_id=playlist_id)
+        pages = []
+        changed = False
+        page_token = None
+        while True:
+            index = len(pages)
+            stored = None
+            if index < len(stored_pages) and stored_pages[index].page_token == page_token:
+                stored = stored_pages[index]
+            page = await self._call(
+                self.api.playlist_items,
+                playlist_id=youtube_playlist_id,
+                part="contentDetails",
+                max_results=PAGE_SIZE,
+                page_token=page_token,
+                etag=stored.etag if stored is not None else None
+            )
+            if page is None:
+                pages.append({
+                    "page_token": page_token,
+                    "next_page_token": stored.next_page_token,
+                    "etag": stored.etag,
+                    "video_ids": list(stored.video_ids)
+                })
+            else:
+                changed = True
+                pages.append({
+                    "page_token": page_token,
+                    "next_page_token": page.get("nextPageToken"),
+                    "etag": page.get("etag") or "",
+                    "video_ids": [
+                        item["contentDetails"]["videoId"]
+                        for item in page.get("items", [])
+                        if item.get("contentDetails", {}).get("videoId")
+                    ]
+                })
+            page_token = pages[-1]["next_page_token"]
+            if not page_token:
+                return pages if changed else None
+
+    async def _apply_diff(self, playlist_id: int, remote_ids: List[str]) -> Tuple[List[int], List[int]]:
+        """
+        ローカルの所属動画との差分を計算し、(追加する動画ID, 削除する動画ID) を返します
+
+        未登録の動画はここで videos.list から取得して保存します。
+        """
+        local = crud_playlist.get_video_youtube_ids(self.db, playlist_id=playlist_id)
+        remote = set(remote_ids)
+        added = [youtube_id for youtube_id in remote_ids if youtube_id not in local]
+        removed = [video_id for youtube_id, video_id in local.items() if youtube_id not in remote]
+
+        # ライブラリに未登録の動画だけを videos.list で取得する
+        known: Dict[str, int] = {}
+        for batch in chunked(added, LOOKUP_BATCH_SIZE):
+            known.update(
+                (db_video.youtube_video_id, db_video.id)
+                for db_video in crud_video.get_by_youtube_ids(self.db, youtube_ids=batch)
+            )
+        missing = [youtube_id for youtube_id in added if youtube_id not in known]
+        for batch in chunked(missing, VIDEOS_BATCH_SIZE):
+            objs_in = await self._fetch_videos(batch)
+            video_ids = crud_video.upsert_many(self.db, objs_in=objs_in, return_ids=True)
+            known.update(zip((obj_in["youtube_video_id"] for obj_in in objs_in), video_ids))
+            self.result.videos += len(video_ids)
+
+        # 削除済み・非公開の動画は videos.list に含まれないためここで除外される
+        added_ids = [known[youtube_id] for youtube_id in added if youtube_id in known]
+        return added_ids, removed
+
+    async def _fetch_videos(self, youtube_ids: Sequence[str]) -> List[Dict[str, Any]]:
+        response = await self._call(
+            self.api.videos,
+            ids=youtube_ids,
+            part="snippet,contentDetails,statistics"
+        )
+        return [video_from_resource(resource) for resource in response.get("items", [])]
+
+async def sync_user_library(
+    db: Session,
+    *,
+    user: User,
+    api: YouTubeAPI,
+    access_token: Optional[str] = None,
+    token_manager: Optional[TokenRefreshManager] = None
+) -> SyncResult:
+    """
+    ユーザーのYouTubeライブラリを同期します
+
+    token_manager を渡すと、同期中にトークンの期限が来ても事前に更新して続行します。
+    """
+    token_provider = None
+    if token_manager is not None:
+        async def token_provider(force: bool = False) -> str:
+            return await token_manager.get_access_token(db, user, force=force)
+    engine = PlaylistSyncEngine(
+        api,
+        db,
+        access_token=access_token or user.youtube_access_token,
+        token_provider=token_provider
+    )
+    return await engine.sync_user(user)
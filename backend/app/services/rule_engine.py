@@ -0,0 +1,200 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy.orm import Session
+from ..crud import classification as crud_classification
+from ..crud import classification_history as crud_classification_history
+from ..crud import classification_rule as crud_classification_rule
+from ..crud import video as crud_video
+from ..crud.base import unit_of_work
+from ..models.classification import ClassificationRule
+from ..models.video import Video
+
+# (priority, playlist_id) の組。値が小さいほど優先される
+Target = Tuple[int, int]
+
+class AhoCorasick:
+    """
+    複数のキーワードを1回の走査で検索するAho-Corasickオートマトン
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Set[str]] = [set()]
+        for pattern in patterns:
+            if pattern:
+                self._add(pattern)
+        self._build_failure_links()
+
+    def _add(self, pattern: str) -> None:
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+            state = next_state
+        self._output[state].add(pattern)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                if self._fail[next_state] == next_state:
+                    self._fail[next_state] = 0
+                self._output[next_state] |= self._output[self._fail[next_state]]
+
+    def find(self, text: str) -> Set[str]:
+        """
+        textに含まれるパターンの集合を返します
+        """
+        found: Set[str] = set()
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+        return found
+
+class CompiledRules:
+    """
+    ユーザーの分類ルールを種類ごとのマッチャーにまとめたもの
+
+    keyword はタイトル・説明に対するAho-Corasick、
+    tag と channel は小文字化した値の辞書引きで判定します。
+    """
+
+    def __init__(self, rules: Sequence[ClassificationRule]):
+        keywords: Dict[str, List[Target]] = {}
+        self.tags: Dict[str, List[Target]] = {}
+        self.channels: Dict[str, List[Target]] = {}
+        for rule in rules:
+            value = (rule.rule_value or "").strip().lower()
+            if not value:
+                continue
+            target = (rule.priority, rule.playlist_id)
+            if rule.rule_type == "keyword":
+                keywords.setdefault(value, []).append(target)
+            elif rule.rule_type == "tag":
+                self.tags.setdefault(value, []).append(target)
+            elif rule.rule_type == "channel":
+                self.channels.setdefault(value, []).append(target)
+        self.keywords = keywords
+        self._automaton = AhoCorasick(keywords) if keywords else None
+
+    def __bool__(self) -> bool:
+        return bool(self.keywords or self.tags or self.channels)
+
+    def match(
+        self,
+        *,
+        title: Optional[str],
+        description: Optional[str],
+        tags: Optional[Sequence[str]],
+        channel_id: Optional[str],
+        channel_title: Optional[str]
+    ) -> Optional[Target]:
+        """
+        最も優先度の高い (priority, playlist_id) を返します。一致しなければNone
+        """
+        best: Optional[Target] = None
+
+        def consider(targets: Optional[List[Target]]) -> None:
+            nonlocal best
+            if targets:
+                candidate = min(targets)
+                if best is None or candidate < best:
+                    best = candidate
+
+        if self._automaton is not None:
+            text = f"{title or ''}\n{description or ''}".lower()
+            for keyword in self._automaton.find(text):
+                consider(self.keywords[keyword])
+        if self.tags and tags:
+            for tag in tags:
+                consider(self.tags.get(str(tag).lower()))
+        if self.channels:
+            for channel in (channel_id, channel_title):
+                if channel:
+                    consider(self.channels.get(channel.lower()))
+        return best
+
+@dataclass
+class RuleRunResult:
+    videos: int = 0
+    classified: int = 0
+    skipped: int = 0
+
+def classify_user_videos(
+    db: Session, *, user_id: int, batch_size: int = 1000
+) -> RuleRunResult:
+    """
+    ユーザーの分類ルールを全動画に適用し、ClassificationとClassificationHistoryをまとめて作成します
+
+    動画は必要な列だけをbatch_size件ずつ読み、各動画を最も優先度の高いルールの
+    プレイリストに分類します。既に同じプレイリストに分類済みの動画は飛ばします。
+    ClassificationとClassificationHistoryはバッチごとに1つのトランザクションで保存します。
+    """
+    result = RuleRunResult()
+    rules = CompiledRules(crud_classification_rule.get_by_user(db, user_id=user_id))
+    if not rules:
+        return result
+
+    columns = (Video.title, Video.description, Video.tags, Video.channel_id, Video.channel_title)
+    for rows in crud_video.iter_user_video_rows(
+        db, user_id=user_id, columns=columns, batch_size=batch_size
+    ):
+        result.videos += len(rows)
+        matches = []
+        for row in rows:
+            target = rules.match(
+                title=row.title,
+                description=row.description,
+                tags=row.tags,
+                channel_id=row.channel_id,
+                channel_title=row.channel_title
+            )
+            if target is not None:
+                matches.append((row.id, target[1]))
+
+        existing = crud_classification.get_pairs_for_videos(
+            db, user_id=user_id, video_ids=[video_id for video_id, _ in matches]
+        )
+        new_pairs = [pair for pair in matches if pair not in existing]
+        result.skipped += len(matches) - len(new_pairs)
+        if not new_pairs:
+            continue
+
+        with unit_of_work(db):
+            crud_classification.create_many(db, objs_in=[
+                {
+                    "video_id": video_id,
+                    "playlist_id": playlist_id,
+                    "user_id": user_id,
+                    "confidence": 1.0,
+                    "status": "completed"
+                }
+                for video_id, playlist_id in new_pairs
+            ])
+            crud_classification_history.create_many(db, objs_in=[
+                {"video_id": video_id, "playlist_id": playlist_id, "user_id": user_id, "action": "add"}
+                for video_id, playlist_id in new_pairs
+            ])
+        result.classified += len(new_pairs)
+    return result
@@ -0,0 +1,184 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from ..config import settings
+
+# search.list 1回あたりのクォータ消費量
+SEARCH_QUOTA_COST = 100
+
+CacheKey = Tuple[str, int, str]
+
+def make_key(query: str, max_results: int, part: str) -> CacheKey:
+    """
+    検索条件からキャッシュキーを作成します（クエリの余分な空白は無視します）
+    """
+    return (" ".join(query.split()), max_results, part)
+
+def _serialize_key(key: CacheKey) -> str:
+    return json.dumps(key, ensure_ascii=False)
+
+class DiskCacheBackend:
+    """
+    SQLiteファイルに検索結果を保存するバックエンド
+
+    プロセスを再起動してもキャッシュを引き継ぐために使います。
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_search_cache_expires_at ON search_cache (expires_at)"
+            )
+
+    def get(self, key: CacheKey, now: float) -> Optional[Tuple[Dict[str, Any], float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM search_cache WHERE key = ?",
+                (_serialize_key(key),)
+            ).fetchone()
+        if row is None or row[1] <= now:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: CacheKey, value: Dict[str, Any], expires_at: float, now: float) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (_serialize_key(key), json.dumps(value, ensure_ascii=False), expires_at)
+            )
+            self._conn.execute("DELETE FROM search_cache WHERE expires_at <= ?", (now,))
+            # 上限を超えた分は有効期限が近いものから削除
+            self._conn.execute(
+                "DELETE FROM search_cache WHERE key IN ("
+                "SELECT key FROM search_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM search_cache")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+class SearchCache:
+    """
+    /youtube/search の応答をキャッシュするTTL付きLRUキャッシュ
+
+    メモリ上のLRUを一次キャッシュとし、backend が指定されていれば
+    二次キャッシュとしてディスクにも保存します。
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl: float,
+        max_entries: int,
+        backend: Optional[DiskCacheBackend] = None,
+        clock: Callable[[], float] = time.time
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.backend = backend
+        self._clock = clock
+        self._entries: "OrderedDict[CacheKey, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, query: str, max_results: int, part: str) -> Optional[Dict[str, Any]]:
+        key = make_key(query, max_results, part)
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                del self._entries[key]
+
+        if self.backend is not None:
+            stored = self.backend.get(key, now)
+            if stored is not None:
+                with self._lock:
+                    self._store(key, stored[0], stored[1])
+                    self.hits += 1
+                return stored[0]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, query: str, max_results: int, part: str, value: Dict[str, Any]) -> None:
+        key = make_key(query, max_results, part)
+        now = self._clock()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._store(key, value, expires_at)
+        if self.backend is not None:
+            self.backend.set(key, value, expires_at, now)
+
+    def _store(self, key: CacheKey, value: Dict[str, Any], expires_at: float) -> None:
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "quota_saved": self.hits * SEARCH_QUOTA_COST,
+                "persistent": self.backend is not None
+            }
+
+def _create_search_cache() -> SearchCache:
+    backend = None
+    if settings.YOUTUBE_SEARCH_CACHE_PATH:
+        backend = DiskCacheBackend(
+            settings.YOUTUBE_SEARCH_CACHE_PATH,
+            max_entries=settings.YOUTUBE_SEARCH_CACHE_MAX_ENTRIES
+        )
+    return SearchCache(
+        ttl=settings.YOUTUBE_SEARCH_CACHE_TTL_SECONDS,
+        max_entries=settings.YOUTUBE_SEARCH_CACHE_MAX_ENTRIES,
+        backend=backend
+    )
+
+search_cache = _create_search_cache()
+
+def get_search_cache() -> SearchCache:
+    """
+    検索キャッシュを返します（依存性注入用）
+    """
+    return search_cache
@@ -0,0 +1,65 @@
+import secrets
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from jose import JWTError, jwt
+from ..config import settings
+
+SESSION_TOKEN_TYPE = "session"
+
+# config.py の JWT_SECRET_KEY の既定値。公開されているため署名には使わない
+PLACEHOLDER_SECRET_KEY = "your-secret-key-here"
+# DEBUG でJWT_SECRET_KEYが未設定の場合に使う、プロセスごとのランダムな鍵
+_debug_secret_key = secrets.token_urlsafe(32)
+
+class InvalidSessionTokenError(ValueError):
+    pass
+
+class SessionSecretKeyError(RuntimeError):
+    pass
+
+def session_secret_key() -> str:
+    """
+    セッショントークンの署名に使う鍵を返します
+
+    JWT_SECRET_KEY が既定値のままの場合、DEBUG ではプロセスごとのランダムな鍵を使い
+    （再起動するとセッションは無効になります）、それ以外では SessionSecretKeyError を送出します。
+    アプリの起動時にも呼び出し、設定がなければ起動を失敗させます。
+    """
+    key = settings.JWT_SECRET_KEY
+    if key and key != PLACEHOLDER_SECRET_KEY:
+        return key
+    if settings.DEBUG:
+        return _debug_secret_key
+    raise SessionSecretKeyError("JWT_SECRET_KEY must be set when DEBUG is disabled")
+
+def create_session_token(user_id: int, *, expires_delta: Optional[timedelta] = None) -> str:
+    """
+    ユーザーIDを含むセッショントークンを session_secret_key() で署名して発行します
+    """
+    now = datetime.now(timezone.utc)
+    expires_at = now + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
+    claims = {
+        "sub": str(user_id),
+        "typ": SESSION_TOKEN_TYPE,
+        "iat": int(now.timestamp()),
+        "exp": int(expires_at.timestamp())
+    }
+    return jwt.encode(claims, session_secret_key(), algorithm=settings.JWT_ALGORITHM)
+
+def decode_session_token(token: str) -> int:
+    """
+    セッショントークンを検証してユーザーIDを返します
+
+    署名と有効期限をローカルで検証するだけで、ネットワークには接続しません。
+    """
+    try:
+        claims = jwt.decode(token, session_secret_key(), algorithms=[settings.JWT_ALGORITHM])
+    except JWTError:
+        raise InvalidSessionTokenError("invalid session token")
+    if claims.get("typ") != SESSION_TOKEN_TYPE:
+        raise InvalidSessionTokenError("invalid session token")
+    try:
+        return int(claims["sub"])
+    except (KeyError, TypeError, ValueError):
+        raise InvalidSessionTokenError("invalid session token")
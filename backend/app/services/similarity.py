@@ -0,0 +1,238 @@
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy.orm import Session
+from ..crud import classification as crud_classification
+from ..crud import playlist as crud_playlist
+from ..crud import playlist_suggestion as crud_playlist_suggestion
+from ..crud import video as crud_video
+from ..crud.base import unit_of_work
+from ..models.video import Video
+
+# 英数字の語と、それ以外の文字（日本語など空白で区切らない文字）の連続。記号は区切りとして扱う
+_TOKEN_PATTERN = re.compile(r"[0-9a-z]+|[^\W0-9a-z_]+")
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    テキストを語に分けます
+
+    英数字は単語単位、日本語などの空白で区切らない文字列は2文字ずつの組（バイグラム）にします。
+    """
+    if not text:
+        return []
+    tokens = []
+    for match in _TOKEN_PATTERN.finditer(text.lower()):
+        token = match.group()
+        if token.isascii() or len(token) == 1:
+            tokens.append(token)
+        else:
+            tokens.extend(token[i:i + 2] for i in range(len(token) - 1))
+    return tokens
+
+def document_terms(
+    title: Optional[str], description: Optional[str], tags: Optional[Sequence[str]]
+) -> List[str]:
+    """
+    動画のタイトル・説明・タグから文書の語を作ります。タグは本文の語と区別するため "#" を付けます
+    """
+    terms = tokenize(title) + tokenize(description)
+    for tag in tags or ():
+        terms.append("#" + str(tag).strip().lower())
+    return terms
+
+def l2_normalize(matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+    """
+    各行をL2ノルムが1になるように正規化します（すべて0の行はそのまま）
+    """
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms).dot(matrix).tocsr()
+
+class TfidfVectorizer:
+    """
+    語のリストから疎なTF-IDF行列（行はL2正規化済み）を作ります
+
+    tf は 1 + log(出現回数)、idf は log((1 + 文書数) / (1 + 文書頻度)) + 1 です。
+    """
+
+    def __init__(self, *, min_df: int = 1, dtype=np.float32):
+        self.min_df = min_df
+        self.dtype = dtype
+        self.vocabulary: Dict[str, int] = {}
+        self.idf: Optional[np.ndarray] = None
+
+    def fit_transform(self, documents: Sequence[Sequence[str]]) -> sparse.csr_matrix:
+        counts = self._count(documents)
+        df = np.bincount(counts.indices, minlength=counts.shape[1])
+        if self.min_df > 1:
+            keep = np.flatnonzero(df >= self.min_df)
+            counts = counts[:, keep]
+            df = df[keep]
+            terms = list(self.vocabulary)
+            self.vocabulary = {terms[index]: column for column, index in enumerate(keep)}
+        self.idf = (np.log((1 + counts.shape[0]) / (1 + df)) + 1).astype(self.dtype)
+        return self._weight(counts)
+
+    def transform(self, documents: Sequence[Sequence[str]]) -> sparse.csr_matrix:
+        if self.idf is None:
+            raise ValueError("vectorizer is not fitted")
+        return self._weight(self._count(documents, grow=False))
+
+    def _count(self, documents: Sequence[Sequence[str]], *, grow: bool = True) -> sparse.csr_matrix:
+        vocabulary = self.vocabulary
+        indices: List[int] = []
+        indptr = [0]
+        for terms in documents:
+            for term in terms:
+                column = vocabulary.get(term)
+                if column is None:
+                    if not grow:
+                        continue
+                    column = vocabulary[term] = len(vocabulary)
+                indices.append(column)
+            indptr.append(len(indices))
+        counts = sparse.csr_matrix(
+            (np.ones(len(indices), dtype=self.dtype), np.asarray(indices, dtype=np.int32), np.asarray(indptr)),
+            shape=(len(indptr) - 1, len(vocabulary))
+        )
+        # 同じ語の重複を合計して出現回数にする
+        counts.sum_duplicates()
+        return counts
+
+    def _weight(self, counts: sparse.csr_matrix) -> sparse.csr_matrix:
+        counts.data = 1 + np.log(counts.data)
+        return l2_normalize(counts.multiply(self.idf).tocsr())
+
+def centroids(
+    vectors: sparse.csr_matrix, memberships: Iterable[Tuple[int, int]], n_groups: int
+) -> sparse.csr_matrix:
+    """
+    (グループの行, 文書の行) の組から、各グループに属する文書ベクトルの平均（L2正規化済み）を求めます
+    """
+    pairs = np.asarray(list(memberships), dtype=np.int64).reshape(-1, 2)
+    assignment = sparse.csr_matrix(
+        (np.ones(len(pairs), dtype=vectors.dtype), (pairs[:, 0], pairs[:, 1])),
+        shape=(n_groups, vectors.shape[0])
+    )
+    # 同じ組が重複していても重みは1にする
+    assignment.data[:] = 1.0
+    return l2_normalize(assignment.dot(vectors))
+
+def top_k_scores(
+    vectors: sparse.csr_matrix,
+    group_vectors: sparse.csr_matrix,
+    k: int,
+    *,
+    exclude: Optional[sparse.spmatrix] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    各文書と各グループのコサイン類似度を1回の行列積で求め、上位k件を返します
+
+    戻り値は (グループの行, 類似度) の配列で、どちらも (文書数, k) の形です。
+    exclude に (文書数, グループ数) の行列を渡すと、非ゼロの組み合わせを候補から外します。
+    """
+    k = min(k, group_vectors.shape[0])
+    scores = vectors.dot(group_vectors.T).toarray()
+    if exclude is not None:
+        rows, columns = exclude.nonzero()
+        scores[rows, columns] = -1.0
+    if k == 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty.astype(np.int64), empty
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    top_scores = np.take_along_axis(scores, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+@dataclass
+class SuggestionResult:
+    videos: int = 0
+    playlists: int = 0
+    scored: int = 0
+    suggestions: int = 0
+
+def suggest_playlists(
+    db: Session,
+    *,
+    user_id: int,
+    top_k: int = 3,
+    min_confidence: float = 0.05,
+    batch_size: int = 5000
+) -> SuggestionResult:
+    """
+    未分類の動画ごとに、内容の近いプレイリストを上位 top_k 件まで提案として保存します
+
+    ユーザーの全動画からTF-IDFベクトルを作り、各プレイリストの重心（所属動画と
+    completed の分類の平均）とのコサイン類似度を confidence とします。
+    動画が既に所属しているプレイリストは提案しません。
+    提案は PlaylistSuggestion に保存し、前回の提案は置き換えます。
+    """
+    result = SuggestionResult()
+    columns = (Video.title, Video.description, Video.tags)
+    video_ids: List[int] = []
+    documents: List[List[str]] = []
+    for rows in crud_video.iter_user_video_rows(db, user_id=user_id, columns=columns, batch_size=batch_size):
+        for row in rows:
+            video_ids.append(row.id)
+            documents.append(document_terms(row.title, row.description, row.tags))
+    result.videos = len(video_ids)
+    if not video_ids:
+        return result
+
+    row_by_video = {video_id: row for row, video_id in enumerate(video_ids)}
+    memberships = crud_playlist.get_user_memberships(db, user_id=user_id)
+    positives = memberships | crud_classification.get_pairs_by_status(db, user_id=user_id, status="completed")
+    playlist_ids = sorted({playlist_id for _, playlist_id in positives})
+    result.playlists = len(playlist_ids)
+    if not playlist_ids:
+        return result
+    column_by_playlist = {playlist_id: column for column, playlist_id in enumerate(playlist_ids)}
+
+    vectors = TfidfVectorizer().fit_transform(documents)
+    group_vectors = centroids(
+        vectors,
+        (
+            (column_by_playlist[playlist_id], row_by_video[video_id])
+            for video_id, playlist_id in positives
+            if video_id in row_by_video
+        ),
+        len(playlist_ids)
+    )
+
+    classified = crud_classification.get_classified_video_ids(db, user_id=user_id)
+    candidate_rows = np.asarray(
+        [row for row, video_id in enumerate(video_ids) if video_id not in classified], dtype=np.int64
+    )
+    result.scored = len(candidate_rows)
+
+    suggestions = []
+    if len(candidate_rows):
+        position = np.full(len(video_ids), -1, dtype=np.int64)
+        position[candidate_rows] = np.arange(len(candidate_rows))
+        excluded = [
+            (position[row_by_video[video_id]], column_by_playlist[playlist_id])
+            for video_id, playlist_id in memberships
+            if video_id in row_by_video and position[row_by_video[video_id]] >= 0
+        ]
+        exclude = sparse.coo_matrix(
+            (np.ones(len(excluded)), tuple(np.asarray(excluded, dtype=np.int64).reshape(-1, 2).T)),
+            shape=(len(candidate_rows), len(playlist_ids))
+        )
+        top, scores = top_k_scores(vectors[candidate_rows], group_vectors, top_k, exclude=exclude)
+        keep = scores >= max(min_confidence, 1e-9)
+        for i, j in zip(*np.nonzero(keep)):
+            suggestions.append({
+                "user_id": user_id,
+                "video_id": video_ids[candidate_rows[i]],
+                "playlist_id": playlist_ids[top[i, j]],
+                "confidence": float(scores[i, j])
+            })
+
+    with unit_of_work(db):
+        crud_playlist_suggestion.delete_by_user(db, user_id=user_id)
+        crud_playlist_suggestion.create_many(db, objs_in=suggestions)
+    result.suggestions = len(suggestions)
+    return result
@@ -0,0 +1,135 @@
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional
+
+import httpx
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from ..crud import user as crud_user
+from ..models.user import User
+from .user_cache import user_cache
+
+GOOGLE_TOKEN_URL = "https://oauth2.googleapis.com/token"
+
+# 有効期限のこの時間前になったら更新する
+REFRESH_MARGIN = timedelta(minutes=5)
+
+class TokenRefreshError(Exception):
+    """アクセストークンを更新できなかった場合の例外"""
+
+@dataclass
+class RefreshedToken:
+    access_token: str
+    refresh_token: Optional[str]
+    expires_at: Optional[datetime]
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def token_expires_at(expires_in: Optional[int], *, now: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    トークン応答の expires_in（秒）から有効期限（UTC、タイムゾーンなし）を求めます
+    """
+    if expires_in is None:
+        return None
+    return (now or _utcnow()) + timedelta(seconds=int(expires_in))
+
+def _as_naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+class TokenRefreshManager:
+    """
+    YouTubeのアクセストークンを有効期限の少し前に更新します
+
+    同じユーザーの更新が同時に要求された場合は1回のリクエストにまとめ、
+    結果は CRUDUser.update_youtube_tokens で保存して認証用のユーザーキャッシュを無効化します。
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        *,
+        client_id: str,
+        client_secret: str,
+        margin: timedelta = REFRESH_MARGIN,
+        clock: Callable[[], datetime] = _utcnow
+    ):
+        self.client = client
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.margin = margin
+        self._clock = clock
+        self._inflight: Dict[int, "asyncio.Task[RefreshedToken]"] = {}
+        self.refreshes = 0
+
+    def needs_refresh(self, user: User) -> bool:
+        if not user.youtube_access_token:
+            return True
+        if user.token_expires_at is None:
+            # 期限が不明な場合は401を受けた時点で更新する
+            return False
+        return _as_naive_utc(user.token_expires_at) - self.margin <= self._clock()
+
+    async def get_access_token(self, db: Session, user: User, *, force: bool = False) -> str:
+        """
+        有効なアクセストークンを返します。期限が近い場合や force=True の場合は更新します
+        """
+        if not force and not self.needs_refresh(user):
+            return user.youtube_access_token
+        return await self.refresh(db, user)
+
+    async def refresh(self, db: Session, user: User) -> str:
+        user_id = user.id
+        task = self._inflight.get(user_id)
+        owner = task is None
+        if owner:
+            task = asyncio.ensure_future(self._request_token(user.youtube_refresh_token))
+            self._inflight[user_id] = task
+            task.add_done_callback(lambda _: self._inflight.pop(user_id, None))
+        # 待っている側がキャンセルされても更新自体は続ける
+        token = await asyncio.shield(task)
+        if owner:
+            crud_user.update_youtube_tokens(
+                db,
+                db_obj=user,
+                access_token=token.access_token,
+                refresh_token=token.refresh_token,
+                expires_at=token.expires_at
+            )
+            # get_current_user が古いトークンのスナップショットを返さないようにする
+            user_cache.invalidate(user_id)
+        else:
+            # 保存は最初の呼び出し側が行うため、ここではセッションを汚さずに値だけ反映する
+            set_committed_value(user, "youtube_access_token", token.access_token)
+            if token.refresh_token:
+                set_committed_value(user, "youtube_refresh_token", token.refresh_token)
+            if token.expires_at:
+                set_committed_value(user, "token_expires_at", token.expires_at)
+        return token.access_token
+
+    async def _request_token(self, refresh_token: Optional[str]) -> RefreshedToken:
+        if not refresh_token:
+            raise TokenRefreshError("リフレッシュトークンがありません")
+        now = self._clock()
+        response = await self.client.post(GOOGLE_TOKEN_URL, data={
+            "client_id": self.client_id,
+            "client_secret": self.client_secret,
+            "refresh_token": refresh_token,
+            "grant_type": "refresh_token"
+        })
+        self.refreshes += 1
+        try:
+            token_response = response.json()
+        except ValueError:
+            token_response = {}
+        if response.status_code >= 400 or "access_token" not in token_response:
+            error = token_response.get("error") or f"HTTP {response.status_code}"
+            raise TokenRefreshError(f"トークン更新エラー: {error}")
+        return RefreshedToken(
+            access_token=token_response["access_token"],
+            refresh_token=token_response.get("refresh_token"),
+            expires_at=token_expires_at(token_response.get("expires_in"), now=now)
+        )
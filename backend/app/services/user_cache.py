@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..crud.cache import from_snapshot, snapshot
+from ..models.user import User
+
+class UserCache:
+    """
+    認証済みリクエストで読み込むUserを短時間キャッシュします
+
+    セッションをまたいでインスタンスを共有しないよう、列の値のスナップショットを保持し、
+    取り出すときに db.merge(load=False) で呼び出し側のセッションへSELECTなしで結び付けます。
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl: float,
+        max_entries: int,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: "OrderedDict[int, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, db: Session, user_id: int) -> Optional[User]:
+        now = self._clock()
+        values = self._lookup(user_id, now)
+        if values is not None:
+            return from_snapshot(db, User, values)
+
+        db_obj = db.get(User, user_id)
+        if db_obj is not None:
+            self._store(db_obj, now)
+        return db_obj
+
+    async def aget(self, db: AsyncSession, user_id: int) -> Optional[User]:
+        """
+        get の AsyncSession 版です
+        """
+        now = self._clock()
+        values = self._lookup(user_id, now)
+        if values is not None:
+            return await db.run_sync(lambda session: from_snapshot(session, User, values))
+
+        db_obj = await db.get(User, user_id)
+        if db_obj is not None:
+            self._store(db_obj, now)
+        return db_obj
+
+    def _lookup(self, user_id: int, now: float) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            self._entries.pop(user_id, None)
+            self.misses += 1
+            return None
+
+    def _store(self, db_obj: User, now: float) -> None:
+        with self._lock:
+            self._entries[db_obj.id] = (snapshot(db_obj), now + self.ttl)
+            self._entries.move_to_end(db_obj.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+user_cache = UserCache(
+    ttl=settings.USER_CACHE_TTL_SECONDS,
+    max_entries=settings.USER_CACHE_MAX_ENTRIES
+)
+
+def get_user_cache() -> UserCache:
+    """
+    ユーザーキャッシュを返します（依存性注入用）
+    """
+    return user_cache
@@ -0,0 +1,174 @@
+from typing import Any, Dict, Iterable, Optional, Union
+
+import httpx
+from fastapi import Depends
+from ..config import settings
+from .http_clients import get_youtube_http_client
+
+YOUTUBE_API_BASE_URL = "https://www.googleapis.com/youtube/v3"
+
+TimeoutTypes = Union[float, httpx.Timeout, None]
+
+class YouTubeAPIError(Exception):
+    """YouTube Data APIがエラーを返した場合の例外"""
+
+    def __init__(self, status_code: int, message: str, reason: Optional[str] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+        self.reason = reason
+
+class YouTubeAPI:
+    """
+    httpxを使った非同期のYouTube Data APIクライアント
+
+    クライアント (httpx.AsyncClient) は呼び出し側から受け取り、
+    コネクションプールをリクエスト間で共有します。
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        *,
+        api_key: Optional[str] = None,
+        timeout: TimeoutTypes = None
+    ):
+        self.client = client
+        self.api_key = api_key
+        self.timeout = timeout
+
+    async def _get(
+        self,
+        resource: str,
+        params: Dict[str, Any],
+        *,
+        access_token: Optional[str] = None,
+        etag: Optional[str] = None,
+        timeout: TimeoutTypes = None
+    ) -> Optional[Dict[str, Any]]:
+        query = {key: value for key, value in params.items() if value is not None}
+        headers = {}
+        if etag:
+            # 条件付きリクエスト: 変更がなければ304が返り、本文は送られない
+            headers["If-None-Match"] = etag
+        if access_token:
+            headers["Authorization"] = f"Bearer {access_token}"
+        elif self.api_key:
+            query["key"] = self.api_key
+
+        request_timeout = timeout if timeout is not None else self.timeout
+        response = await self.client.get(
+            f"{YOUTUBE_API_BASE_URL}/{resource}",
+            params=query,
+            headers=headers,
+            timeout=request_timeout if request_timeout is not None else httpx.USE_CLIENT_DEFAULT
+        )
+        if response.status_code == 304:
+            return None
+        if response.status_code >= 400:
+            raise _error_from_response(response)
+        return response.json()
+
+    async def search(
+        self,
+        *,
+        q: str,
+        part: str = "snippet",
+        max_results: int = 10,
+        type: str = "video",
+        page_token: Optional[str] = None,
+        access_token: Optional[str] = None,
+        timeout: TimeoutTypes = None
+    ) -> Dict[str, Any]:
+        return await self._get(
+            "search",
+            {"part": part, "q": q, "type": type, "maxResults": max_results, "pageToken": page_token},
+            access_token=access_token,
+            timeout=timeout
+        )
+
+    async def playlists(
+        self,
+        *,
+        part: str = "snippet",
+        mine: Optional[bool] = None,
+        ids: Optional[Iterable[str]] = None,
+        max_results: int = 50,
+        page_token: Optional[str] = None,
+        access_token: Optional[str] = None,
+        etag: Optional[str] = None,
+        timeout: TimeoutTypes = None
+    ) -> Optional[Dict[str, Any]]:
+        return await self._get(
+            "playlists",
+            {
+                "part": part,
+                "mine": _bool_param(mine),
+                "id": ",".join(ids) if ids else None,
+                "maxResults": max_results,
+                "pageToken": page_token
+            },
+            access_token=access_token,
+            etag=etag,
+            timeout=timeout
+        )
+
+    async def playlist_items(
+        self,
+        *,
+        playlist_id: str,
+        part: str = "snippet,contentDetails",
+        max_results: int = 50,
+        page_token: Optional[str] = None,
+        access_token: Optional[str] = None,
+        etag: Optional[str] = None,
+        timeout: TimeoutTypes = None
+    ) -> Optional[Dict[str, Any]]:
+        return await self._get(
+            "playlistItems",
+            {"part": part, "playlistId": playlist_id, "maxResults": max_results, "pageToken": page_token},
+            access_token=access_token,
+            etag=etag,
+            timeout=timeout
+        )
+
+    async def videos(
+        self,
+        *,
+        ids: Iterable[str],
+        part: str = "snippet,contentDetails,statistics",
+        access_token: Optional[str] = None,
+        etag: Optional[str] = None,
+        timeout: TimeoutTypes = None
+    ) -> Optional[Dict[str, Any]]:
+        return await self._get(
+            "videos",
+            {"part": part, "id": ",".join(ids)},
+            access_token=access_token,
+            etag=etag,
+            timeout=timeout
+        )
+
+def _bool_param(value: Optional[bool]) -> Optional[str]:
+    if value is None:
+        return None
+    return "true" if value else "false"
+
+def _error_from_response(response: httpx.Response) -> YouTubeAPIError:
+    message = response.text
+    reason = None
+    try:
+        error = response.json().get("error", {})
+        message = error.get("message", message)
+        errors = error.get("errors") or []
+        if errors:
+            reason = errors[0].get("reason")
+    except ValueError:
+        pass
+    return YouTubeAPIError(response.status_code, message, reason)
+
+def get_youtube_api(client: httpx.AsyncClient = Depends(get_youtube_http_client)) -> YouTubeAPI:
+    """
+    ルーターで使うYouTubeAPIを返します（依存性注入用）
+    """
+    return YouTubeAPI(client, api_key=settings.YOUTUBE_API_KEY)
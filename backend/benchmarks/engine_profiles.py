@@ -0,0 +1,93 @@
+"""
+データベースエンジンのプロファイルごとのスループットを比較します
+
+    cd backend
+    python -m benchmarks.engine_profiles --writes 2000 --reads 5000 --threads 8
+
+一時ディレクトリのSQLiteファイルに対し、1件ずつコミットする書き込みと、
+複数スレッドからの読み込み（書き込みと同時に実行）を計測します。
+PostgreSQLを計測する場合は --url で空のデータベースを指定してください。
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy.orm import sessionmaker
+from app.crud import video as crud_video
+from app.database import ENGINE_PROFILES, create_db_engine
+from app.models.base import BaseModel
+
+def run(url: str, profile: str, writes: int, reads: int, threads: int) -> dict:
+    engine = create_db_engine(url, profile=profile)
+    BaseModel.metadata.drop_all(bind=engine)
+    BaseModel.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    # 1件ずつコミットする書き込み（同期処理でのcreate相当）
+    start = time.perf_counter()
+    with Session() as db:
+        for i in range(writes):
+            crud_video.create(db, obj_in={"youtube_video_id": f"bench_{i}", "title": f"Video {i}"})
+    write_seconds = time.perf_counter() - start
+
+    # 書き込みと並行した読み込み
+    errors = []
+    def reader(count: int, offset: int) -> None:
+        with Session() as db:
+            for i in range(count):
+                try:
+                    crud_video.get_by_youtube_id(db, youtube_id=f"bench_{(offset + i) % writes}")
+                except Exception as e:  # busy などを集計する
+                    errors.append(e)
+                    db.rollback()
+
+    def writer(count: int) -> None:
+        with Session() as db:
+            for i in range(count):
+                try:
+                    crud_video.create(db, obj_in={"youtube_video_id": f"bench_w_{i}", "title": "w"})
+                except Exception as e:
+                    errors.append(e)
+                    db.rollback()
+
+    per_thread = reads // threads
+    workers = [threading.Thread(target=reader, args=(per_thread, n * per_thread)) for n in range(threads)]
+    workers.append(threading.Thread(target=writer, args=(max(writes // 10, 1),)))
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    read_seconds = time.perf_counter() - start
+
+    BaseModel.metadata.drop_all(bind=engine)
+    engine.dispose()
+    return {
+        "profile": profile,
+        "writes_per_sec": writes / write_seconds,
+        "mixed_reads_per_sec": per_thread * threads / read_seconds,
+        "errors": len(errors)
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="計測するデータベースのURL（省略時は一時SQLiteファイル）")
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--reads", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'profile':<10}{'writes/s':>12}{'mixed reads/s':>16}{'errors':>8}")
+        for profile in ENGINE_PROFILES:
+            url = args.url or f"sqlite:///{os.path.join(tmp, profile + '.db')}"
+            result = run(url, profile, args.writes, args.reads, args.threads)
+            print(
+                f"{result['profile']:<10}{result['writes_per_sec']:>12.0f}"
+                f"{result['mixed_reads_per_sec']:>16.0f}{result['errors']:>8}"
+            )
+
+if __name__ == "__main__":
+    main()
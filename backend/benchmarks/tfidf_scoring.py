@@ -0,0 +1,67 @@
+"""
+TF-IDFによるプレイリスト提案のスコア計算の速度を計測します
+
+    cd backend
+    python -m benchmarks.tfidf_scoring --videos 50000 --playlists 200
+
+語彙からランダムに作った動画の文書について、ベクトル化・プレイリストの重心の計算・
+全動画×全プレイリストのスコア計算と上位k件の抽出の時間をそれぞれ計測します。
+データベースの読み書きは含みません。
+"""
+import argparse
+import random
+import time
+
+from app.services.similarity import TfidfVectorizer, centroids, top_k_scores
+
+def run(videos: int, playlists: int, vocabulary: int, terms: int, members: int, top_k: int) -> dict:
+    rng = random.Random(0)
+    words = [f"w{i}" for i in range(vocabulary)]
+    # プレイリストごとに偏った語を使い、内容の近い動画がまとまるようにする
+    topics = [rng.sample(words, 50) for _ in range(playlists)]
+    documents = []
+    for i in range(videos):
+        topic = topics[i % playlists]
+        documents.append([rng.choice(topic) if rng.random() < 0.5 else rng.choice(words) for _ in range(terms)])
+
+    start = time.perf_counter()
+    vectors = TfidfVectorizer().fit_transform(documents)
+    vectorize_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    group_vectors = centroids(
+        vectors,
+        ((playlist, playlist + j * playlists) for playlist in range(playlists) for j in range(members)),
+        playlists
+    )
+    centroid_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    top, _ = top_k_scores(vectors, group_vectors, top_k)
+    score_seconds = time.perf_counter() - start
+
+    accuracy = sum(top[i, 0] == i % playlists for i in range(videos)) / videos
+    return {
+        "vocabulary": vectors.shape[1],
+        "vectorize_seconds": vectorize_seconds,
+        "centroid_seconds": centroid_seconds,
+        "score_seconds": score_seconds,
+        "top1_accuracy": accuracy
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--videos", type=int, default=50000)
+    parser.add_argument("--playlists", type=int, default=200)
+    parser.add_argument("--vocabulary", type=int, default=30000)
+    parser.add_argument("--terms", type=int, default=40, help="動画1件あたりの語数")
+    parser.add_argument("--members", type=int, default=20, help="重心に使うプレイリストあたりの動画数")
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    result = run(args.videos, args.playlists, args.vocabulary, args.terms, args.members, args.top_k)
+    for key, value in result.items():
+        print(f"{key:>18}: {value:.3f}" if isinstance(value, float) else f"{key:>18}: {value}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+テスト用のYouTube Data APIのフェイク（httpx.MockTransportで使用）
+"""
+from typing import Dict, List, Optional, Set
+import hashlib
+import json
+import httpx
+
+def _etag(body: Dict) -> str:
+    return '"' + hashlib.sha1(json.dumps(body, sort_keys=True).encode()).hexdigest() + '"'
+
+class FakeYouTube:
+    def __init__(self, page_size: int = 50):
+        self.page_size = page_size
+        self.playlists: Dict[str, Dict] = {}
+        self.videos: Dict[str, Dict] = {}
+        self.calls: List[httpx.Request] = []
+        # 設定すると、これ以外のアクセストークンには401を返す
+        self.valid_tokens: Optional[Set[str]] = None
+
+    def add_video(self, video_id: str, **snippet) -> None:
+        self.videos[video_id] = {
+            "id": video_id,
+            "snippet": {
+                "title": f"Video {video_id}",
+                "description": f"Description {video_id}",
+                "channelId": "channel_1",
+                "channelTitle": "Channel 1",
+                "publishedAt": "2024-01-01T00:00:00Z",
+                "tags": ["fake"],
+                **snippet
+            },
+            "contentDetails": {"duration": "PT1M"},
+            "statistics": {"viewCount": "10", "likeCount": "1"}
+        }
+
+    def add_playlist(self, playlist_id: str, video_ids: List[str], title: str = "") -> None:
+        self.playlists[playlist_id] = {"title": title or f"Playlist {playlist_id}", "video_ids": list(video_ids)}
+        for video_id in video_ids:
+            if video_id not in self.videos:
+                self.add_video(video_id)
+
+    def calls_to(self, resource: str) -> List[httpx.Request]:
+        return [request for request in self.calls if request.url.path.endswith(f"/{resource}")]
+
+    def _page(self, items: List[Dict], request: httpx.Request) -> Dict:
+        size = min(int(request.url.params.get("maxResults", self.page_size)), self.page_size)
+        start = int(request.url.params.get("pageToken") or 0)
+        page = {"items": items[start:start + size], "pageInfo": {"totalResults": len(items)}}
+        if start + size < len(items):
+            page["nextPageToken"] = str(start + size)
+        page["etag"] = _etag(page)
+        return page
+
+    def _respond(self, request: httpx.Request, body: Dict) -> httpx.Response:
+        if "etag" in body and request.headers.get("If-None-Match") == body["etag"]:
+            return httpx.Response(304)
+        return httpx.Response(200, json=body)
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.calls.append(request)
+        if self.valid_tokens is not None:
+            token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+            if token not in self.valid_tokens:
+                return httpx.Response(401, json={"error": {"message": "Invalid Credentials", "errors": [{"reason": "authError"}]}})
+        resource = request.url.path.rsplit("/", 1)[-1]
+        params = request.url.params
+        if resource == "playlists":
+            items = []
+            for playlist_id, data in self.playlists.items():
+                item = {
+                    "id": playlist_id,
+                    "snippet": {"title": data["title"], "description": ""},
+                    "contentDetails": {"itemCount": len(data["video_ids"])}
+                }
+                # 実際のAPIと同じく、所属動画が変わるとプレイリストのETagも変わる
+                item["etag"] = _etag({**item, "videoIds": data["video_ids"]})
+                items.append(item)
+            return self._respond(request, self._page(items, request))
+        if resource == "playlistItems":
+            playlist = self.playlists.get(params["playlistId"])
+            if playlist is None:
+                return httpx.Response(404, json={"error": {"message": "playlistNotFound"}})
+            items = [{"contentDetails": {"videoId": video_id}} for video_id in playlist["video_ids"]]
+            return self._respond(request, self._page(items, request))
+        if resource == "videos":
+            ids = params["id"].split(",")
+            if len(ids) > 50:
+                return httpx.Response(400, json={"error": {"message": "tooManyIds"}})
+            return httpx.Response(200, json={"items": [self.videos[i] for i in ids if i in self.videos]})
+        return httpx.Response(404, json={"error": {"message": "notFound"}})
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handler)
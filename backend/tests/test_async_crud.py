@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.crud import aunit_of_work, user, video
+from app.database import async_database_url, async_engine_options, create_async_db_engine
+from app.models.base import BaseModel
+
+def _run_with_session(tmp_path, scenario):
+    async def main():
+        engine = create_async_db_engine(f"sqlite:///{tmp_path / 'async.db'}", profile="tuned")
+        async with engine.begin() as conn:
+            await conn.run_sync(BaseModel.metadata.create_all)
+        try:
+            async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+                return await scenario(db)
+        finally:
+            await engine.dispose()
+    return asyncio.run(main())
+
+def test_async_database_url():
+    """同期用URLが非同期ドライバーのURLに変換されることをテスト"""
+    assert async_database_url("sqlite:///./app.db") == "sqlite+aiosqlite:///./app.db"
+    assert async_database_url("postgresql+psycopg2://u:p@localhost/db") == "postgresql+asyncpg://u:p@localhost/db"
+    options = async_engine_options("postgresql://u:p@localhost/db", "tuned")
+    assert options["connect_args"] == {"server_settings": {"statement_timeout": "30000"}}
+    with pytest.raises(ValueError):
+        async_database_url("mysql://u:p@localhost/db")
+
+def test_async_crud_operations(tmp_path):
+    """非同期版のCRUD操作のテスト"""
+    async def scenario(db):
+        created = await user.acreate(db, obj_in={"email": "async@example.com", "google_id": "async_google_id"})
+        assert (await user.aget(db, created.id)).email == "async@example.com"
+        assert (await user.aget_by_email(db, email="async@example.com")).id == created.id
+
+        updated = await user.aupdate(db, db_obj=created, obj_in={"name": "Async User"})
+        assert updated.name == "Async User"
+
+        ids = await video.acreate_many(db, objs_in=[
+            {"youtube_video_id": f"async_vid_{i}", "title": f"Video {i}"} for i in range(5)
+        ], return_ids=True)
+        assert len(ids) == 5
+        upserted = await video.aupsert_many(db, objs_in=[
+            {"youtube_video_id": "async_vid_0", "title": "Updated"},
+            {"youtube_video_id": "async_vid_new", "title": "New"}
+        ], return_ids=True)
+        assert upserted[0] == ids[0]
+
+        first = await video.aget_multi_page(db, limit=4)
+        second = await video.aget_multi_page(db, cursor=first.next_cursor, limit=4)
+        assert len(first.items) + len(second.items) == 6
+        assert len(await video.aget_multi(db, skip=1, limit=2)) == 2
+
+        await user.adelete(db, id=created.id)
+        assert await user.aget(db, created.id) is None
+
+    _run_with_session(tmp_path, scenario)
+
+def test_async_unit_of_work(tmp_path):
+    """aunit_of_work内の非同期の操作が1つのトランザクションにまとめられることをテスト"""
+    async def scenario(db):
+        async with aunit_of_work(db):
+            await video.acreate(db, obj_in={"youtube_video_id": "async_uow_1"})
+            await video.acreate_many(db, objs_in=[{"youtube_video_id": "async_uow_2"}])
+            assert db.in_transaction()
+        assert not db.in_transaction()
+        assert len(await video.aget_multi(db)) == 2
+
+        with pytest.raises(RuntimeError):
+            async with aunit_of_work(db):
+                await video.acreate(db, obj_in={"youtube_video_id": "async_uow_3"})
+                async with aunit_of_work(db):
+                    await video.acreate(db, obj_in={"youtube_video_id": "async_uow_4"})
+                raise RuntimeError("boom")
+        assert len(await video.aget_multi(db)) == 2
+
+    _run_with_session(tmp_path, scenario)
@@ -0,0 +1,207 @@
+from datetime import datetime, timedelta
+
+from app.crud import user, playlist, video, classification, classification_rule
+from app.models.classification import Classification
+from app.services.classification_worker import ClassificationWorker, backoff_delay, rule_confidence_handler
+from .test_database import TestingSessionLocal, db_session
+
+class Clock:
+    def __init__(self):
+        self.now = datetime(2026, 1, 1)
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += timedelta(seconds=seconds)
+
+def _setup_pending(db_session, count=6):
+    user_obj = user.create(db_session, obj_in={"email": "worker@example.com", "google_id": "worker_google_id"})
+    python = playlist.create(db_session, obj_in={"youtube_playlist_id": "PLworkerpy01", "user_id": user_obj.id})
+    cooking = playlist.create(db_session, obj_in={"youtube_playlist_id": "PLworkerck01", "user_id": user_obj.id})
+    classification_rule.create_many(db_session, objs_in=[
+        {"user_id": user_obj.id, "playlist_id": python.id, "rule_type": "keyword", "rule_value": "python", "priority": 1},
+        {"user_id": user_obj.id, "playlist_id": cooking.id, "rule_type": "keyword", "rule_value": "料理", "priority": 2},
+    ])
+    titles = ["Python入門", "Pythonで料理", "日記"]
+    video_ids = video.create_many(db_session, objs_in=[
+        {"youtube_video_id": f"worker_vid_{i}", "title": titles[i % 3]} for i in range(count)
+    ], return_ids=True)
+    classification.create_many(db_session, objs_in=[
+        {
+            "user_id": user_obj.id,
+            "video_id": video_id,
+            "playlist_id": python.id if i % 3 == 0 else cooking.id,
+            "status": "pending"
+        }
+        for i, video_id in enumerate(video_ids)
+    ])
+    return python, cooking
+
+def _by_status(db_session):
+    db_session.expire_all()
+    counts = {}
+    for db_classification in db_session.query(Classification):
+        counts[db_classification.status] = counts.get(db_classification.status, 0) + 1
+    return counts
+
+def test_backoff_delay():
+    """再試行までの待ち時間が指数的に増え、上限で止まることをテスト"""
+    assert [backoff_delay(n, base=30, maximum=200) for n in range(1, 6)] == [30, 60, 120, 200, 200]
+
+def test_worker_completes_pending_classifications(db_session):
+    """ワーカーがpendingの分類をルールの信頼度で完了にすることをテスト"""
+    python, cooking = _setup_pending(db_session)
+    worker = ClassificationWorker(TestingSessionLocal, batch_size=4, clock=Clock())
+
+    first = worker.run_once()
+    second = worker.run_once()
+    assert (first.claimed, first.completed) == (4, 4)
+    assert (second.claimed, second.completed) == (2, 2)
+    assert worker.run_once().claimed == 0
+
+    db_session.expire_all()
+    confidences = {}
+    for db_classification in db_session.query(Classification):
+        assert db_classification.status == "completed"
+        assert db_classification.lease_token is None and db_classification.locked_until is None
+        assert db_classification.attempts == 1
+        confidences[db_classification.video.title] = db_classification.confidence
+    # 日記はどのルールにも一致せず、Pythonで料理は優先度の高いpythonのルールに負ける
+    assert confidences == {"Python入門": 1.0, "Pythonで料理": 0.5, "日記": 0.0}
+
+def test_leased_rows_are_not_claimed_twice(db_session):
+    """リース中の行は他のワーカーに渡らず、リースが切れると処理し直されることをテスト"""
+    _setup_pending(db_session)
+    clock = Clock()
+    held = classification.claim_pending(
+        db_session,
+        lease_token="stalled-worker",
+        limit=2,
+        locked_until=clock.now + timedelta(seconds=60),
+        now=clock.now,
+        max_attempts=5
+    )
+    assert len(held) == 2
+
+    worker = ClassificationWorker(TestingSessionLocal, batch_size=10, lease_seconds=60, clock=clock)
+    assert worker.run_once().claimed == 4
+    assert worker.run_once().claimed == 0
+
+    # 停止したワーカーのリースが切れると他のワーカーが引き継ぐ
+    clock.advance(61)
+    assert worker.run_once().claimed == 2
+    assert _by_status(db_session) == {"completed": 6}
+
+    # 引き継がれた後は、元のワーカーの結果は書き込まれない
+    written = classification.finish_leased(
+        db_session,
+        lease_token="stalled-worker",
+        rows=[{"id": held[0].id, "status": "failed", "last_error": "late"}]
+    )
+    assert written == 0
+    assert _by_status(db_session) == {"completed": 6}
+
+def test_lease_is_renewed_between_chunks(db_session):
+    """バッチの処理が lease_seconds を超えても、チャンクの間でリースが延長されることをテスト"""
+    _setup_pending(db_session)
+    clock = Clock()
+    stolen = []
+
+    def slow_handler(db, chunk):
+        clock.advance(40)
+        # 処理中に他のワーカーがリースを取ろうとしても取れない
+        with TestingSessionLocal() as other_db:
+            stolen.extend(classification.claim_pending(
+                other_db,
+                lease_token="other-worker",
+                limit=10,
+                locked_until=clock.now + timedelta(seconds=60),
+                now=clock.now,
+                max_attempts=5
+            ))
+        return rule_confidence_handler(db, chunk)
+
+    worker = ClassificationWorker(
+        TestingSessionLocal, handler=slow_handler, batch_size=10, chunk_size=2, lease_seconds=60, clock=clock
+    )
+    result = worker.run_once()
+    assert stolen == []
+    assert (result.claimed, result.completed, result.lost) == (6, 6, 0)
+    assert _by_status(db_session) == {"completed": 6}
+
+def test_row_deleted_between_chunks_is_skipped(db_session):
+    """処理中に削除された行があっても、リースを失ったとみなさずに残りを処理することをテスト"""
+    _setup_pending(db_session)
+    handled = []
+
+    def deleting_handler(db, chunk):
+        if not handled:
+            # 動画やプレイリストの削除と同じく、後のチャンクの行が消える
+            with TestingSessionLocal() as other_db:
+                last = other_db.query(Classification).order_by(Classification.id.desc()).first()
+                classification.delete(other_db, id=last.id)
+        handled.extend(db_classification.id for db_classification in chunk)
+        return rule_confidence_handler(db, chunk)
+
+    worker = ClassificationWorker(TestingSessionLocal, handler=deleting_handler, batch_size=10, chunk_size=2, clock=Clock())
+    result = worker.run_once()
+    assert len(handled) == 5
+    assert (result.claimed, result.completed, result.retried, result.lost) == (6, 5, 0, 0)
+    assert _by_status(db_session) == {"completed": 5}
+
+def test_failures_are_retried_with_backoff(db_session):
+    """失敗した行がバックオフ後に再試行され、上限回数で failed になることをテスト"""
+    _setup_pending(db_session, count=3)
+    clock = Clock()
+    calls = []
+
+    def flaky_handler(db, batch):
+        calls.append(len(batch))
+        return {
+            db_classification.id: (RuntimeError("boom") if db_classification.video.title == "日記" else 1.0)
+            for db_classification in batch
+        }
+
+    worker = ClassificationWorker(
+        TestingSessionLocal,
+        handler=flaky_handler,
+        max_attempts=3,
+        backoff_base=10,
+        backoff_max=100,
+        clock=clock
+    )
+    result = worker.run_once()
+    assert (result.completed, result.retried, result.failed) == (2, 1, 0)
+
+    # バックオフ中は処理されない
+    clock.advance(9)
+    assert worker.run_once().claimed == 0
+    clock.advance(1)
+    assert worker.run_once().retried == 1
+    clock.advance(20)
+    result = worker.run_once()
+    assert (result.claimed, result.failed) == (1, 1)
+    assert calls == [3, 1, 1]
+
+    db_session.expire_all()
+    failed = db_session.query(Classification).filter(Classification.status == "failed").one()
+    assert failed.attempts == 3
+    assert "boom" in failed.last_error
+    assert _by_status(db_session) == {"completed": 2, "failed": 1}
+
+def test_handler_exception_fails_whole_batch(db_session):
+    """handler が例外を送出した場合はバッチ全体を再試行に回すことをテスト"""
+    _setup_pending(db_session, count=3)
+
+    def broken_handler(db, batch):
+        raise ValueError("handler crashed")
+
+    worker = ClassificationWorker(TestingSessionLocal, handler=broken_handler, clock=Clock())
+    result = worker.run_once()
+    assert (result.claimed, result.retried) == (3, 3)
+    db_session.expire_all()
+    for db_classification in db_session.query(Classification):
+        assert db_classification.status == "pending"
+        assert db_classification.lease_token is None
+        assert db_classification.next_attempt_at is not None
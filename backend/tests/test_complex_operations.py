@@ -133,7 +133,7 @@ def test_complex_relationships(db_session):
     
     # リレーションシップが正しく設定されていることを確認
     assert len(user.playlists) == 1
-    assert len(playlist.videos) == 1
+    assert playlist.videos.count() == 1
     assert len(user.classifications) == 1
     assert len(user.classification_rules) == 1
     assert len(user.classification_histories) == 1
@@ -1,12 +1,14 @@
 import pytest
 from sqlalchemy import create_engine, event
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.orm import sessionmaker, Session, selectinload
 from app.models.user import User
 from app.models.playlist import Playlist
 from app.models.video import Video
 from app.models.classification import Classification, ClassificationRule, ClassificationHistory
 from app.crud import user, playlist, video, classification, classification_rule, classification_history
 from app.models.base import BaseModel
+from app.crud.base import InvalidCursorError, unit_of_work
+from app.crud.cache import from_snapshot, snapshot
 from datetime import datetime, UTC
 
 # テスト用のデータベース設定
@@ -333,4 +335,473 @@ def test_get_classification_history_by_video_and_playlist(db_session: Session):
     histories = classification_history.get_by_video_and_playlist(
         db_session, video_id=video_obj.id, playlist_id=playlist_obj.id
     )
-    assert len(histories) == 2 
\ No newline at end of file
+    assert len(histories) == 2
+
+# Bulk Tests
+def _video_rows(count, prefix="bulk"):
+    return [
+        {**test_video_data, "youtube_video_id": f"{prefix}_{i}", "title": f"Video {i}"}
+        for i in range(count)
+    ]
+
+def test_create_many_videos(db_session: Session):
+    """チャンクに分けた一括作成で全行が作成され、IDが入力順に返ることをテスト"""
+    ids = video.create_many(db_session, objs_in=_video_rows(1200), chunk_size=500, return_ids=True)
+    assert len(ids) == 1200
+    assert len(set(ids)) == 1200
+    assert video.get(db_session, id=ids[10]).youtube_video_id == "bulk_10"
+    assert video.get(db_session, id=ids[10]).created_at is not None
+
+def test_create_many_without_ids(db_session: Session):
+    """return_idsを指定しない一括作成はNoneを返すことをテスト"""
+    assert video.create_many(db_session, objs_in=_video_rows(3)) is None
+    assert len(video.get_multi(db_session)) == 3
+
+def test_upsert_many_inserts_and_updates(db_session: Session):
+    """一括upsertで新しい行は作成され、既存の行は更新されることをテスト"""
+    existing = video.create(db_session, obj_in={**test_video_data, "youtube_video_id": "bulk_1"})
+    rows = _video_rows(3)
+    rows[1]["title"] = "Updated Title"
+
+    ids = video.upsert_many(db_session, objs_in=rows, return_ids=True)
+
+    assert ids[1] == existing.id
+    assert len(set(ids)) == 3
+    db_session.expire_all()
+    assert video.get(db_session, id=existing.id).title == "Updated Title"
+    assert len(video.get_multi(db_session)) == 3
+
+def test_upsert_many_duplicate_keys_use_last_value(db_session: Session):
+    """同じキーが重複した場合は最後の値が使われることをテスト"""
+    rows = [
+        {**test_video_data, "youtube_video_id": "dup", "title": "First"},
+        {**test_video_data, "youtube_video_id": "dup", "title": "Second"},
+    ]
+    ids = video.upsert_many(db_session, objs_in=rows, return_ids=True)
+    assert ids[0] == ids[1]
+    assert video.get_by_youtube_id(db_session, youtube_id="dup").title == "Second"
+
+def test_upsert_many_playlists_by_natural_key(db_session: Session):
+    """自然キーでプレイリストを一括upsertし、指定した列だけが更新されることをテスト"""
+    user_obj = user.create(db_session, obj_in=test_user_data)
+    rows = [
+        {**test_playlist_data, "youtube_playlist_id": f"PLbulk{i:06d}", "user_id": user_obj.id}
+        for i in range(5)
+    ]
+    playlist.upsert_many(db_session, objs_in=rows)
+    rows[0]["title"] = "Renamed"
+    ids = playlist.upsert_many(db_session, objs_in=rows, update_fields=["title"], return_ids=True)
+    assert len(ids) == 5
+    assert len(playlist.get_by_user_id(db_session, user_id=user_obj.id)) == 5
+    assert playlist.get_by_youtube_id(db_session, youtube_id="PLbulk000000").title == "Renamed"
+
+def test_bulk_rows_with_missing_columns(db_session: Session):
+    """列が欠けた行を含む一括処理で、既存の値や列の既定値がNULLで上書きされないことをテスト"""
+    existing = video.create(db_session, obj_in={
+        **test_video_data, "youtube_video_id": "partial_b", "title": "Kept", "description": "Kept description"
+    })
+    ids = video.upsert_many(db_session, objs_in=[
+        {"youtube_video_id": "partial_a", "title": "T", "description": "x"},
+        {"youtube_video_id": "partial_b", "view_count": 5},
+    ], return_ids=True)
+    assert ids[1] == existing.id
+    db_session.expire_all()
+    updated = video.get(db_session, id=existing.id)
+    assert (updated.title, updated.description, updated.view_count) == ("Kept", "Kept description", 5)
+
+    user_obj = user.create(db_session, obj_in=test_user_data)
+    playlist_obj = playlist.create(db_session, obj_in={**test_playlist_data, "user_id": user_obj.id})
+    ids = classification.create_many(db_session, objs_in=[
+        {"user_id": user_obj.id, "video_id": ids[0], "playlist_id": playlist_obj.id, "status": "pending", "attempts": 2},
+        {"user_id": user_obj.id, "video_id": ids[1], "playlist_id": playlist_obj.id, "status": "pending"},
+    ], return_ids=True)
+    db_session.expire_all()
+    assert [classification.get(db_session, id=id).attempts for id in ids] == [2, 0]
+
+def test_upsert_many_requires_natural_key(db_session: Session):
+    """自然キーのないモデルの一括upsertはエラーになることをテスト"""
+    with pytest.raises(ValueError):
+        classification_history.upsert_many(db_session, objs_in=[{"action": "add"}])
+
+# Keyset Pagination Tests
+def test_get_multi_page_walks_all_rows(db_session: Session):
+    """カーソルで全ページを辿ると全行が重複なく取得できることをテスト"""
+    video.create_many(db_session, objs_in=_video_rows(25))
+    seen = []
+    cursor = None
+    while True:
+        page = video.get_multi_page(db_session, cursor=cursor, limit=10)
+        seen.extend(v.youtube_video_id for v in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert len(seen) == 25
+    assert len(set(seen)) == 25
+
+def test_page_is_stable_while_rows_are_inserted(db_session: Session):
+    """ページの間に行が追加されても、取得済みの行が重複しないことをテスト"""
+    video.create_many(db_session, objs_in=_video_rows(10))
+    first = video.get_by_channel_id_page(db_session, channel_id="test_channel_id", limit=5)
+    video.create_many(db_session, objs_in=_video_rows(3, prefix="late"))
+    second = video.get_by_channel_id_page(
+        db_session, channel_id="test_channel_id", cursor=first.next_cursor, limit=5
+    )
+    ids = [v.id for v in first.items + second.items]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == 10
+
+def test_playlists_page_by_user(db_session: Session):
+    """ユーザーのプレイリストのページ取得と、最後のページのカーソルがNoneになることをテスト"""
+    user_obj = user.create(db_session, obj_in=test_user_data)
+    playlist.create_many(db_session, objs_in=[
+        {**test_playlist_data, "youtube_playlist_id": f"PLpage{i:06d}", "user_id": user_obj.id}
+        for i in range(3)
+    ])
+    page = playlist.get_by_user_id_page(db_session, user_id=user_obj.id, limit=2)
+    assert len(page.items) == 2
+    last = playlist.get_by_user_id_page(db_session, user_id=user_obj.id, cursor=page.next_cursor, limit=2)
+    assert len(last.items) == 1
+    assert last.next_cursor is None
+
+def test_classification_history_page_is_newest_first(db_session: Session):
+    """分類履歴のページが新しい順に並ぶことをテスト"""
+    user_obj = user.create(db_session, obj_in=test_user_data)
+    playlist_obj = playlist.create(db_session, obj_in={**test_playlist_data, "user_id": user_obj.id})
+    video_obj = video.create(db_session, obj_in=test_video_data)
+    classification_history.create_many(db_session, objs_in=[
+        {"user_id": user_obj.id, "playlist_id": playlist_obj.id, "video_id": video_obj.id, "action": "add"}
+        for _ in range(5)
+    ])
+    page = classification_history.get_by_user_page(db_session, user_id=user_obj.id, limit=3)
+    rest = classification_history.get_by_user_page(
+        db_session, user_id=user_obj.id, cursor=page.next_cursor, limit=3
+    )
+    ids = [h.id for h in page.items + rest.items]
+    assert ids == sorted(ids, reverse=True)
+    assert len(ids) == 5
+
+def test_invalid_cursor(db_session: Session):
+    """不正なカーソルでInvalidCursorErrorが発生することをテスト"""
+    with pytest.raises(InvalidCursorError):
+        video.get_multi_page(db_session, cursor="not-a-cursor")
+
+def _count_statements(db_session: Session):
+    counts = {"select": 0, "commit": 0}
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT"):
+            counts["select"] += 1
+
+    def after_commit(session):
+        counts["commit"] += 1
+
+    event.listen(db_session.get_bind(), "before_cursor_execute", before_cursor_execute)
+    event.listen(db_session, "after_commit", after_commit)
+    return counts, lambda: (
+        event.remove(db_session.get_bind(), "before_cursor_execute", before_cursor_execute),
+        event.remove(db_session, "after_commit", after_commit)
+    )
+
+def test_unit_of_work_commits_once(db_session: Session):
+    """unit_of_work内の操作が1回のコミットにまとめられ、refreshのSELECTが発生しないことをテスト"""
+    counts, remove = _count_statements(db_session)
+    try:
+        with unit_of_work(db_session):
+            created = [
+                video.create(db_session, obj_in={"youtube_video_id": f"uow_vid_{i}", "title": f"Video {i}"})
+                for i in range(50)
+            ]
+            assert all(v.id is not None for v in created)
+            video.update_stats(db_session, db_obj=created[0], view_count=100)
+            video.update(db_session, db_obj=created[1], obj_in={"title": "Updated"})
+    finally:
+        remove()
+    assert counts["commit"] == 1
+    assert counts["select"] == 0
+    db_session.expire_all()
+    assert video.get(db_session, created[0].id).view_count == 100
+    assert video.get(db_session, created[1].id).title == "Updated"
+
+def test_unit_of_work_rolls_back_on_error(db_session: Session):
+    """unit_of_work内で例外が発生した場合はすべてロールバックされることをテスト"""
+    with pytest.raises(RuntimeError):
+        with unit_of_work(db_session):
+            video.create(db_session, obj_in={"youtube_video_id": "uow_rollback_1"})
+            with unit_of_work(db_session):
+                video.create_many(db_session, objs_in=[{"youtube_video_id": "uow_rollback_2"}])
+            raise RuntimeError("boom")
+    assert video.get_multi(db_session) == []
+
+def test_explicit_commit_overrides_unit_of_work(db_session: Session):
+    """commit引数で既定の動作を上書きできることをテスト"""
+    created = video.create(db_session, obj_in={"youtube_video_id": "uow_explicit"}, commit=False)
+    db_session.rollback()
+    assert video.get_by_youtube_id(db_session, youtube_id="uow_explicit") is None
+    with unit_of_work(db_session):
+        video.create(db_session, obj_in={"youtube_video_id": "uow_explicit"}, commit=True)
+        db_session.rollback()
+    assert video.get_by_youtube_id(db_session, youtube_id="uow_explicit") is not None
+
+def test_playlist_membership_operations(db_session: Session):
+    """プレイリストの所属動画の追加・削除・存在確認・件数のテスト"""
+    user_obj = user.create(db_session, obj_in=test_user_data)
+    first = playlist.create(db_session, obj_in={**test_playlist_data, "user_id": user_obj.id})
+    second = playlist.create(db_session, obj_in={
+        **test_playlist_data, "youtube_playlist_id": "PLmembership2", "user_id": user_obj.id
+    })
+    ids = video.create_many(db_session, objs_in=[
+        {"youtube_video_id": f"member_vid_{i}"} for i in range(5)
+    ], return_ids=True)
+
+    assert playlist.add_videos(db_session, playlist_id=first.id, video_ids=ids) == 5
+    # 追加済みの動画は無視される
+    assert playlist.add_videos(db_session, playlist_id=first.id, video_ids=ids[:2]) == 0
+    playlist.add_video(db_session, playlist=second, video_id=ids[0])
+
+    assert playlist.has_video(db_session, playlist_id=first.id, video_id=ids[4])
+    assert playlist.count_videos(db_session, playlist_id=first.id) == 5
+    assert playlist.count_videos_by_playlist(db_session, playlist_ids=[first.id, second.id, 999]) == {
+        first.id: 5, second.id: 1, 999: 0
+    }
+
+    assert playlist.remove_videos(db_session, playlist_id=first.id, video_ids=ids[3:]) == 2
+    playlist.remove_video(db_session, playlist=second, video_id=ids[0])
+    assert not playlist.has_video(db_session, playlist_id=first.id, video_id=ids[4])
+    assert playlist.count_videos(db_session, playlist_id=second.id) == 0
+    assert {v.id for v in first.videos} == set(ids[:3])
+
+def test_add_video_does_not_load_collection(db_session: Session):
+    """動画の追加でプレイリストの全動画を読み込まないことをテスト"""
+    user_obj = user.create(db_session, obj_in=test_user_data)
+    playlist_obj = playlist.create(db_session, obj_in={**test_playlist_data, "user_id": user_obj.id})
+    ids = video.create_many(db_session, objs_in=[
+        {"youtube_video_id": f"large_vid_{i}"} for i in range(200)
+    ], return_ids=True)
+    playlist.add_videos(db_session, playlist_id=playlist_obj.id, video_ids=ids[:-1])
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db_session.get_bind(), "before_cursor_execute", listener)
+    try:
+        playlist.add_video(db_session, playlist=playlist_obj, video_id=ids[-1])
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", listener)
+    assert not any("FROM videos" in statement for statement in statements)
+    assert playlist.count_videos(db_session, playlist_id=playlist_obj.id) == 200
+
+def _count_selects(db_session: Session, operation):
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db_session.get_bind(), "before_cursor_execute", listener)
+    try:
+        operation()
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", listener)
+    return len(statements)
+
+def _setup_dashboard(db_session: Session, playlists: int, videos_per_playlist: int):
+    user_obj = user.create(db_session, obj_in=test_user_data)
+    for i in range(playlists):
+        playlist_obj = playlist.create(db_session, obj_in={
+            **test_playlist_data, "youtube_playlist_id": f"PLdash{i:04d}", "user_id": user_obj.id
+        })
+        ids = video.create_many(db_session, objs_in=[
+            {"youtube_video_id": f"dash_{i}_{j}", "title": f"Video {i}-{j}"} for j in range(videos_per_playlist)
+        ], return_ids=True)
+        playlist.add_videos(db_session, playlist_id=playlist_obj.id, video_ids=ids)
+        classification.create_many(db_session, objs_in=[
+            {"user_id": user_obj.id, "video_id": video_id, "playlist_id": playlist_obj.id, "status": "completed"}
+            for video_id in ids
+        ])
+    db_session.expire_all()
+    return user_obj.id
+
+def test_loader_presets_avoid_n_plus_one(db_session: Session):
+    """プリセットを指定すると関連の読み込みが件数によらず一定回数になることをテスト"""
+    user_id = _setup_dashboard(db_session, playlists=3, videos_per_playlist=4)
+
+    def serialize(options):
+        def operation():
+            for db_classification in classification.get_by_user(db_session, user_id=user_id, options=options):
+                db_classification.video.title, db_classification.playlist.title
+        return operation
+
+    lazy = _count_selects(db_session, serialize(None))
+    db_session.expire_all()
+    eager = _count_selects(db_session, serialize(["detail"]))
+    assert eager == 1
+    assert lazy > eager
+
+    db_session.expire_all()
+    count = _count_selects(db_session, lambda: [
+        [c.video.title for c in p.classifications]
+        for p in playlist.get_by_user_id(db_session, user_id=user_id, options=["classifications", "user"])
+    ])
+    assert count == 2
+
+def test_loader_options_accept_raw_options(db_session: Session):
+    """ローダーオプションを直接渡せること、未知のプリセットはエラーになることをテスト"""
+    user_id = _setup_dashboard(db_session, playlists=1, videos_per_playlist=2)
+    count = _count_selects(db_session, lambda: [
+        len(v.playlists) for v in video.get_multi(db_session, options=[selectinload(Video.playlists)])
+    ])
+    assert count == 2
+    with pytest.raises(ValueError):
+        playlist.get_by_user_id(db_session, user_id=user_id, options=["videos"])
+
+def test_dashboard_uses_fixed_number_of_queries(db_session: Session):
+    """ダッシュボードのクエリ回数がプレイリスト・動画の数によらないことをテスト"""
+    user_id = _setup_dashboard(db_session, playlists=5, videos_per_playlist=6)
+    result = []
+    count = _count_selects(db_session, lambda: result.extend(
+        (entry.playlist.title, [v.title for v in entry.videos], [c.video.title for c in entry.classifications])
+        for entry in playlist.get_dashboard(db_session, user_id=user_id)
+    ))
+    assert count == 3
+    assert len(result) == 5
+    assert all(len(videos) == 6 and len(classifications) == 6 for _, videos, classifications in result)
+    assert playlist.get_dashboard(db_session, user_id=999) == []
+
+@pytest.fixture
+def cached_cruds():
+    """自然キーのキャッシュを有効にし、テスト後に無効へ戻す"""
+    now = [0.0]
+    caches = {
+        crud: crud.enable_cache(ttl=60, max_entries=100, clock=lambda: now[0])
+        for crud in (user, video, playlist)
+    }
+    try:
+        yield caches, now
+    finally:
+        for crud in caches:
+            crud.disable_cache()
+
+def test_natural_key_cache_avoids_queries(db_session: Session, cached_cruds):
+    """キャッシュに当たった自然キー検索がSELECTを発行しないことをテスト"""
+    caches, _ = cached_cruds
+    video.create(db_session, obj_in=test_video_data)
+    user.create(db_session, obj_in=test_user_data)
+
+    assert video.get_by_youtube_id(db_session, youtube_id="test_video_id") is not None
+    db_session.expunge_all()
+    found = []
+    count = _count_selects(db_session, lambda: found.extend([
+        video.get_by_youtube_id(db_session, youtube_id="test_video_id"),
+        user.get_by_email(db_session, email=test_user_data["email"]),
+    ]))
+    # 1件目はキャッシュ、2件目は初回なのでSELECTが1回
+    assert count == 1
+    assert found[0].title == "Test Video"
+    assert found[0] in db_session
+    assert video.get_by_youtube_id(db_session, youtube_id="test_video_id") is found[0]
+    assert video.get_by_youtube_id(db_session, youtube_id="unknown") is None
+
+    # 別のキーでも同じ行を引ける
+    db_session.expunge_all()
+    assert user.get_by_google_id(db_session, google_id=test_user_data["google_id"]).email == test_user_data["email"]
+    assert caches[video].stats()["hits"] == 2
+    assert caches[video].stats()["misses"] == 2
+    assert caches[video].stats()["hit_rate"] == 0.5
+
+def test_natural_key_cache_invalidation(db_session: Session, cached_cruds):
+    """update・delete・upsert_many・専用の更新メソッドでキャッシュが無効化されることをテスト"""
+    caches, _ = cached_cruds
+    db_video = video.create(db_session, obj_in=test_video_data)
+    db_user = user.create(db_session, obj_in=test_user_data)
+    video.get_by_youtube_id(db_session, youtube_id="test_video_id")
+    user.get_by_email(db_session, email=test_user_data["email"])
+    user.get_by_google_id(db_session, google_id=test_user_data["google_id"])
+    assert caches[user].stats()["size"] == 2
+
+    video.update(db_session, db_obj=db_video, obj_in={"title": "Updated"})
+    assert caches[video].stats()["size"] == 0
+    db_session.expunge_all()
+    assert video.get_by_youtube_id(db_session, youtube_id="test_video_id").title == "Updated"
+
+    video.upsert_many(db_session, objs_in=[{"youtube_video_id": "test_video_id", "title": "Upserted"}])
+    db_session.expunge_all()
+    assert video.get_by_youtube_id(db_session, youtube_id="test_video_id").title == "Upserted"
+
+    db_video = video.get_by_youtube_id(db_session, youtube_id="test_video_id")
+    video.update_stats(db_session, db_obj=db_video, view_count=5)
+    db_session.expunge_all()
+    assert video.get_by_youtube_id(db_session, youtube_id="test_video_id").view_count == 5
+
+    # 1つのキーの無効化で同じ行を指す他のキーも消える
+    user.upsert_many(db_session, objs_in=[{**test_user_data, "name": "Renamed"}])
+    assert caches[user].stats()["size"] == 0
+    db_session.expunge_all()
+    db_user = user.get_by_google_id(db_session, google_id=test_user_data["google_id"])
+    assert db_user.name == "Renamed"
+    user.update_youtube_tokens(db_session, db_obj=db_user, access_token="new_token")
+    db_session.expunge_all()
+    assert user.get_by_google_id(db_session, google_id=test_user_data["google_id"]).youtube_access_token == "new_token"
+
+    db_video = video.get_by_youtube_id(db_session, youtube_id="test_video_id")
+    video.delete(db_session, id=db_video.id)
+    db_session.expunge_all()
+    assert video.get_by_youtube_id(db_session, youtube_id="test_video_id") is None
+
+def test_natural_key_cache_ttl_and_bound(db_session: Session, cached_cruds):
+    """期限切れのエントリーを読み直すこと、件数の上限を超えると古いものから捨てることをテスト"""
+    caches, now = cached_cruds
+    video.create(db_session, obj_in=test_video_data)
+    video.get_by_youtube_id(db_session, youtube_id="test_video_id")
+    now[0] = 61.0
+    count = _count_selects(db_session, lambda: video.get_by_youtube_id(db_session, youtube_id="test_video_id"))
+    assert count == 1
+
+    cache = video.enable_cache(ttl=60, max_entries=2)
+    video.create_many(db_session, objs_in=_video_rows(3, prefix="lru"))
+    for i in range(3):
+        video.get_by_youtube_id(db_session, youtube_id=f"lru_{i}")
+    assert cache.stats()["size"] == 2
+    assert cache.stats()["evictions"] == 1
+
+def test_natural_key_cache_keeps_unflushed_changes(db_session: Session, cached_cruds):
+    """キャッシュに当たってもセッション内の未フラッシュの変更が上書きされないことをテスト"""
+    video.create(db_session, obj_in=test_video_data)
+    db_video = video.get_by_youtube_id(db_session, youtube_id="test_video_id")
+    db_video.title = "local edit"
+    assert video.get_by_youtube_id(db_session, youtube_id="test_video_id") is db_video
+    assert db_video.title == "local edit"
+
+    # 未フラッシュの変更がなくても、セッション内のインスタンスをそのまま返す
+    db_session.rollback()
+    db_video = video.get_by_youtube_id(db_session, youtube_id="test_video_id")
+    db_video.title = "local edit"
+    values = dict(snapshot(db_video), title="Test Video")
+    assert from_snapshot(db_session, Video, values) is db_video
+    assert db_video.title == "local edit"
+
+def test_natural_key_cache_ignores_uncommitted_rows(db_session: Session, cached_cruds):
+    """コミットされていない行をキャッシュせず、コミット後に古い値を無効化することをテスト"""
+    caches, _ = cached_cruds
+    with pytest.raises(RuntimeError):
+        with unit_of_work(db_session):
+            video.create(db_session, obj_in=test_video_data)
+            assert video.get_by_youtube_id(db_session, youtube_id="test_video_id") is not None
+            raise RuntimeError("rollback")
+    assert caches[video].stats()["size"] == 0
+    with TestingSessionLocal() as other:
+        assert video.get_by_youtube_id(other, youtube_id="test_video_id") is None
+
+    db_video = video.create(db_session, obj_in=test_video_data)
+    with TestingSessionLocal() as other:
+        with unit_of_work(db_session):
+            video.update(db_session, db_obj=db_video, obj_in={"title": "Updated"})
+            # コミット前に別のセッションが古い値を読み込んでキャッシュする
+            assert video.get_by_youtube_id(other, youtube_id="test_video_id").title == "Test Video"
+            assert caches[video].stats()["size"] == 1
+        assert caches[video].stats()["size"] == 0
+    with TestingSessionLocal() as other:
+        assert video.get_by_youtube_id(other, youtube_id="test_video_id").title == "Updated"
+
+def test_natural_key_cache_upsert_invalidates_other_keys(db_session: Session, cached_cruds):
+    """upsert_many が入力にない自然キーのエントリーも行のIDで無効化することをテスト"""
+    user.create(db_session, obj_in={**test_user_data, "name": "old"})
+    assert user.get_by_google_id(db_session, google_id=test_user_data["google_id"]).name == "old"
+
+    user.upsert_many(db_session, objs_in=[{"email": test_user_data["email"], "name": "new"}])
+    with TestingSessionLocal() as other:
+        assert user.get_by_google_id(other, google_id=test_user_data["google_id"]).name == "new"
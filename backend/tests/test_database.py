@@ -1,5 +1,6 @@
 import pytest
 from sqlalchemy import create_engine, exc, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from ..app.database import BaseModel, get_db
 from ..app.models.playlist import Playlist
@@ -19,6 +20,16 @@ event.listen(engine, 'connect', _fk_pragma_on_connect)
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 非同期セッション用（同じファイルを aiosqlite で開く）
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db")
+event.listen(async_engine.sync_engine, 'connect', _fk_pragma_on_connect)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+async def override_get_async_db():
+    """get_async_db の代わりにテスト用DBの非同期セッションを返す"""
+    async with TestingAsyncSessionLocal() as session:
+        yield session
+
 @pytest.fixture(scope="function")
 def db_session():
     """テスト用のデータベースセッションを作成"""
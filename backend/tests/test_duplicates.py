@@ -0,0 +1,123 @@
+import random
+
+import numpy as np
+
+from fastapi.testclient import TestClient
+from app.crud import user, playlist, video
+from app.database import get_async_db
+from app.dependencies import aget_current_user
+from app.main import app
+from app.services.duplicates import (
+    backfill_signatures, decode_signature, duplicate_clusters, estimated_similarity, find_duplicate_videos,
+    lsh_candidate_pairs, minhash_signature, normalize_text, video_minhash
+)
+from .test_database import db_session, override_get_async_db
+
+ORIGINAL = ("【料理】簡単なカレーの作り方 Easy Curry Recipe", "今日は家庭で作れる本格的なカレーを紹介します。材料は玉ねぎ、にんじん、じゃがいもです。")
+MIRROR = ("料理 簡単なカレーの作り方 - Easy Curry Recipe (HD)", "今日は家庭で作れる本格的なカレーを紹介します。材料は玉ねぎ、にんじん、じゃがいもです。 https://example.com")
+OTHER = ("Python入門 第1回 環境構築", "Pythonのインストールからエディタの設定まで解説します。")
+
+def test_normalize_text():
+    """全角・大文字・記号・URLが正規化されることをテスト"""
+    assert normalize_text("ＡＢＣ　Def！ https://example.com/x") == "abcdef"
+    assert normalize_text(None) == ""
+
+def test_minhash_similarity():
+    """ほぼ同じ文面の署名は近く、異なる文面の署名は遠いことをテスト"""
+    original = minhash_signature(*ORIGINAL)
+    assert original.dtype.name == "uint32" and len(original) == 64
+    assert (minhash_signature(*ORIGINAL) == original).all()
+    assert estimated_similarity(original, minhash_signature(*MIRROR)) > 0.7
+    assert estimated_similarity(original, minhash_signature(*OTHER)) < 0.2
+    assert minhash_signature("", None) is None
+
+    data = video_minhash(*ORIGINAL)
+    assert len(data) == 256
+    assert (decode_signature(data) == original).all()
+
+def test_lsh_clusters_without_pairwise_comparison():
+    """LSHが重複の組だけを候補にし、まとまりを返すことをテスト"""
+    rng = random.Random(1)
+    signatures = {}
+    for key in range(500):
+        words = " ".join(rng.choice(["alpha", "beta", "gamma", "delta", "omega", "sigma"]) + str(rng.randint(0, 9999)) for _ in range(12))
+        signatures[key] = minhash_signature(words, None)
+    signatures[1000] = minhash_signature(*ORIGINAL)
+    signatures[1001] = minhash_signature(*MIRROR)
+    signatures[1002] = minhash_signature(*ORIGINAL)
+
+    # 500件の全組（約12万組）に対して、候補はごく一部
+    keys = list(signatures)
+    pairs = lsh_candidate_pairs(keys, np.stack([signatures[key] for key in keys]))
+    assert len(pairs) < 100
+    assert {(1000, 1001), (1000, 1002), (1001, 1002)} <= pairs
+    assert [cluster.video_ids for cluster in duplicate_clusters(signatures, pairs)] == [[1000, 1001, 1002]]
+
+def test_cluster_similarity_covers_every_accepted_pair():
+    """まとまりの類似度が、先頭の動画との組だけでなく判定したすべての組の最小値になることをテスト"""
+    signatures = {key: np.arange(10, dtype=np.uint32) for key in (1, 2, 3)}
+    signatures[2][0] += 100
+    signatures[3][1] += 100
+    # 1-2 と 1-3 は 0.9、2-3 は 0.8
+    clusters = duplicate_clusters(signatures, {(1, 2), (1, 3), (2, 3)}, threshold=0.6)
+    assert [cluster.video_ids for cluster in clusters] == [[1, 2, 3]]
+    assert clusters[0].similarity == 0.8
+
+def _setup_library(db_session):
+    owner = user.create(db_session, obj_in={"email": "dup@example.com", "google_id": "dup_google_id"})
+    other = user.create(db_session, obj_in={"email": "other@example.com", "google_id": "other_google_id"})
+    first = playlist.create(db_session, obj_in={"youtube_playlist_id": "PLdupfirst01", "user_id": owner.id})
+    second = playlist.create(db_session, obj_in={"youtube_playlist_id": "PLdupsecond1", "user_id": owner.id})
+    elsewhere = playlist.create(db_session, obj_in={"youtube_playlist_id": "PLdupother01", "user_id": other.id})
+    ids = video.create_many(db_session, objs_in=[
+        {"youtube_video_id": "dup_original", "title": ORIGINAL[0], "description": ORIGINAL[1]},
+        {"youtube_video_id": "dup_mirror", "title": MIRROR[0], "description": MIRROR[1]},
+        {"youtube_video_id": "dup_other", "title": OTHER[0], "description": OTHER[1]},
+        {"youtube_video_id": "dup_elsewhere", "title": ORIGINAL[0], "description": ORIGINAL[1]},
+    ], return_ids=True)
+    playlist.add_videos(db_session, playlist_id=first.id, video_ids=ids[:2])
+    playlist.add_videos(db_session, playlist_id=second.id, video_ids=ids[1:3])
+    playlist.add_videos(db_session, playlist_id=elsewhere.id, video_ids=[ids[3]])
+    return owner, ids
+
+def test_find_duplicate_videos(db_session):
+    """署名を埋めた後、ユーザーのライブラリ内の重複だけが見つかることをテスト"""
+    owner, ids = _setup_library(db_session)
+    # 重複の検出は署名を書き込まない
+    assert find_duplicate_videos(db_session, user_id=owner.id) == []
+    db_session.expire_all()
+    assert video.get(db_session, ids[0]).minhash is None
+
+    assert backfill_signatures(db_session, user_id=owner.id) == 3
+    clusters = find_duplicate_videos(db_session, user_id=owner.id)
+    assert [cluster.video_ids for cluster in clusters] == [ids[:2]]
+    assert clusters[0].similarity > 0.7
+
+    db_session.expire_all()
+    assert video.get(db_session, ids[0]).minhash is not None
+    assert video.get(db_session, ids[3]).minhash is None
+
+    # タイトルを変えると署名は計算し直される
+    video.update(db_session, db_obj=video.get(db_session, ids[1]), obj_in={"title": OTHER[0], "description": OTHER[1]})
+    assert video.get(db_session, ids[1]).minhash is None
+    assert backfill_signatures(db_session, user_id=owner.id) == 1
+    clusters = find_duplicate_videos(db_session, user_id=owner.id)
+    assert [cluster.video_ids for cluster in clusters] == [ids[1:3]]
+
+def test_duplicates_endpoint(db_session):
+    """/library/duplicates エンドポイントのテスト"""
+    owner, ids = _setup_library(db_session)
+    backfill_signatures(db_session, user_id=owner.id)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[aget_current_user] = lambda: owner
+    try:
+        client = TestClient(app)
+        response = client.get("/library/duplicates")
+        assert response.status_code == 200
+        clusters = response.json()["clusters"]
+        assert len(clusters) == 1
+        assert [item["id"] for item in clusters[0]["videos"]] == ids[:2]
+
+        assert client.get("/library/duplicates", params={"threshold": 2}).status_code == 422
+    finally:
+        app.dependency_overrides.clear()
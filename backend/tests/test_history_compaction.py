@@ -0,0 +1,88 @@
+import gzip
+import json
+from datetime import date, datetime
+
+from app.crud import (
+    user, playlist, video, classification_history, classification_history_summary, classification_history_archive
+)
+from app.models.classification import ClassificationHistory, ClassificationHistoryArchive
+from app.services.history_compaction import compact_history, retention_cutoff
+from .test_database import db_session
+
+def _setup_history(db_session):
+    user_obj = user.create(db_session, obj_in={"email": "history@example.com", "google_id": "history_google_id"})
+    first = playlist.create(db_session, obj_in={"youtube_playlist_id": "PLhistory001", "user_id": user_obj.id})
+    second = playlist.create(db_session, obj_in={"youtube_playlist_id": "PLhistory002", "user_id": user_obj.id})
+    video_ids = video.create_many(db_session, objs_in=[
+        {"youtube_video_id": f"history_vid_{i}", "title": f"Video {i}"} for i in range(3)
+    ], return_ids=True)
+    rows = []
+    # 2026-01-01 と 01-02 の古い履歴と、保持期間内の新しい履歴
+    for day, playlist_id, action, count in [
+        (1, first.id, "add", 5),
+        (1, first.id, "remove", 2),
+        (1, second.id, "add", 1),
+        (2, first.id, "modify", 3),
+        (20, first.id, "add", 4),
+    ]:
+        for i in range(count):
+            rows.append({
+                "user_id": user_obj.id,
+                "playlist_id": playlist_id,
+                "video_id": video_ids[i % 3],
+                "action": action,
+                "created_at": datetime(2026, 1, day, 12, i)
+            })
+    classification_history.create_many(db_session, objs_in=rows)
+    return user_obj, first, second
+
+def test_retention_cutoff():
+    assert retention_cutoff(90, now=datetime(2026, 4, 1)) == datetime(2026, 1, 1)
+
+def test_compact_history_summarizes_and_archives(db_session):
+    """古い履歴が日ごとに集計され、アーカイブへ移されることをテスト"""
+    user_obj, first, second = _setup_history(db_session)
+    result = compact_history(db_session, cutoff=datetime(2026, 1, 10), chunk_size=4)
+
+    assert (result.chunks, result.archived) == (3, 11)
+    assert db_session.query(ClassificationHistory).count() == 4
+    assert db_session.query(ClassificationHistoryArchive).count() == 11
+
+    summaries = [
+        (s.playlist_id, s.day, s.added, s.removed, s.modified)
+        for s in classification_history_summary.get_by_user(db_session, user_id=user_obj.id)
+    ]
+    # チャンクをまたいだ同じ日の件数も1行に加算される
+    assert summaries == [
+        (first.id, date(2026, 1, 1), 5, 2, 0),
+        (second.id, date(2026, 1, 1), 1, 0, 0),
+        (first.id, date(2026, 1, 2), 0, 0, 3),
+    ]
+    assert [
+        s.day for s in classification_history_summary.get_by_user(
+            db_session, user_id=user_obj.id, playlist_id=first.id, start=date(2026, 1, 2)
+        )
+    ] == [date(2026, 1, 2)]
+
+    # アーカイブは元のidのまま新しい順に読める
+    page = classification_history_archive.get_by_user_page(db_session, user_id=user_obj.id, limit=20)
+    assert len(page.items) == 11
+    assert page.items[0].id > page.items[-1].id
+
+    # 再実行しても二重に集計されない
+    assert compact_history(db_session, cutoff=datetime(2026, 1, 10)).archived == 0
+    assert classification_history_summary.get_by_user(db_session, user_id=user_obj.id)[0].added == 5
+
+def test_compact_history_to_file(db_session, tmp_path):
+    """アーカイブをファイルに書き出せることをテスト"""
+    user_obj, _, _ = _setup_history(db_session)
+    path = tmp_path / "history.jsonl.gz"
+    result = compact_history(db_session, cutoff=datetime(2026, 1, 10), chunk_size=5, archive_path=str(path))
+
+    assert result.archived == 11
+    assert db_session.query(ClassificationHistoryArchive).count() == 0
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    assert len(rows) == 11
+    assert rows[0]["action"] == "add" and rows[0]["created_at"].startswith("2026-01-01")
+    assert len(classification_history_summary.get_by_user(db_session, user_id=user_obj.id)) == 3
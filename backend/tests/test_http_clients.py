@@ -0,0 +1,58 @@
+import httpx
+from fastapi import Depends
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.http_clients import (
+    OAUTH_CLIENT,
+    YOUTUBE_CLIENT,
+    get_oauth_http_client,
+    get_youtube_http_client
+)
+
+def test_lifespan_creates_and_closes_clients():
+    """起動時に共有クライアントが作成され、終了時に閉じられることをテスト"""
+    with TestClient(app):
+        youtube_client = getattr(app.state, YOUTUBE_CLIENT)
+        oauth_client = getattr(app.state, OAUTH_CLIENT)
+        assert not youtube_client.is_closed
+        assert not oauth_client.is_closed
+        assert youtube_client is not oauth_client
+    assert youtube_client.is_closed
+    assert oauth_client.is_closed
+    assert getattr(app.state, YOUTUBE_CLIENT) is None
+
+def test_clients_are_reused_across_requests():
+    """リクエスト間で同じクライアントが使われることをテスト"""
+    seen = []
+
+    @app.get("/_test/http-client")
+    async def _http_client(client: httpx.AsyncClient = Depends(get_youtube_http_client)):
+        seen.append(client)
+        return {}
+
+    try:
+        with TestClient(app) as client:
+            client.get("/_test/http-client")
+            client.get("/_test/http-client")
+    finally:
+        app.router.routes.pop()
+    assert len(seen) == 2
+    assert seen[0] is seen[1]
+
+def test_callback_uses_injected_oauth_client():
+    """コールバックが共有のOAuthクライアントでトークンを取得することをテスト"""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(400, json={"error": "invalid_grant"})
+
+    oauth_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    app.dependency_overrides[get_oauth_http_client] = lambda: oauth_client
+    try:
+        response = TestClient(app).get("/auth/google/callback?code=invalid_code")
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 400
+    assert len(requests) == 1
+    assert requests[0].url.host == "oauth2.googleapis.com"
@@ -0,0 +1,152 @@
+import datetime
+import json
+import pytest
+import rsa
+from google.auth import crypt, jwt
+from app.services.id_token_verifier import CertCache, IDTokenVerifier, parse_max_age
+
+CLIENT_ID = "test-client-id"
+NOW = 1_700_000_000
+
+class Clock:
+    def __init__(self, now=NOW):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+class Response:
+    def __init__(self, data, headers):
+        self.status = 200
+        self.data = json.dumps(data).encode()
+        self.headers = headers
+
+class FakeCertsEndpoint:
+    """Googleの証明書エンドポイントの代わり"""
+
+    def __init__(self, headers=None):
+        self.keys = {}
+        self.headers = headers if headers is not None else {"Cache-Control": "public, max-age=3600"}
+        self.calls = 0
+
+    def add_key(self, key_id):
+        public_key, private_key = rsa.newkeys(512)
+        self.keys[key_id] = public_key.save_pkcs1().decode()
+        return crypt.RSASigner.from_string(private_key.save_pkcs1().decode(), key_id=key_id)
+
+    def __call__(self, url, method="GET"):
+        self.calls += 1
+        return Response(self.keys, self.headers)
+
+def _token(signer, **claims):
+    payload = {
+        "iss": "https://accounts.google.com",
+        "aud": CLIENT_ID,
+        "email": "user@example.com",
+        "iat": NOW,
+        "exp": NOW + 3600
+    }
+    payload.update(claims)
+    return jwt.encode(signer, payload).decode()
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    # jwt.decode の exp / iat 検証も同じ時計で行う
+    monkeypatch.setattr(
+        "google.auth._helpers.utcnow",
+        lambda: datetime.datetime.fromtimestamp(clock.now, datetime.timezone.utc).replace(tzinfo=None)
+    )
+    return clock
+
+def test_parse_max_age():
+    """Cache-Control と Age からキャッシュ秒数を求めることをテスト"""
+    assert parse_max_age({"Cache-Control": "public, max-age=19000, must-revalidate"}) == 19000
+    assert parse_max_age({"cache-control": "max-age=100", "Age": "40"}) == 60
+    assert parse_max_age({"Cache-Control": "no-store"}) == 0
+    assert parse_max_age({}) == 300
+
+def test_cert_cache_honors_max_age(clock):
+    """max-age の間は証明書を再取得しないことをテスト"""
+    endpoint = FakeCertsEndpoint({"Cache-Control": "max-age=60"})
+    endpoint.add_key("k1")
+    certs = CertCache(request=endpoint, clock=clock)
+    assert "k1" in certs.get()
+    clock.now += 59
+    certs.get()
+    assert endpoint.calls == 1
+    clock.now += 2
+    certs.get()
+    assert endpoint.calls == 2
+
+def test_verifier_caches_claims_until_exp(clock):
+    """検証済みのトークンは exp まで再検証しないことをテスト"""
+    endpoint = FakeCertsEndpoint()
+    signer = endpoint.add_key("k1")
+    verifier = IDTokenVerifier(CLIENT_ID, cert_cache=CertCache(request=endpoint, clock=clock), clock=clock)
+    token = _token(signer, exp=NOW + 120)
+
+    assert verifier.verify(token)["email"] == "user@example.com"
+    assert verifier.verify(token)["email"] == "user@example.com"
+    assert verifier.stats()["hits"] == 1
+    assert endpoint.calls == 1
+
+    clock.now += 121
+    with pytest.raises(ValueError):
+        verifier.verify(token)
+
+def test_verifier_refetches_on_unknown_key(clock):
+    """未知の鍵IDで署名されたトークンでは証明書を取得し直すことをテスト"""
+    endpoint = FakeCertsEndpoint()
+    endpoint.add_key("k1")
+    verifier = IDTokenVerifier(CLIENT_ID, cert_cache=CertCache(request=endpoint, clock=clock), clock=clock)
+    verifier.cert_cache.get()
+    clock.now += 61
+    rotated = endpoint.add_key("k2")
+    assert verifier.verify(_token(rotated))["aud"] == CLIENT_ID
+    assert endpoint.calls == 2
+
+def test_verifier_rate_limits_unknown_key_refetches(clock):
+    """未知の鍵IDのトークンが続いても、証明書の取得し直しが一定間隔に1回までであることをテスト"""
+    endpoint = FakeCertsEndpoint()
+    endpoint.add_key("k1")
+    verifier = IDTokenVerifier(CLIENT_ID, cert_cache=CertCache(request=endpoint, clock=clock), clock=clock)
+    forged = FakeCertsEndpoint().add_key("unknown")
+    for _ in range(5):
+        with pytest.raises(ValueError):
+            verifier.verify(_token(forged, email="attacker@example.com"))
+    # 最初の取得だけで、未知の鍵IDによる取得し直しは行わない
+    assert endpoint.calls == 1
+
+    clock.now += 61
+    with pytest.raises(ValueError):
+        verifier.verify(_token(forged, email="attacker@example.com"))
+    assert endpoint.calls == 2
+    with pytest.raises(ValueError):
+        verifier.verify(_token(forged, email="attacker@example.com"))
+    assert endpoint.calls == 2
+
+def test_verifier_rejects_invalid_tokens(clock):
+    """不正なトークンは拒否され、キャッシュされないことをテスト"""
+    endpoint = FakeCertsEndpoint()
+    signer = endpoint.add_key("k1")
+    verifier = IDTokenVerifier(CLIENT_ID, cert_cache=CertCache(request=endpoint, clock=clock), clock=clock)
+    with pytest.raises(ValueError):
+        verifier.verify("invalid_token")
+    assert endpoint.calls == 0
+    with pytest.raises(ValueError):
+        verifier.verify(_token(signer, aud="someone-else"))
+    with pytest.raises(Exception):
+        verifier.verify(_token(signer, iss="https://evil.example.com"))
+    assert verifier.stats()["size"] == 0
+
+def test_verifier_is_bounded(clock):
+    """キャッシュが max_entries を超えないことをテスト"""
+    endpoint = FakeCertsEndpoint()
+    signer = endpoint.add_key("k1")
+    verifier = IDTokenVerifier(
+        CLIENT_ID, cert_cache=CertCache(request=endpoint, clock=clock), max_entries=2, clock=clock
+    )
+    for i in range(3):
+        verifier.verify(_token(signer, email=f"user{i}@example.com"))
+    assert verifier.stats()["size"] == 2
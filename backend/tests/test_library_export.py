@@ -0,0 +1,76 @@
+import csv
+import io
+import json
+
+from fastapi.testclient import TestClient
+from app.crud import user, playlist, video, classification
+from app.database import get_session_factory
+from app.dependencies import get_current_user
+from app.main import app
+from app.services.library_export import export_columns, export_ndjson
+from .test_database import TestingSessionLocal, db_session
+
+def _setup_library(db_session):
+    owner = user.create(db_session, obj_in={"email": "export@example.com", "google_id": "export_google_id"})
+    other = user.create(db_session, obj_in={"email": "other@example.com", "google_id": "other_google_id"})
+    mine = playlist.create(db_session, obj_in={"youtube_playlist_id": "PLexport0001", "user_id": owner.id, "title": "料理"})
+    elsewhere = playlist.create(db_session, obj_in={"youtube_playlist_id": "PLexport0002", "user_id": other.id})
+    ids = video.create_many(db_session, objs_in=[
+        {"youtube_video_id": "export_v1", "title": "カレー, \"本格\"", "tags": ["料理", "curry"]},
+        {"youtube_video_id": "export_v2", "title": "パスタ"},
+        {"youtube_video_id": "export_v3", "title": "他のユーザーの動画"},
+    ], return_ids=True)
+    playlist.add_videos(db_session, playlist_id=mine.id, video_ids=ids[:2])
+    playlist.add_videos(db_session, playlist_id=elsewhere.id, video_ids=[ids[2]])
+    classification.create(db_session, obj_in={
+        "video_id": ids[0], "playlist_id": mine.id, "user_id": owner.id, "status": "completed", "confidence": 0.9
+    })
+    classification.create(db_session, obj_in={
+        "video_id": ids[2], "playlist_id": elsewhere.id, "user_id": other.id, "status": "pending"
+    })
+    return owner, mine, ids
+
+def test_export_ndjson_streams_in_chunks(db_session):
+    """NDJSONが少しずつ生成され、ユーザーのデータだけが含まれることをテスト"""
+    owner, mine, ids = _setup_library(db_session)
+    chunks = list(export_ndjson(TestingSessionLocal, user_id=owner.id, yield_per=1, flush_rows=2))
+    assert len(chunks) == 3
+    records = [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+    assert [record["type"] for record in records] == [
+        "playlists", "videos", "videos", "memberships", "memberships", "classifications"
+    ]
+    assert records[0]["title"] == "料理"
+    assert [record["id"] for record in records[1:3]] == ids[:2]
+    assert records[1]["tags"] == ["料理", "curry"]
+    assert {record["video_id"] for record in records[3:5]} == set(ids[:2])
+    assert records[5]["playlist_id"] == mine.id and records[5]["confidence"] == 0.9
+    assert isinstance(records[5]["created_at"], str)
+
+def test_export_endpoint(db_session):
+    """/library/export エンドポイントのNDJSONとCSVのテスト"""
+    owner, mine, ids = _setup_library(db_session)
+    app.dependency_overrides[get_session_factory] = lambda: TestingSessionLocal
+    app.dependency_overrides[get_current_user] = lambda: owner
+    try:
+        client = TestClient(app)
+        response = client.get("/library/export", params={"resource": "videos"})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert [json.loads(line)["id"] for line in response.text.splitlines()] == ids[:2]
+
+        response = client.get("/library/export", params={"format": "csv", "resource": "videos"})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        assert 'filename="library-videos.csv"' in response.headers["content-disposition"]
+        rows = list(csv.reader(io.StringIO(response.text)))
+        assert rows[0] == export_columns("videos")
+        assert len(rows) == 3
+        row = dict(zip(rows[0], rows[1]))
+        assert row["title"] == "カレー, \"本格\""
+        assert json.loads(row["tags"]) == ["料理", "curry"]
+        assert dict(zip(rows[0], rows[2]))["tags"] == ""
+
+        assert client.get("/library/export", params={"format": "csv"}).status_code == 400
+        assert client.get("/library/export", params={"format": "xml"}).status_code == 422
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,97 @@
+from fastapi.testclient import TestClient
+from app.crud import user, playlist, video
+from app.database import get_async_db
+from app.dependencies import aget_current_user
+from app.main import app
+from .test_database import db_session, override_get_async_db
+
+def _setup_library(db_session):
+    owner = user.create(db_session, obj_in={"email": "search@example.com", "google_id": "search_google_id"})
+    other = user.create(db_session, obj_in={"email": "other@example.com", "google_id": "other_google_id"})
+    own_playlist = playlist.create(db_session, obj_in={"youtube_playlist_id": "PLsearch0001", "user_id": owner.id})
+    other_playlist = playlist.create(db_session, obj_in={"youtube_playlist_id": "PLsearch0002", "user_id": other.id})
+    ids = video.create_many(db_session, objs_in=[
+        {"youtube_video_id": "fts_vid_1", "title": "Python入門講座", "description": "基礎から学ぶ"},
+        {"youtube_video_id": "fts_vid_2", "title": "料理の基本", "description": "Pythonの話は出てきません"},
+        {"youtube_video_id": "fts_vid_3", "title": "旅行記", "channel_title": "Python Channel"},
+        {"youtube_video_id": "fts_vid_4", "title": "Python上級編", "tags": ["programming"]},
+    ], return_ids=True)
+    playlist.add_videos(db_session, playlist_id=own_playlist.id, video_ids=ids[:3])
+    playlist.add_videos(db_session, playlist_id=other_playlist.id, video_ids=ids[3:])
+    return owner, other, ids
+
+def test_search_ranks_title_matches_first(db_session):
+    """タイトルに一致する動画が説明のみの一致より上位になることをテスト"""
+    _, _, ids = _setup_library(db_session)
+    page = video.search(db_session, query="python")
+    found = [v.id for v in page.items]
+    assert set(found) == set(ids)
+    assert found.index(ids[0]) < found.index(ids[1])
+    assert page.next_cursor is None
+
+def test_search_follows_updates_and_deletes(db_session):
+    """動画の更新・削除が検索インデックスに反映されることをテスト"""
+    _, _, ids = _setup_library(db_session)
+    db_video = video.get(db_session, ids[1])
+    video.update(db_session, db_obj=db_video, obj_in={"title": "料理の応用", "description": "和食"})
+    video.delete(db_session, id=ids[0])
+    found = {v.id for v in video.search(db_session, query="python").items}
+    assert found == {ids[2], ids[3]}
+    assert [v.id for v in video.search(db_session, query="料理の基本").items] == []
+    assert [v.id for v in video.search(db_session, query="料理の応用").items] == [ids[1]]
+
+def test_search_short_terms_fall_back_to_like(db_session):
+    """3文字未満の語は部分一致で検索されることをテスト"""
+    _, _, ids = _setup_library(db_session)
+    assert [v.id for v in video.search(db_session, query="料理").items] == [ids[1]]
+    assert video.search(db_session, query="   ").items == []
+
+def test_search_scoped_to_user_with_pagination(db_session):
+    """ユーザーの動画に絞り、カーソルで全件を重複なく取得できることをテスト"""
+    owner, _, ids = _setup_library(db_session)
+    first = video.search(db_session, query="python", user_id=owner.id, limit=2)
+    assert len(first.items) == 2
+    assert first.next_cursor is not None
+    second = video.search(db_session, query="python", user_id=owner.id, cursor=first.next_cursor, limit=2)
+    assert second.next_cursor is None
+    found = [v.id for v in first.items + second.items]
+    assert sorted(found) == sorted(ids[:3])
+
+def test_library_search_endpoint(db_session):
+    """/library/search エンドポイントのテスト"""
+    owner, _, ids = _setup_library(db_session)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[aget_current_user] = lambda: owner
+    try:
+        client = TestClient(app)
+        response = client.get("/library/search", params={"q": "入門講座"})
+        assert response.status_code == 200
+        data = response.json()
+        assert [item["id"] for item in data["items"]] == [ids[0]]
+        assert data["next_cursor"] is None
+
+        response = client.get("/library/search", params={"q": "python", "cursor": "invalid!"})
+        assert response.status_code == 400
+    finally:
+        app.dependency_overrides.clear()
+
+def test_library_search_requires_auth():
+    """認証なしでは401が返ることをテスト"""
+    client = TestClient(app)
+    response = client.get("/library/search", params={"q": "python"})
+    assert response.status_code == 401
+
+def test_library_playlists_endpoint(db_session):
+    """/library/playlists エンドポイントのテスト"""
+    owner, _, ids = _setup_library(db_session)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[aget_current_user] = lambda: owner
+    try:
+        response = TestClient(app).get("/library/playlists")
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 200
+    data = response.json()
+    assert [entry["youtube_playlist_id"] for entry in data] == ["PLsearch0001"]
+    assert [video["id"] for video in data[0]["videos"]] == ids[:3]
+    assert data[0]["classifications"] == []
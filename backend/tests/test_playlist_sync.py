@@ -0,0 +1,229 @@
+import asyncio
+import httpx
+from app.crud import user as crud_user, playlist as crud_playlist, video as crud_video
+from app.models.playlist import Playlist
+from app.services.playlist_sync import sync_user_library
+from app.services.youtube_api import YouTubeAPI
+from .fake_youtube import FakeYouTube
+from .test_database import db_session
+
+test_user_data = {
+    "email": "sync@example.com",
+    "google_id": "sync_google_id",
+    "name": "Sync User",
+    "youtube_access_token": "sync_access_token"
+}
+
+def _sync(db_session, fake: FakeYouTube, user):
+    api = YouTubeAPI(httpx.AsyncClient(transport=fake.transport()))
+    return asyncio.run(sync_user_library(db_session, user=user, api=api))
+
+def test_sync_creates_playlists_and_videos(db_session):
+    """プレイリストと動画が同期されることをテスト"""
+    fake = FakeYouTube(page_size=3)
+    fake.add_playlist("PLfirst00001", [f"vid{i}" for i in range(7)])
+    fake.add_playlist("PLsecond0001", ["vid0", "vid100"])
+    user = crud_user.create(db_session, obj_in=test_user_data)
+
+    result = _sync(db_session, fake, user)
+
+    assert result.playlists == 2
+    assert result.playlist_items == 9
+    playlists = crud_playlist.get_by_user_id(db_session, user_id=user.id)
+    assert {p.youtube_playlist_id for p in playlists} == {"PLfirst00001", "PLsecond0001"}
+    first = crud_playlist.get_by_youtube_id(db_session, youtube_id="PLfirst00001")
+    assert first.videos.count() == 7
+    # 複数のプレイリストに含まれる動画は1行だけ作られる
+    assert crud_video.get_by_youtube_id(db_session, youtube_id="vid0") is not None
+    assert len(crud_video.get_multi(db_session)) == 8
+
+def test_sync_paginates_and_batches_requests(db_session):
+    """pageTokenで辿り、videos.listを50件ずつ呼ぶことをテスト"""
+    fake = FakeYouTube(page_size=50)
+    fake.add_playlist("PLlarge00001", [f"vid{i}" for i in range(120)])
+    user = crud_user.create(db_session, obj_in=test_user_data)
+
+    _sync(db_session, fake, user)
+
+    assert len(fake.calls_to("playlistItems")) == 3
+    video_calls = fake.calls_to("videos")
+    assert len(video_calls) == 3
+    assert all(len(call.url.params["id"].split(",")) <= 50 for call in video_calls)
+    assert fake.calls_to("playlists")[0].headers["Authorization"] == "Bearer sync_access_token"
+
+def test_sync_video_metadata(db_session):
+    """動画のメタデータが変換されて保存されることをテスト"""
+    fake = FakeYouTube()
+    fake.add_video("vid_meta", title="Meta Title", tags=["a", "b"])
+    fake.add_playlist("PLmeta000001", ["vid_meta"])
+    user = crud_user.create(db_session, obj_in=test_user_data)
+
+    _sync(db_session, fake, user)
+
+    video = crud_video.get_by_youtube_id(db_session, youtube_id="vid_meta")
+    assert video.title == "Meta Title"
+    assert video.tags == ["a", "b"]
+    assert video.view_count == 10
+    assert video.duration == "PT1M"
+    assert video.published_at is not None
+
+def test_resync_is_idempotent(db_session):
+    """再同期しても行が重複しないことをテスト"""
+    fake = FakeYouTube()
+    fake.add_playlist("PLidem000001", ["vid1", "vid2"])
+    user = crud_user.create(db_session, obj_in=test_user_data)
+
+    _sync(db_session, fake, user)
+    _sync(db_session, fake, user)
+
+    assert db_session.query(Playlist).count() == 1
+    assert len(crud_video.get_multi(db_session)) == 2
+    playlist = crud_playlist.get_by_youtube_id(db_session, youtube_id="PLidem000001")
+    assert playlist.videos.count() == 2
+
+def test_unchanged_playlist_skips_item_requests(db_session):
+    """プレイリストのETagが変わっていなければ playlistItems.list を呼ばないことをテスト"""
+    fake = FakeYouTube(page_size=10)
+    fake.add_playlist("PLsame000001", [f"vid{i}" for i in range(35)])
+    user = crud_user.create(db_session, obj_in=test_user_data)
+    _sync(db_session, fake, user)
+    fake.calls.clear()
+
+    result = _sync(db_session, fake, user)
+
+    assert result.unchanged_playlists == 1
+    assert len(fake.calls) == 1
+    assert fake.calls_to("playlistItems") == []
+    assert fake.calls_to("videos") == []
+
+def test_renamed_playlist_costs_only_not_modified_pages(db_session):
+    """名前だけ変わったプレイリストはページごとの304だけで済むことをテスト"""
+    fake = FakeYouTube(page_size=10)
+    fake.add_playlist("PLrename0001", [f"vid{i}" for i in range(35)])
+    user = crud_user.create(db_session, obj_in=test_user_data)
+    _sync(db_session, fake, user)
+    fake.calls.clear()
+
+    fake.playlists["PLrename0001"]["title"] = "Renamed"
+    result = _sync(db_session, fake, user)
+
+    assert result.unchanged_playlists == 1
+    item_calls = fake.calls_to("playlistItems")
+    assert len(item_calls) == 4
+    assert all(call.headers["If-None-Match"] for call in item_calls)
+    assert crud_playlist.get_by_youtube_id(db_session, youtube_id="PLrename0001").title == "Renamed"
+
+    # 新しいETagが保存され、次の同期では playlistItems.list を呼ばない
+    fake.calls.clear()
+    _sync(db_session, fake, user)
+    assert fake.calls_to("playlistItems") == []
+
+def test_sync_removes_deleted_playlists(db_session):
+    """YouTube側で削除されたプレイリストがローカルからも削除されることをテスト"""
+    fake = FakeYouTube()
+    fake.add_playlist("PLkeep000001", ["vid1"])
+    fake.add_playlist("PLgone000001", ["vid1", "vid2"])
+    user = crud_user.create(db_session, obj_in=test_user_data)
+    _sync(db_session, fake, user)
+
+    del fake.playlists["PLgone000001"]
+    result = _sync(db_session, fake, user)
+
+    assert result.deleted_playlists == 1
+    playlists = crud_playlist.get_by_user_id(db_session, user_id=user.id)
+    assert [p.youtube_playlist_id for p in playlists] == ["PLkeep000001"]
+    # 動画の行は他のプレイリストのために残る
+    assert crud_video.get_by_youtube_id(db_session, youtube_id="vid2") is not None
+
+def test_resync_detects_change_on_later_page(db_session):
+    """先頭ページが304でも、後のページの変更が反映されることをテスト"""
+    fake = FakeYouTube(page_size=10)
+    fake.add_playlist("PLlater00001", [f"vid{i}" for i in range(25)])
+    user = crud_user.create(db_session, obj_in=test_user_data)
+    _sync(db_session, fake, user)
+
+    # 件数が変わらないため先頭ページのETagは変わらない
+    video_ids = fake.playlists["PLlater00001"]["video_ids"]
+    video_ids.remove("vid23")
+    fake.add_video("vid_late")
+    video_ids.append("vid_late")
+    result = _sync(db_session, fake, user)
+
+    assert result.unchanged_playlists == 0
+    assert result.added == 1
+    assert result.removed == 1
+    playlist = crud_playlist.get_by_youtube_id(db_session, youtube_id="PLlater00001")
+    members = crud_playlist.get_video_youtube_ids(db_session, playlist_id=playlist.id)
+    assert set(members) == set(video_ids)
+
+def test_resync_applies_only_the_diff(db_session):
+    """再同期で追加・削除された動画だけが反映されることをテスト"""
+    fake = FakeYouTube(page_size=10)
+    fake.add_playlist("PLdiff000001", [f"vid{i}" for i in range(25)])
+    user = crud_user.create(db_session, obj_in=test_user_data)
+    _sync(db_session, fake, user)
+    fake.calls.clear()
+
+    video_ids = fake.playlists["PLdiff000001"]["video_ids"]
+    video_ids.remove("vid3")
+    fake.add_video("vid_new")
+    video_ids.append("vid_new")
+    result = _sync(db_session, fake, user)
+
+    assert result.added == 1
+    assert result.removed == 1
+    # 新しい動画だけが videos.list で取得される
+    video_calls = fake.calls_to("videos")
+    assert len(video_calls) == 1
+    assert video_calls[0].url.params["id"] == "vid_new"
+
+    playlist = crud_playlist.get_by_youtube_id(db_session, youtube_id="PLdiff000001")
+    members = crud_playlist.get_video_youtube_ids(db_session, playlist_id=playlist.id)
+    assert set(members) == set(video_ids)
+    # 削除された動画の行自体は残る
+    assert crud_video.get_by_youtube_id(db_session, youtube_id="vid3") is not None
+
+def test_resync_stores_page_etags(db_session):
+    """ページごとのETagとプレイリストのETagが保存されることをテスト"""
+    fake = FakeYouTube(page_size=10)
+    fake.add_playlist("PLpages00001", [f"vid{i}" for i in range(25)])
+    user = crud_user.create(db_session, obj_in=test_user_data)
+
+    _sync(db_session, fake, user)
+
+    playlist = crud_playlist.get_by_youtube_id(db_session, youtube_id="PLpages00001")
+    assert playlist.etag
+    pages = crud_playlist.get_item_pages(db_session, playlist_id=playlist.id)
+    assert [page.page_token for page in pages] == [None, "10", "20"]
+    assert all(page.etag for page in pages)
+    assert sum(len(page.video_ids) for page in pages) == 25
+
+def test_sync_backfills_missing_signatures(db_session):
+    """署名が消えた動画の署名を同期ジョブが埋めることをテスト"""
+    fake = FakeYouTube()
+    fake.add_playlist("PLsign000001", ["vid1", "vid2"])
+    user = crud_user.create(db_session, obj_in=test_user_data)
+    _sync(db_session, fake, user)
+
+    db_video = crud_video.get_by_youtube_id(db_session, youtube_id="vid1")
+    signature = db_video.minhash
+    assert signature is not None
+    crud_video.update(db_session, db_obj=db_video, obj_in={"title": "renamed"})
+    assert db_video.minhash is None
+
+    result = _sync(db_session, fake, user)
+    assert result.signatures == 1
+    db_session.expire_all()
+    assert crud_video.get_by_youtube_id(db_session, youtube_id="vid1").minhash is not None
+
+def test_sync_skips_unavailable_videos(db_session):
+    """videos.listに含まれない動画（削除済みなど）がスキップされることをテスト"""
+    fake = FakeYouTube()
+    fake.add_playlist("PLgone000001", ["vid1", "deleted"])
+    del fake.videos["deleted"]
+    user = crud_user.create(db_session, obj_in=test_user_data)
+
+    result = _sync(db_session, fake, user)
+
+    assert result.videos == 1
+    assert crud_video.get_by_youtube_id(db_session, youtube_id="deleted") is None
@@ -0,0 +1,125 @@
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+from app.models.base import BaseModel
+from app.crud import user, playlist, video, classification, classification_rule, classification_history
+
+# クエリプランの確認用にメモリ上のSQLiteを使う
+engine = create_engine("sqlite://")
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture(scope="module")
+def db():
+    BaseModel.metadata.create_all(bind=engine)
+    session = TestingSessionLocal()
+    user_obj = user.create(session, obj_in={"email": "plan@example.com", "google_id": "plan_google_id"})
+    playlist_obj = playlist.create(session, obj_in={"youtube_playlist_id": "PLplan000001", "user_id": user_obj.id})
+    video_obj = video.create(session, obj_in={"youtube_video_id": "plan_video", "channel_id": "plan_channel"})
+    playlist.add_videos(session, playlist_id=playlist_obj.id, video_ids=[video_obj.id])
+    session.info["ids"] = {"user_id": user_obj.id, "playlist_id": playlist_obj.id, "video_id": video_obj.id}
+    try:
+        yield session
+    finally:
+        session.close()
+        BaseModel.metadata.drop_all(bind=engine)
+
+def query_plans(db, operation):
+    """operationが発行したSELECTのクエリプランを返す"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        db.expire_all()
+        operation()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    plans = []
+    connection = db.connection()
+    for statement, parameters in statements:
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        plans.append(" / ".join(row[-1] for row in rows))
+    return plans
+
+def assert_uses_index(db, operation, index_name):
+    """operationが発行したSELECTのいずれかがindex_nameのインデックスを使うことを確認する"""
+    plans = query_plans(db, operation)
+    assert plans, "no SELECT was executed"
+    assert any(index_name in plan for plan in plans), plans
+
+def test_classification_by_user_uses_index(db):
+    """ユーザーごとの分類のページ取得が (user_id, id) のインデックスを使うことをテスト"""
+    ids = db.info["ids"]
+    assert_uses_index(
+        db, lambda: classification.get_by_user_page(db, user_id=ids["user_id"]),
+        "ix_classifications_user_id_id"
+    )
+
+def test_classification_by_status_uses_index(db):
+    """ステータスごとの分類のページ取得が (status, id) のインデックスを使うことをテスト"""
+    assert_uses_index(
+        db, lambda: classification.get_by_status_page(db, status="pending"),
+        "ix_classifications_status_id"
+    )
+
+def test_classification_by_video_and_playlist_uses_unique_index(db):
+    """動画とプレイリストによる分類の取得が一意インデックスを使うことをテスト"""
+    ids = db.info["ids"]
+    assert_uses_index(
+        db,
+        lambda: classification.get_by_video_and_playlist(db, video_id=ids["video_id"], playlist_id=ids["playlist_id"]),
+        "uq_classifications_video_id_playlist_id"
+    )
+
+def test_classification_rules_by_priority_uses_index(db):
+    """優先度順のルールの取得が (user_id, playlist_id, priority) のインデックスを使うことをテスト"""
+    ids = db.info["ids"]
+    assert_uses_index(
+        db,
+        lambda: classification_rule.get_by_priority(db, user_id=ids["user_id"], playlist_id=ids["playlist_id"]),
+        "ix_classification_rules_user_id_playlist_id_priority"
+    )
+
+def test_classification_history_uses_indexes(db):
+    """分類履歴のユーザーごと・動画とプレイリストごとの取得がそれぞれのインデックスを使うことをテスト"""
+    ids = db.info["ids"]
+    assert_uses_index(
+        db, lambda: classification_history.get_by_user_page(db, user_id=ids["user_id"]),
+        "ix_classification_histories_user_id_id"
+    )
+    assert_uses_index(
+        db,
+        lambda: classification_history.get_by_video_and_playlist(db, video_id=ids["video_id"], playlist_id=ids["playlist_id"]),
+        "ix_classification_histories_video_id_playlist_id"
+    )
+
+def test_videos_by_channel_uses_index(db):
+    """チャンネルごとの動画のページ取得が (channel_id, id) のインデックスを使うことをテスト"""
+    assert_uses_index(
+        db, lambda: video.get_by_channel_id_page(db, channel_id="plan_channel"),
+        "ix_videos_channel_id_id"
+    )
+
+def test_playlists_by_user_uses_index(db):
+    """ユーザーごとのプレイリストのページ取得が (user_id, id) のインデックスを使うことをテスト"""
+    ids = db.info["ids"]
+    assert_uses_index(
+        db, lambda: playlist.get_by_user_id_page(db, user_id=ids["user_id"]),
+        "ix_playlists_user_id_id"
+    )
+
+def test_playlist_videos_use_primary_key_and_reverse_index(db):
+    """所属動画の取得が主キーを、動画からプレイリストへの参照がvideo_idのインデックスを使うことをテスト"""
+    ids = db.info["ids"]
+    assert_uses_index(
+        db, lambda: playlist.get_video_youtube_ids(db, playlist_id=ids["playlist_id"]),
+        "sqlite_autoindex_playlist_videos_1"
+    )
+    assert_uses_index(
+        db, lambda: list(video.get(db, id=ids["video_id"]).playlists),
+        "ix_playlist_videos_video_id"
+    )
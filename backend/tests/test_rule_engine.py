@@ -0,0 +1,75 @@
+from app.crud import user, playlist, video, classification, classification_rule, classification_history
+from app.models.classification import Classification
+from app.services.rule_engine import AhoCorasick, CompiledRules, classify_user_videos
+from .test_database import db_session
+
+def test_aho_corasick_finds_overlapping_patterns():
+    """重なり合うパターンがすべて見つかることをテスト"""
+    automaton = AhoCorasick(["he", "she", "his", "hers"])
+    assert automaton.find("ushers") == {"she", "he", "hers"}
+    assert automaton.find("python") == set()
+
+def test_aho_corasick_japanese_keywords():
+    """日本語のキーワードが見つかることをテスト"""
+    automaton = AhoCorasick(["プログラミング", "料理"])
+    assert automaton.find("初心者向けプログラミング入門") == {"プログラミング"}
+
+class Rule:
+    def __init__(self, rule_type, rule_value, priority, playlist_id):
+        self.rule_type = rule_type
+        self.rule_value = rule_value
+        self.priority = priority
+        self.playlist_id = playlist_id
+
+def test_compiled_rules_prefers_higher_priority():
+    """優先度の高いルールのプレイリストが選ばれることをテスト"""
+    rules = CompiledRules([
+        Rule("keyword", "Python", 2, 10),
+        Rule("tag", "tutorial", 1, 20),
+        Rule("channel", "UC_music", 3, 30),
+    ])
+    video_kwargs = {"description": None, "channel_title": None}
+    assert rules.match(title="Python tutorial", tags=["Tutorial"], channel_id=None, **video_kwargs) == (1, 20)
+    assert rules.match(title="learn python", tags=[], channel_id=None, **video_kwargs) == (2, 10)
+    assert rules.match(title="song", tags=None, channel_id="uc_music", **video_kwargs) == (3, 30)
+    assert rules.match(title="nothing", tags=None, channel_id=None, **video_kwargs) is None
+
+def _setup_library(db_session, count):
+    user_obj = user.create(db_session, obj_in={"email": "rules@example.com", "google_id": "rules_google_id"})
+    source = playlist.create(db_session, obj_in={"youtube_playlist_id": "PLsource0001", "user_id": user_obj.id})
+    python = playlist.create(db_session, obj_in={"youtube_playlist_id": "PLpython0001", "user_id": user_obj.id})
+    cooking = playlist.create(db_session, obj_in={"youtube_playlist_id": "PLcooking001", "user_id": user_obj.id})
+    rows = []
+    for i in range(count):
+        title = "Python入門" if i % 3 == 0 else ("簡単な料理" if i % 3 == 1 else "日記")
+        rows.append({"youtube_video_id": f"rule_vid_{i}", "title": title, "tags": []})
+    video_ids = video.create_many(db_session, objs_in=rows, return_ids=True)
+    playlist.add_videos(db_session, playlist_id=source.id, video_ids=video_ids)
+    classification_rule.create_many(db_session, objs_in=[
+        {"user_id": user_obj.id, "playlist_id": python.id, "rule_type": "keyword", "rule_value": "python", "priority": 1},
+        {"user_id": user_obj.id, "playlist_id": cooking.id, "rule_type": "keyword", "rule_value": "料理", "priority": 2},
+    ])
+    return user_obj, python, cooking
+
+def test_classify_user_videos(db_session):
+    """ルールに一致した動画が分類され、履歴が作られることをテスト"""
+    user_obj, python, cooking = _setup_library(db_session, 30)
+
+    result = classify_user_videos(db_session, user_id=user_obj.id, batch_size=7)
+
+    assert result.videos == 30
+    assert result.classified == 20
+    assert db_session.query(Classification).filter_by(playlist_id=python.id).count() == 10
+    assert db_session.query(Classification).filter_by(playlist_id=cooking.id).count() == 10
+    assert len(classification_history.get_by_user(db_session, user_id=user_obj.id, limit=100)) == 20
+
+def test_classify_user_videos_skips_existing(db_session):
+    """再実行時に既存の分類が重複しないことをテスト"""
+    user_obj, _, _ = _setup_library(db_session, 9)
+    classify_user_videos(db_session, user_id=user_obj.id)
+
+    result = classify_user_videos(db_session, user_id=user_obj.id)
+
+    assert result.classified == 0
+    assert result.skipped == 6
+    assert len(classification.get_by_user(db_session, user_id=user_obj.id)) == 6
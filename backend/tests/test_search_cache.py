@@ -0,0 +1,69 @@
+from app.services.search_cache import SearchCache, DiskCacheBackend, SEARCH_QUOTA_COST
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def test_cache_hit_and_miss():
+    """キャッシュのヒット・ミスが記録されることをテスト"""
+    cache = SearchCache(ttl=60, max_entries=10)
+    assert cache.get("python", 10, "snippet") is None
+    cache.set("python", 10, "snippet", {"items": [1]})
+    assert cache.get("python", 10, "snippet") == {"items": [1]}
+    assert cache.get("  python ", 10, "snippet") == {"items": [1]}
+    assert cache.get("python", 5, "snippet") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 2
+    assert stats["quota_saved"] == 2 * SEARCH_QUOTA_COST
+    assert stats["hit_rate"] == 0.5
+
+def test_cache_expires_after_ttl():
+    """TTLを過ぎたエントリが返されないことをテスト"""
+    clock = FakeClock()
+    cache = SearchCache(ttl=60, max_entries=10, clock=clock)
+    cache.set("python", 10, "snippet", {"items": []})
+    clock.now += 59
+    assert cache.get("python", 10, "snippet") is not None
+    clock.now += 2
+    assert cache.get("python", 10, "snippet") is None
+    assert cache.stats()["size"] == 0
+
+def test_cache_evicts_least_recently_used():
+    """上限を超えると最も使われていないエントリが削除されることをテスト"""
+    cache = SearchCache(ttl=60, max_entries=2)
+    cache.set("a", 10, "snippet", {"q": "a"})
+    cache.set("b", 10, "snippet", {"q": "b"})
+    cache.get("a", 10, "snippet")
+    cache.set("c", 10, "snippet", {"q": "c"})
+
+    assert cache.get("b", 10, "snippet") is None
+    assert cache.get("a", 10, "snippet") == {"q": "a"}
+    assert cache.get("c", 10, "snippet") == {"q": "c"}
+    assert cache.stats()["evictions"] == 1
+
+def test_disk_backend_survives_restart(tmp_path):
+    """ディスクバックエンドのキャッシュが再起動後も使えることをテスト"""
+    path = str(tmp_path / "search_cache.db")
+    first = SearchCache(ttl=60, max_entries=10, backend=DiskCacheBackend(path))
+    first.set("python", 10, "snippet", {"items": ["cached"]})
+    first.backend.close()
+
+    second = SearchCache(ttl=60, max_entries=10, backend=DiskCacheBackend(path))
+    assert second.get("python", 10, "snippet") == {"items": ["cached"]}
+    assert second.stats()["hits"] == 1
+    second.backend.close()
+
+def test_disk_backend_ignores_expired_entries(tmp_path):
+    """ディスクバックエンドの期限切れエントリが返されないことをテスト"""
+    clock = FakeClock()
+    backend = DiskCacheBackend(str(tmp_path / "search_cache.db"))
+    cache = SearchCache(ttl=60, max_entries=10, backend=backend, clock=clock)
+    cache.set("python", 10, "snippet", {"items": []})
+    clock.now += 120
+    assert cache.get("python", 10, "snippet") is None
+    backend.close()
@@ -0,0 +1,131 @@
+from datetime import timedelta
+import os
+import subprocess
+import sys
+import pytest
+from fastapi.testclient import TestClient
+from jose import jwt
+from sqlalchemy import event
+from app.config import settings
+from app.crud import user
+from app.database import get_async_db, get_db
+from app.main import app
+from app.services.session_token import (
+    PLACEHOLDER_SECRET_KEY, InvalidSessionTokenError, SessionSecretKeyError, create_session_token,
+    decode_session_token, session_secret_key
+)
+from app.services.user_cache import UserCache, get_user_cache
+from .test_database import db_session, override_get_async_db
+
+def test_session_token_round_trip():
+    """発行したトークンからユーザーIDを取り出せることをテスト"""
+    token = create_session_token(42)
+    assert decode_session_token(token) == 42
+
+def test_session_token_rejects_invalid_tokens():
+    """期限切れ・改ざん・別用途のトークンが拒否されることをテスト"""
+    with pytest.raises(InvalidSessionTokenError):
+        decode_session_token(create_session_token(1, expires_delta=timedelta(seconds=-1)))
+    with pytest.raises(InvalidSessionTokenError):
+        decode_session_token(create_session_token(1) + "x")
+    with pytest.raises(InvalidSessionTokenError):
+        decode_session_token(jwt.encode({"sub": "1"}, session_secret_key(), algorithm=settings.JWT_ALGORITHM))
+    with pytest.raises(InvalidSessionTokenError):
+        decode_session_token(jwt.encode({"sub": "1", "typ": "session"}, "other-secret", algorithm="HS256"))
+
+def test_session_token_never_uses_placeholder_secret(monkeypatch):
+    """既定の公開された鍵では署名・検証せず、DEBUGでなければ起動もしないことをテスト"""
+    monkeypatch.setattr(settings, "JWT_SECRET_KEY", PLACEHOLDER_SECRET_KEY)
+    forged = jwt.encode({"sub": "1", "typ": "session"}, PLACEHOLDER_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+
+    monkeypatch.setattr(settings, "DEBUG", True)
+    assert session_secret_key() != PLACEHOLDER_SECRET_KEY
+    with pytest.raises(InvalidSessionTokenError):
+        decode_session_token(forged)
+
+    monkeypatch.setattr(settings, "DEBUG", False)
+    with pytest.raises(SessionSecretKeyError):
+        create_session_token(1)
+    with pytest.raises(SessionSecretKeyError):
+        decode_session_token(forged)
+    with pytest.raises(SessionSecretKeyError):
+        with TestClient(app):
+            pass
+
+    monkeypatch.setattr(settings, "JWT_SECRET_KEY", "configured-secret")
+    assert decode_session_token(create_session_token(7)) == 7
+
+def test_user_cache_skips_select(db_session):
+    """キャッシュ済みのユーザーはSELECTせずに読み込まれることをテスト"""
+    user_obj = user.create(db_session, obj_in={"email": "cache@example.com", "google_id": "cache_google_id", "name": "Cache"})
+    cache = UserCache(ttl=60, max_entries=10)
+    cache.get(db_session, user_obj.id)
+    db_session.expunge_all()
+
+    statements = []
+    bind = db_session.get_bind()
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(bind, "before_cursor_execute", listener)
+    try:
+        cached = cache.get(db_session, user_obj.id)
+    finally:
+        event.remove(bind, "before_cursor_execute", listener)
+    assert cached.email == "cache@example.com"
+    assert cached in db_session
+    assert statements == []
+    assert cache.hits == 1
+
+    cache.invalidate(user_obj.id)
+    assert cache.get(db_session, 999) is None
+    assert cache.misses == 2
+
+def test_me_with_session_token(db_session):
+    """セッショントークンで /auth/me が使えることをテスト"""
+    user_obj = user.create(db_session, obj_in={"email": "me@example.com", "google_id": "me_google_id", "name": "Me"})
+    app.dependency_overrides[get_db] = lambda: db_session
+    app.dependency_overrides[get_user_cache] = lambda: UserCache(ttl=60, max_entries=10)
+    try:
+        client = TestClient(app)
+        response = client.get("/auth/me", headers={"Authorization": f"Bearer {create_session_token(user_obj.id)}"})
+        assert response.status_code == 200
+        assert response.json()["email"] == "me@example.com"
+
+        response = client.get("/auth/me", headers={"Authorization": f"Bearer {create_session_token(999)}"})
+        assert response.status_code == 401
+    finally:
+        app.dependency_overrides.clear()
+
+def test_library_routes_use_only_the_async_session(db_session):
+    """非同期のルートではユーザーも非同期セッションで読み込み、同期セッションを開かないことをテスト"""
+    user_obj = user.create(db_session, obj_in={"email": "async_me@example.com", "google_id": "async_me_google_id"})
+    cache = UserCache(ttl=60, max_entries=10)
+
+    def no_sync_session():
+        raise AssertionError("sync session opened")
+
+    app.dependency_overrides[get_db] = no_sync_session
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_user_cache] = lambda: cache
+    try:
+        client = TestClient(app)
+        headers = {"Authorization": f"Bearer {create_session_token(user_obj.id)}"}
+        # 2回目はキャッシュから読み込まれる
+        for _ in range(2):
+            assert client.get("/library/playlists", headers=headers).status_code == 200
+        assert (cache.misses, cache.hits) == (1, 1)
+
+        headers = {"Authorization": f"Bearer {create_session_token(999)}"}
+        assert client.get("/library/playlists", headers=headers).status_code == 401
+    finally:
+        app.dependency_overrides.clear()
+
+def test_app_imports_without_async_driver():
+    """非同期ドライバーがなくてもアプリを読み込めることをテスト"""
+    code = (
+        "import sys; sys.modules['aiosqlite'] = None; "
+        "import app.main, app.database as database; "
+        "assert database._async_session_factory is None"
+    )
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], cwd=backend, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,94 @@
+import numpy as np
+from scipy import sparse
+
+from app.crud import user, playlist, video, classification, classification_rule
+from app.models.classification import Classification, PlaylistSuggestion
+from app.services.rule_engine import classify_user_videos
+from app.services.similarity import (
+    TfidfVectorizer, centroids, document_terms, suggest_playlists, tokenize, top_k_scores
+)
+from .test_database import db_session
+
+def test_tokenize_mixed_text():
+    """英数字は単語、日本語はバイグラムに分かれることをテスト"""
+    assert tokenize("Python入門: コーヒー!") == ["python", "入門", "コー", "ーヒ", "ヒー"]
+    assert tokenize(None) == []
+    assert document_terms("猫", None, ["Cats", " ASMR "]) == ["猫", "#cats", "#asmr"]
+
+def test_tfidf_vectors_are_normalized():
+    """TF-IDFの各行がL2正規化され、共通の語ほど重みが小さいことをテスト"""
+    vectorizer = TfidfVectorizer()
+    vectors = vectorizer.fit_transform([["a", "b", "b"], ["a", "c"], []])
+    norms = np.sqrt(np.asarray(vectors.multiply(vectors).sum(axis=1)).ravel())
+    assert np.allclose(norms, [1.0, 1.0, 0.0])
+    row = vectors[0].toarray().ravel()
+    assert row[vectorizer.vocabulary["b"]] > row[vectorizer.vocabulary["a"]]
+    assert vectorizer.transform([["unknown", "c"]]).nnz == 1
+
+def test_top_k_scores_with_exclusion():
+    """上位k件が類似度の降順に並び、除外した組み合わせが候補から外れることをテスト"""
+    vectors = sparse.csr_matrix(np.array([[1.0, 0.0], [0.6, 0.8]], dtype=np.float32))
+    groups = centroids(vectors, [(0, 0), (1, 1), (2, 0), (2, 1)], 3)
+    top, scores = top_k_scores(vectors, groups, 2)
+    assert top.tolist() == [[0, 2], [1, 2]]
+    assert np.allclose(scores[:, 0], 1.0)
+
+    exclude = sparse.coo_matrix(([1.0], ([0], [0])), shape=(2, 3))
+    top, _ = top_k_scores(vectors, groups, 1, exclude=exclude)
+    assert top.tolist() == [[2], [1]]
+
+def test_suggest_playlists(db_session):
+    """未分類の動画に内容の近いプレイリストが提案され、再実行で置き換えられることをテスト"""
+    user_obj = user.create(db_session, obj_in={"email": "tfidf@example.com", "google_id": "tfidf_google_id"})
+    cooking = playlist.create(db_session, obj_in={"youtube_playlist_id": "PLtfidfcook1", "user_id": user_obj.id})
+    coding = playlist.create(db_session, obj_in={"youtube_playlist_id": "PLtfidfcode1", "user_id": user_obj.id})
+    inbox = playlist.create(db_session, obj_in={"youtube_playlist_id": "PLtfidfinbox", "user_id": user_obj.id})
+    rows = [
+        {"youtube_video_id": "cook_1", "title": "簡単な料理レシピ", "tags": ["cooking"]},
+        {"youtube_video_id": "cook_2", "title": "料理の基本 レシピ集", "tags": ["cooking"]},
+        {"youtube_video_id": "code_1", "title": "Python入門 プログラミング", "tags": ["python"]},
+        {"youtube_video_id": "code_2", "title": "Pythonでプログラミング", "tags": ["python"]},
+        {"youtube_video_id": "new_cook", "title": "今日のレシピ 料理", "tags": ["cooking"]},
+        {"youtube_video_id": "new_code", "title": "Python プログラミング講座", "tags": []},
+    ]
+    ids = dict(zip((row["youtube_video_id"] for row in rows), video.create_many(db_session, objs_in=rows, return_ids=True)))
+    playlist.add_videos(db_session, playlist_id=cooking.id, video_ids=[ids["cook_1"], ids["cook_2"]])
+    playlist.add_videos(db_session, playlist_id=coding.id, video_ids=[ids["code_1"]])
+    playlist.add_videos(db_session, playlist_id=inbox.id, video_ids=[ids["new_cook"], ids["new_code"]])
+    # completed の分類も重心に含める
+    classification.create(db_session, obj_in={
+        "user_id": user_obj.id, "video_id": ids["code_2"], "playlist_id": coding.id, "status": "completed"
+    })
+    playlist.add_videos(db_session, playlist_id=inbox.id, video_ids=[ids["code_2"]])
+
+    result = suggest_playlists(db_session, user_id=user_obj.id, top_k=1)
+    assert (result.videos, result.playlists, result.scored) == (6, 3, 5)
+
+    db_session.expire_all()
+    suggestions = {
+        (suggestion.video_id, suggestion.playlist_id): suggestion.confidence
+        for suggestion in db_session.query(PlaylistSuggestion)
+    }
+    # 提案は分類として扱われない
+    assert db_session.query(Classification).count() == 1
+    assert (ids["new_cook"], cooking.id) in suggestions
+    assert (ids["new_code"], coding.id) in suggestions
+    # 既に所属しているプレイリストや分類済みの動画は提案されない
+    assert (ids["new_cook"], inbox.id) not in suggestions
+    assert (ids["cook_1"], cooking.id) not in suggestions
+    assert all(video_id != ids["code_2"] for video_id, _ in suggestions)
+    assert all(0 < confidence <= 1 for confidence in suggestions.values())
+
+    # 再実行すると前回の提案は置き換えられる
+    suggest_playlists(db_session, user_id=user_obj.id, top_k=1)
+    assert db_session.query(PlaylistSuggestion).count() == len(suggestions)
+
+    # 提案された組もルールで分類できる
+    classification_rule.create(db_session, obj_in={
+        "user_id": user_obj.id, "playlist_id": cooking.id, "rule_type": "keyword", "rule_value": "今日の", "priority": 1
+    })
+    rule_result = classify_user_videos(db_session, user_id=user_obj.id)
+    assert (rule_result.classified, rule_result.skipped) == (1, 0)
+    assert classification.get_by_video_and_playlist(
+        db_session, video_id=ids["new_cook"], playlist_id=cooking.id
+    ).status == "completed"
@@ -0,0 +1,112 @@
+import asyncio
+from datetime import datetime, timedelta
+import httpx
+import pytest
+from app.crud import user as crud_user
+from app.services.playlist_sync import sync_user_library
+from app.services.token_refresh import TokenRefreshError, TokenRefreshManager, token_expires_at
+from app.services.user_cache import user_cache
+from app.services.youtube_api import YouTubeAPI
+from .fake_youtube import FakeYouTube
+from .test_database import db_session
+
+NOW = datetime(2026, 1, 1, 12, 0, 0)
+
+class FakeTokenEndpoint:
+    """Googleのトークンエンドポイントの代わり"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+
+    async def handler(self, request):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if b"refresh_token=revoked" in request.content:
+            return httpx.Response(400, json={"error": "invalid_grant"})
+        return httpx.Response(200, json={"access_token": f"fresh_{self.calls}", "expires_in": 3600})
+
+def _manager(endpoint):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(endpoint.handler))
+    return TokenRefreshManager(client, client_id="id", client_secret="secret", clock=lambda: NOW)
+
+def _user(db_session, *, expires_at, refresh_token="refresh"):
+    return crud_user.create(db_session, obj_in={
+        "email": "refresh@example.com",
+        "google_id": "refresh_google_id",
+        "youtube_access_token": "stale",
+        "youtube_refresh_token": refresh_token,
+        "token_expires_at": expires_at
+    })
+
+def test_token_expires_at():
+    """expires_in から有効期限を求めることをテスト"""
+    assert token_expires_at(3600, now=NOW) == NOW + timedelta(hours=1)
+    assert token_expires_at(None, now=NOW) is None
+
+def test_refreshes_shortly_before_expiry(db_session):
+    """期限の少し前に更新し、結果を保存することをテスト"""
+    endpoint = FakeTokenEndpoint()
+    manager = _manager(endpoint)
+    user = _user(db_session, expires_at=NOW + timedelta(minutes=30))
+    assert asyncio.run(manager.get_access_token(db_session, user)) == "stale"
+
+    user.token_expires_at = NOW + timedelta(minutes=2)
+    assert asyncio.run(manager.get_access_token(db_session, user)) == "fresh_1"
+    db_session.expire_all()
+    assert user.youtube_access_token == "fresh_1"
+    assert user.youtube_refresh_token == "refresh"
+    assert user.token_expires_at == NOW + timedelta(hours=1)
+
+def test_refresh_invalidates_user_cache(db_session):
+    """更新したトークンが認証用のユーザーキャッシュから読み込まれることをテスト"""
+    manager = _manager(FakeTokenEndpoint())
+    user = _user(db_session, expires_at=NOW)
+    user_cache.clear()
+    try:
+        assert user_cache.get(db_session, user.id).youtube_access_token == "stale"
+        asyncio.run(manager.get_access_token(db_session, user))
+        db_session.expunge_all()
+        assert user_cache.get(db_session, user.id).youtube_access_token == "fresh_1"
+    finally:
+        user_cache.clear()
+
+def test_concurrent_refreshes_are_collapsed(db_session):
+    """同じユーザーの同時更新が1回のリクエストにまとめられることをテスト"""
+    endpoint = FakeTokenEndpoint(delay=0.01)
+    manager = _manager(endpoint)
+    user = _user(db_session, expires_at=NOW)
+
+    async def refresh_all():
+        return await asyncio.gather(*(manager.get_access_token(db_session, user) for _ in range(5)))
+
+    assert asyncio.run(refresh_all()) == ["fresh_1"] * 5
+    assert endpoint.calls == 1
+
+def test_refresh_errors(db_session):
+    """更新に失敗した場合は TokenRefreshError を送出することをテスト"""
+    endpoint = FakeTokenEndpoint()
+    manager = _manager(endpoint)
+    user = _user(db_session, expires_at=NOW, refresh_token="revoked")
+    with pytest.raises(TokenRefreshError):
+        asyncio.run(manager.get_access_token(db_session, user))
+    user.youtube_refresh_token = None
+    with pytest.raises(TokenRefreshError):
+        asyncio.run(manager.get_access_token(db_session, user))
+    assert endpoint.calls == 1
+
+def test_sync_recovers_from_expired_token(db_session):
+    """同期中に401が返ってもトークンを更新して続行することをテスト"""
+    fake = FakeYouTube(page_size=2)
+    fake.add_playlist("PLrefresh001", [f"vid{i}" for i in range(5)])
+    fake.valid_tokens = {"fresh_1"}
+    endpoint = FakeTokenEndpoint()
+    manager = _manager(endpoint)
+    # 期限がまだ先でも、失効したトークンは401を受けて更新する
+    user = _user(db_session, expires_at=NOW + timedelta(hours=1))
+
+    api = YouTubeAPI(httpx.AsyncClient(transport=fake.transport()))
+    result = asyncio.run(sync_user_library(db_session, user=user, api=api, token_manager=manager))
+    assert result.playlist_items == 5
+    assert endpoint.calls == 1
+    assert user.youtube_access_token == "fresh_1"
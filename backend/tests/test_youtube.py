@@ -0,0 +1,136 @@
+import asyncio
+import time
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.youtube_api import YouTubeAPI, YouTubeAPIError, get_youtube_api
+from app.services.search_cache import SearchCache, get_search_cache
+
+client = TestClient(app)
+
+@pytest.fixture(autouse=True)
+def search_cache():
+    """テストごとに空の検索キャッシュを使う"""
+    cache = SearchCache(ttl=60, max_entries=10)
+    app.dependency_overrides[get_search_cache] = lambda: cache
+    yield cache
+    app.dependency_overrides.clear()
+
+def _api(handler, **kwargs) -> YouTubeAPI:
+    return YouTubeAPI(
+        httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        api_key="test_key",
+        **kwargs
+    )
+
+def test_search_endpoint():
+    """検索エンドポイントのテスト"""
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append(request)
+        return httpx.Response(200, json={"items": [{"id": {"videoId": "abc"}}]})
+
+    app.dependency_overrides[get_youtube_api] = lambda: _api(handler)
+    response = client.get("/youtube/search", params={"query": "python", "max_results": 5})
+
+    assert response.status_code == 200
+    assert response.json()["items"][0]["id"]["videoId"] == "abc"
+    params = requests[0].url.params
+    assert requests[0].url.path.endswith("/search")
+    assert params["q"] == "python"
+    assert params["maxResults"] == "5"
+    assert params["key"] == "test_key"
+
+def test_search_endpoint_api_error():
+    """YouTube APIのエラーが500として返されることをテスト"""
+    def handler(request: httpx.Request):
+        return httpx.Response(403, json={"error": {"message": "quotaExceeded", "errors": [{"reason": "quotaExceeded"}]}})
+
+    app.dependency_overrides[get_youtube_api] = lambda: _api(handler)
+    response = client.get("/youtube/search", params={"query": "python"})
+
+    assert response.status_code == 500
+    assert response.json()["detail"] == "quotaExceeded"
+
+def test_playlists_endpoint_timeout():
+    """タイムアウト時に504が返されることをテスト"""
+    def handler(request: httpx.Request):
+        raise httpx.ReadTimeout("timeout", request=request)
+
+    app.dependency_overrides[get_youtube_api] = lambda: _api(handler)
+    response = client.get("/youtube/playlists")
+
+    assert response.status_code == 504
+
+def test_search_endpoint_uses_cache(search_cache):
+    """同じ検索が2回目以降キャッシュから返されることをテスト"""
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append(request)
+        return httpx.Response(200, json={"items": []})
+
+    app.dependency_overrides[get_youtube_api] = lambda: _api(handler)
+    for _ in range(3):
+        response = client.get("/youtube/search", params={"query": "python"})
+        assert response.status_code == 200
+
+    assert len(requests) == 1
+    stats = client.get("/youtube/search/cache/stats").json()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["quota_saved"] == 200
+
+def test_search_endpoint_does_not_cache_errors(search_cache):
+    """エラー応答がキャッシュされないことをテスト"""
+    def handler(request: httpx.Request):
+        return httpx.Response(500, json={"error": {"message": "backendError"}})
+
+    app.dependency_overrides[get_youtube_api] = lambda: _api(handler)
+    client.get("/youtube/search", params={"query": "python"})
+    assert search_cache.stats()["size"] == 0
+
+def test_api_error_attributes():
+    """YouTubeAPIErrorにステータスと理由が設定されることをテスト"""
+    def handler(request: httpx.Request):
+        return httpx.Response(404, json={"error": {"message": "not found", "errors": [{"reason": "playlistNotFound"}]}})
+
+    async def run():
+        return await _api(handler).playlist_items(playlist_id="PL1234567890")
+
+    try:
+        asyncio.run(run())
+    except YouTubeAPIError as e:
+        assert e.status_code == 404
+        assert e.reason == "playlistNotFound"
+    else:
+        raise AssertionError("YouTubeAPIError was not raised")
+
+def test_access_token_is_sent_as_bearer():
+    """アクセストークンがAuthorizationヘッダーで送られることをテスト"""
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append(request)
+        return httpx.Response(200, json={"items": []})
+
+    asyncio.run(_api(handler).playlists(mine=True, access_token="user_token"))
+    assert requests[0].headers["Authorization"] == "Bearer user_token"
+    assert "key" not in requests[0].url.params
+    assert requests[0].url.params["mine"] == "true"
+
+def test_concurrent_requests_overlap():
+    """同時リクエストがイベントループ上で並行に処理されることをテスト"""
+    async def handler(request: httpx.Request):
+        await asyncio.sleep(0.2)
+        return httpx.Response(200, json={"items": []})
+
+    async def run():
+        api = _api(handler)
+        await asyncio.gather(*(api.search(q=str(i)) for i in range(5)))
+
+    start = time.perf_counter()
+    asyncio.run(run())
+    assert time.perf_counter() - start < 0.6